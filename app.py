@@ -3,27 +3,36 @@ import os
 
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from utils.config import Config
-from utils.db_utils import add_user, update_ness_balance, initialize_db
+from utils.db_utils import add_user, update_ness_balance, initialize_db, get_write_queue_stats, get_subscription_cache_stats
 from utils.telegram_utils import TelegramBot
 from utils.payment_utils import BotAccessManager
+from utils.blockchain_utils import PrivatenessBlockchainClient
+from utils.job_utils import VerificationJobQueue, QueueFullError, JobNotQueuedError
+from utils.scheduler_utils import SubscriptionScheduler
+from utils.dispatch_utils import UpdateDispatcher
+from utils.market_utils import MarketDataCache
+from utils.signal_utils import SignalHub
+from utils.assets_utils import init_assets
+from utils.page_cache_utils import PageCache
+from utils.catalog_utils import BotCatalog
+from utils.leader_utils import LeaderElection
+from utils.lazy_utils import Lazy
+from utils.metrics_utils import REGISTRY, QUEUE_DEPTH, CACHE_HIT_RATIO, LEADER, init_metrics
+from utils.admin_utils import require_admin
+from utils.trace_utils import init_tracing
+from utils.logging_utils import logging_stats
+import hmac
+import atexit
 import threading
 import time
 import logging
 
 
-# Enable detailed logging (DEBUG mode)
+# Queue-based logging: request threads enqueue, a background listener writes (levels via LOG_LEVEL / LOG_LEVELS)
 Config.setup_logging()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set logging level to DEBUG
-
-# Ensure logs are printed to the console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
 
 logger.info("Logging system initialized.")
 
@@ -32,20 +41,16 @@ logger.info("Logging system initialized.")
 
 def create_app():
     app = Flask(__name__, static_folder=Config.STATIC_FOLDER, template_folder=Config.TEMPLATE_FOLDER)
+    init_assets(app)
+    init_metrics(app)
+    init_tracing(app)
     logger.info("Initializing PrivateNess Network Application")
     return app
 
 # Flask app initialization
 app = create_app()
 bot = TelegramBot()
-
-# Set up the menu button immediately after bot initialization
-try:
-    logger.info("Setting up Telegram menu button...")
-    bot.set_menu_button()
-    logger.info("Menu button setup completed")
-except Exception as e:
-    logger.error(f"Failed to set up menu button: {e}")
+atexit.register(bot.close)
 
 def process_update(update):
     """Process incoming updates from Telegram"""
@@ -82,35 +87,146 @@ def process_update(update):
     except Exception as e:
         logger.error(f"Error processing update: {e}")
 
+# Webhook and polling both hand updates to a background worker
+update_dispatcher = UpdateDispatcher(
+    process_update,
+    workers=Config.TELEGRAM_UPDATE_WORKERS,
+    max_queue=Config.TELEGRAM_UPDATE_QUEUE_SIZE
+)
+
 def poll_updates():
-    """Continuous polling for updates"""
+    """Continuous polling for updates (local development fallback for the webhook)"""
     offset = 0
     while True:
         try:
+            # Only confirm updates the dispatcher has finished; in-flight ones are re-delivered and deduplicated
+            offset = update_dispatcher.committed_offset(offset)
+            # getUpdates long-polls, so there is no need to sleep between batches
             updates = bot.get_updates(offset)
             if updates and updates.get('ok') and updates.get('result'):
                 for update in updates['result']:
-                    process_update(update)
-                    offset = update['update_id'] + 1
-            time.sleep(1)
+                    # Blocks while this chat's worker queue is full
+                    update_dispatcher.submit(update, timeout=None)
+                if update_dispatcher.committed_offset(offset) <= updates['result'][-1]['update_id']:
+                    # Re-polling now would only return the same in-flight updates
+                    update_dispatcher.wait_for_progress(timeout=1)
+            elif updates is None:
+                time.sleep(5)  # Wait before retrying after a failed request
         except Exception as e:
             logger.error(f"Error in polling loop: {e}")
             time.sleep(5)  # Wait before retrying
 
-def setup():
-    initialize_db()
-    # Start polling thread
+def webhook_url():
+    return f"{Config.TELEGRAM_WEBHOOK_URL.rstrip('/')}/telegram/webhook/{Config.TELEGRAM_WEBHOOK_SECRET}"
+
+def start_update_ingestion():
+    """Register the webhook, or fall back to a polling thread"""
+    if Config.TELEGRAM_UPDATE_MODE == 'webhook':
+        if not Config.TELEGRAM_WEBHOOK_URL or not Config.TELEGRAM_WEBHOOK_SECRET:
+            logger.error("Webhook mode needs TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET")
+            return
+        update_dispatcher.start()
+        bot.set_webhook(webhook_url(), Config.TELEGRAM_WEBHOOK_SECRET)
+        return
+
+    # getUpdates is refused while a webhook is registered
+    bot.delete_webhook()
     polling_thread = threading.Thread(target=poll_updates)
     polling_thread.daemon = True
     polling_thread.start()
-    
-    # Try setting up menu button again in case it failed initially
+
+def start_background_tasks():
+    """Singletons that must run in exactly one process: the elected leader"""
+    logger.info("Starting leader background tasks")
+    job_queue.get().start_recovery()  # Resume verifications whose worker died or restarted
+    subscription_scheduler.get().start()
+    market_data_cache.start(leader=True)
+    signal_hub.start(leader=True)
+    start_update_ingestion()
+
     try:
+        logger.info("Setting up Telegram menu button...")
         bot.set_menu_button()
+        logger.info("Menu button setup completed")
+    except Exception as e:
+        logger.error(f"Failed to set up menu button: {e}")
+
+leader_election = None
+
+def start_worker():
+    """
+    Per-process startup, run after fork under gunicorn (see gunicorn.conf.py).
+    Every worker serves requests; followers mirror the leader's market and signal
+    snapshots, and whichever worker holds the leader lock runs the background tasks.
+    """
+    global leader_election
+    if leader_election is not None:
+        return
+    REGISTRY.share()  # /metrics then reports every worker, not just the one that was scraped
+    market_data_cache.start(leader=False)
+    signal_hub.start(leader=False)
+    leader_election = LeaderElection()
+    leader_election.start(start_background_tasks)
+    if Config.WARM_UP_ON_START:
+        # Off the boot path: the worker accepts requests while this runs
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def start_stream_worker():
+    """
+    Startup for the gevent stream server (see gunicorn_stream.conf.py). It only serves
+    /api/signals/stream: it mirrors the leader's signal snapshot and never runs for leader.
+    """
+    signal_hub.max_subscribers = Config.SIGNAL_STREAM_MAX_ASYNC_CLIENTS
+    signal_hub.start(leader=False)
+
+
+def warm_up():
+    """Build the lazy services and render the cached pages ahead of the first request"""
+    for service in (blockchain_client, bot_access_manager, job_queue, subscription_scheduler):
+        try:
+            service.get()
+        except Exception as e:
+            logger.error(f"[WARM UP] Failed to initialise {service.name}: {e}")
+
+    try:
+        with app.test_request_context():
+            for template in ('get_started.html', 'service.html', 'about.html', 'contact.html'):
+                page_cache.get(template)
     except Exception as e:
-        logger.error(f"Failed to set up menu button in setup: {e}")
+        logger.error(f"[WARM UP] Failed to render pages: {e}")
+
+def create_blockchain_client():
+    driver_pool = None
+    if Config.SELENIUM_FALLBACK_ENABLED:
+        # One bounded pool of long-lived browsers; Selenium is only imported when enabled
+        from utils.webdriver_utils import WebDriverPool
+        driver_pool = WebDriverPool()
+        atexit.register(driver_pool.close)
+    return PrivatenessBlockchainClient(driver_pool=driver_pool)
+
+def create_job_queue():
+    queue = VerificationJobQueue(bot_access_manager.get())
+    atexit.register(queue.shutdown, False)
+    return queue
+
+# Heavy clients are built on first use or by warm_up(), never at import
+blockchain_client = Lazy('blockchain_client', create_blockchain_client)
+bot_access_manager = Lazy('bot_access_manager', lambda: BotAccessManager(blockchain_client.get()))
+
+# Verifications run on a bounded worker pool; request threads only enqueue and poll
+job_queue = Lazy('job_queue', create_job_queue)
+
+# Revokes expired subscriptions and re-checks holder balances in the background
+subscription_scheduler = Lazy('subscription_scheduler', lambda: SubscriptionScheduler(blockchain_client.get()))
+
+# One upstream CoinGecko fetch shared by every Mini App client
+market_data_cache = MarketDataCache()
 
-bot_access_manager = BotAccessManager()
+# One upstream signal poller fanned out to every open SSE stream
+signal_hub = SignalHub()
+
+# The bot list the frontend renders, serialised once from Config.BOT_PAYMENT_CONFIGS
+bot_catalog = BotCatalog()
 
 '''@app.route('/check_bot_access', methods=['POST'])
 def check_bot_access():
@@ -127,6 +243,59 @@ def check_bot_access():
     logger.info(f"Access check result for {telegram_id} on {bot_name}: {access_result}")
     return jsonify(access_result)'''
 
+@app.route('/telegram/webhook/<secret>', methods=['POST'])
+def telegram_webhook(secret):
+    """Receive an update from Telegram, acknowledge it and process it in the background"""
+    # compare_digest only accepts ASCII str, so compare bytes: a non-ASCII probe must get a 404, not a 500
+    expected = (Config.TELEGRAM_WEBHOOK_SECRET or '').encode()
+    header_token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '').encode()
+    if (Config.TELEGRAM_UPDATE_MODE != 'webhook' or not expected
+            or not hmac.compare_digest(secret.encode(), expected) or not hmac.compare_digest(header_token, expected)):
+        return jsonify({'ok': False}), 404
+
+    update = request.get_json(silent=True)
+    if not isinstance(update, dict):
+        return jsonify({'ok': False}), 400
+
+    # Telegram redelivers on non-2xx, so a full queue is signalled rather than dropped
+    if not update_dispatcher.submit(update):
+        return jsonify({'ok': False}), 503
+    return jsonify({'ok': True})
+
+@app.route('/api/market_data')
+def market_data():
+    """Shared market snapshot, revalidated by ETag"""
+    snapshot = market_data_cache.get()
+    if snapshot is None:
+        return jsonify({'error': 'Market data unavailable'}), 503
+
+    response = app.response_class(snapshot['body'], mimetype='application/json')
+    response.set_etag(snapshot['etag'])
+    response.headers['Cache-Control'] = (
+        f"public, max-age={int(Config.MARKET_DATA_TTL)}, stale-while-revalidate={int(Config.MARKET_DATA_MAX_STALE)}"
+    )
+    return response.make_conditional(request)
+
+@app.route('/api/bots')
+def bot_catalog_api():
+    """Versioned bot catalog; clients revalidate with If-None-Match"""
+    response = app.response_class(bot_catalog.body, mimetype='application/json')
+    response.set_etag(bot_catalog.etag)
+    response.headers['Cache-Control'] = f"public, max-age={Config.BOT_CATALOG_MAX_AGE}"
+    return response.make_conditional(request)
+
+@app.route('/api/signals/stream')
+def signal_stream():
+    """Server-Sent Events stream of signal alerts, resuming from Last-Event-ID"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    stream = signal_hub.subscribe(last_event_id)
+    if stream is None:
+        return jsonify({'error': 'Too many open streams'}), 503
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+
 @app.route('/telegram/check_bot_access', methods=['POST'])  # Telegram route
 def check_bot_access():
     data = request.json
@@ -134,12 +303,23 @@ def check_bot_access():
     bot_name = data.get('bot_name')
 
     # Check ongoing bot access
-    access_result = bot_access_manager.check_ongoing_bot_access(telegram_id, bot_name)
+    access_result = bot_access_manager.get().check_ongoing_bot_access(telegram_id, bot_name)
     
     logger.info(f"Access check result for {telegram_id} on {bot_name}: {access_result}")
     return jsonify(access_result)
 
 
+@app.route('/telegram/check_bot_access_batch', methods=['POST'])
+def check_bot_access_batch():
+    """Access map for every bot in the catalog, read with one query"""
+    data = request.get_json(silent=True) or {}
+    telegram_id = data.get('telegram_id')
+    if not telegram_id:
+        return jsonify({'success': False, 'message': 'Missing required fields.'}), 400
+
+    result = bot_access_manager.get().check_bot_access_batch(telegram_id, [bot['key'] for bot in bot_catalog.bots])
+    return jsonify(result)
+
 '''@app.route('/verify_bot_payment', methods=['POST'])
 def verify_bot_payment():
     data = request.json
@@ -161,7 +341,6 @@ def verify_bot_payment():
     try:
         data = request.json
         logger.info(f"[REQUEST] Received data: {data}")  # Log incoming data
-        print(f"[REQUEST] Received data: {data}")  # Debugging print
 
         bot_name = data.get('bot_name')
         tx_hash = data.get('tx_hash')
@@ -170,80 +349,68 @@ def verify_bot_payment():
         if not bot_name or not tx_hash or not telegram_id:
             return jsonify({"success": False, "message": "Missing required fields."})
 
-        # Call validation function
-        bot_manager = BotAccessManager()
-        result = bot_manager.verify_payment_transaction(telegram_id, bot_name, tx_hash)
+        # Queue the verification and let the client poll for the result
+        job = job_queue.get().submit(telegram_id, bot_name, tx_hash)
 
-        logger.info(f"[RESPONSE] Payment verification result: {result}")
-        print(f"[RESPONSE] Payment verification result: {result}")  # Debugging print
-        return jsonify(result)
+        logger.info(f"[RESPONSE] Payment verification queued: {job}")
+        return jsonify(job), 202
+
+    except QueueFullError as e:
+        logger.warning(f"[BUSY] Verification queue full: {str(e)}")
+        return jsonify({"success": False, "message": "Server busy. Please try again shortly."}), 503
+
+    except JobNotQueuedError as e:
+        logger.error(f"[ERROR] Verification not queued: {str(e)}")
+        return jsonify({"success": False, "message": "Could not start the verification. Please try again shortly."}), 503
 
     except Exception as e:
         logger.error(f"[ERROR] Failed to verify payment: {str(e)}")
-        print(f"[ERROR] Failed to verify payment: {str(e)}")  # Debugging print
         return jsonify({"success": False, "message": "Internal error"})
 
+@app.route('/telegram/verify_bot_payment/<job_id>', methods=['GET'])
+def verify_bot_payment_status(job_id):
+    job = job_queue.get().get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Unknown verification job."}), 404
+    return jsonify(job)
+
+
+# These pages never vary per request: render once, then serve bytes and 304s.
+# Each web route and its /telegram twin share one cache entry.
+page_cache = PageCache(app)
 
 @app.route('/')
+@app.route('/telegram')  # This is accessible by Telegram
 def home():
     try:
-        return render_template('get_started.html')
+        return page_cache.respond('get_started.html')
     except Exception as e:
         logger.error(f"Error rendering home page: {e}")
         return render_template('error.html', error=500), 500
 
-@app.route('/telegram')
-def telegram_web_app():
-    try:
-        return render_template('get_started.html')  # This is accessible by Telegram
-    except Exception as e:
-        logger.error(f"Error rendering telegram web app: {e}")
-        return render_template('error.html', error=500), 500
-
-@app.route('/telegram/services')  # Route for Telegram to access services
-def telegram_services():
-    try:
-        return render_template('service.html')  # This is accessible by Telegram
-    except Exception as e:
-        logger.error(f"Error rendering service page: {e}")
-        return render_template('error.html', error=500), 500
-
 @app.route('/services')  # Regular route for web users
+@app.route('/telegram/services')  # Route for Telegram to access services
 def services():
     try:
-        return render_template('service.html')  # This is accessible by regular users
+        return page_cache.respond('service.html')
     except Exception as e:
         logger.error(f"Error rendering service page: {e}")
         return render_template('error.html', error=500), 500
 
 @app.route('/about')  # Regular route for web users
+@app.route('/telegram/about')  # Route for Telegram to access about
 def about():
     try:
-        return render_template('about.html')  # This is accessible by regular users
-    except Exception as e:
-        logger.error(f"Error rendering about page: {e}")
-        return render_template('error.html', error=500), 500
-
-@app.route('/telegram/about')  # Route for Telegram to access services
-def telegram_about():
-    try:
-        return render_template('about.html')  # This is accessible by Telegram
+        return page_cache.respond('about.html')
     except Exception as e:
         logger.error(f"Error rendering about page: {e}")
         return render_template('error.html', error=500), 500
 
 @app.route('/contact')  # Regular route for web users
+@app.route('/telegram/contact')  # Route for Telegram to access contact
 def contact():
     try:
-        return render_template('contact.html')  # This is accessible by regular users
-    except Exception as e:
-        logger.error(f"Error rendering contact page: {e}")
-        return render_template('error.html', error=500), 500
-
-@app.route('/telegram/contact')  # Route for Telegram to access services
-def telegram_contact():
-    try:
-        return render_template('contact.html')  # This is accessible by Telegram
+        return page_cache.respond('contact.html')
     except Exception as e:
         logger.error(f"Error rendering contact page: {e}")
         return render_template('error.html', error=500), 500
@@ -264,10 +431,55 @@ def health_check():
         logger.error(f"Health check failed: {e}")
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
 
+def collect_runtime_metrics():
+    """Refresh the queue-depth and cache gauges from the components' stats() at scrape time"""
+    LEADER.set(1 if leader_election and leader_election.is_leader else 0)
+    QUEUE_DEPTH.set(update_dispatcher.stats()['queue_depth'], queue='telegram_updates')
+    QUEUE_DEPTH.set(bot.outbound.stats()['pending'], queue='telegram_outbound')
+    QUEUE_DEPTH.set(get_write_queue_stats()['queue_depth'], queue='db_writes')
+    if job_queue.loaded:
+        QUEUE_DEPTH.set(job_queue.peek().stats()['pending'], queue='verification_jobs')
+
+    CACHE_HIT_RATIO.set(get_subscription_cache_stats()['hit_rate'], cache='subscriptions')
+    CACHE_HIT_RATIO.set(market_data_cache.stats()['cache']['hit_rate'], cache='market_data')
+    if bot_access_manager.loaded:
+        access_stats = bot_access_manager.peek().stats()
+        for cache in ('verified_tx_cache', 'failed_validation_cache', 'balance_cache'):
+            CACHE_HIT_RATIO.set(access_stats[cache]['hit_rate'], cache=cache)
+    pages = page_cache.stats()
+    lookups = pages['hits'] + pages['renders']
+    CACHE_HIT_RATIO.set(pages['hits'] / lookups if lookups else 0.0, cache='pages')
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+@app.route('/stats')
+def stats():
+    """Runtime counters used to size pools and caches (operators only)"""
+    require_admin()
+    return jsonify({
+        'webdriver_pool': blockchain_client.peek().driver_pool.stats()
+                          if blockchain_client.loaded and blockchain_client.peek().driver_pool else None,
+        'bot_access': bot_access_manager.peek().stats() if bot_access_manager.loaded else None,
+        'verification_jobs': job_queue.peek().stats() if job_queue.loaded else None,
+        'db_writes': get_write_queue_stats(),
+        'subscription_cache': get_subscription_cache_stats(),
+        'subscription_scheduler': subscription_scheduler.peek().stats() if subscription_scheduler.loaded else None,
+        'services': {service.name: service.stats() for service in (blockchain_client, bot_access_manager, job_queue, subscription_scheduler)},
+        'telegram_updates': update_dispatcher.stats(),
+        'telegram_outbound': bot.outbound.stats(),
+        'market_data': market_data_cache.stats(),
+        'signals': signal_hub.stats(),
+        'page_cache': page_cache.stats(),
+        'bot_catalog': bot_catalog.stats(),
+        'logging': logging_stats(),
+        'process': {'pid': os.getpid(), 'leader': bool(leader_election and leader_election.is_leader)}
+    })
+
 if __name__ == '__main__':
     try:
         logger.info("Starting application on http://127.0.0.1:5000")
         initialize_db()  # Ensure the database is initialized
+        start_worker()  # A lone process always wins the leader lock
         app.run(
             host='0.0.0.0',  # Listen on all available interfaces
             port=5000,
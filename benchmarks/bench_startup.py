@@ -0,0 +1,83 @@
+"""
+Startup benchmark: how long a fresh interpreter takes to import the app and
+serve its first request, and how long the optional warm-up takes after that.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a clean child process so every sample pays the full import cost
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get('/health').status_code
+first_request = time.perf_counter()
+app.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (first_request - started) * 1000,
+    'warm_up_ms': (warmed - first_request) * 1000,
+    'status': status,
+    'selenium_loaded': any(name.startswith('selenium') for name in __import__('sys').modules),
+}))
+"""
+
+
+def run_once() -> dict:
+    # Logs and runtime files go to a scratch directory, not the checkout
+    with tempfile.TemporaryDirectory(prefix='ness-bench-') as workdir:
+        env = dict(os.environ, WARM_UP_ON_START='false', RUNTIME_DIR=os.path.join(workdir, 'run'),
+                   LOG_FILE=os.path.join(workdir, 'app.log'))
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarise(samples, key: str) -> dict:
+    values = sorted(sample[key] for sample in samples)
+    return {
+        'min': round(values[0], 1),
+        'median': round(statistics.median(values), 1),
+        'max': round(values[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import and first-request time')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    summary = {
+        'runs': args.runs,
+        'import_ms': summarise(samples, 'import_ms'),
+        'first_request_ms': summarise(samples, 'first_request_ms'),
+        'warm_up_ms': summarise(samples, 'warm_up_ms'),
+        'selenium_loaded': any(sample['selenium_loaded'] for sample in samples),
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"runs: {summary['runs']}")
+    for key in ('import_ms', 'first_request_ms', 'warm_up_ms'):
+        stats = summary[key]
+        print(f"{key:>18}: min {stats['min']:8.1f}  median {stats['median']:8.1f}  max {stats['max']:8.1f}")
+    print(f"   selenium_loaded: {summary['selenium_loaded']}")
+
+
+if __name__ == '__main__':
+    main()
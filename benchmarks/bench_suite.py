@@ -0,0 +1,364 @@
+"""
+Offline throughput and latency benchmarks.
+
+Starts the fake Telegram Bot API, NESS explorer and JSON-RPC node from
+tests/fakes, points the app at them, and drives each scenario at a fixed
+concurrency (a closed loop: every worker waits for its previous call before
+issuing the next one). Results are printed, or written with --output, as JSON:
+
+    python -m benchmarks.bench_suite --requests 500 --concurrency 16 --output before.json
+    python -m benchmarks.bench_suite --latency-ms 80 --failure-rate 0.05 --faults-on explorer
+
+Scenarios:
+    check_bot_access    POST /telegram/check_bot_access, half the users subscribed
+    verify_bot_payment  POST /telegram/verify_bot_payment, then poll the job until it finishes
+    poll_updates        getUpdates -> dispatcher -> /start handler -> sendMessage, per chat round trip
+    db.*                the db_utils calls on the request and verification paths
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from tests.fakes.explorer import FakeExplorer
+from tests.fakes.rpc import FakeRPC
+from tests.fakes.telegram import FakeTelegram
+
+BOT_NAME = 'Doge_Spot_Binance'
+PAYMENT_ADDRESS = 'bench-payment-address'
+REQUIRED_NCH = 300000
+MINIMUM_NESS = 4000
+
+SCENARIOS = ('check_bot_access', 'verify_bot_payment', 'poll_updates', 'db')
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(call: Callable[[int], str], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run `call(i)` for i in range(requests) on `concurrency` threads. `call`
+    returns an outcome label; an exception counts as an error.
+    """
+    latencies: List[float] = []
+    outcomes = Counter()
+    lock = threading.Lock()
+    indexes = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                index = next(indexes, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                outcome = call(index)
+            except Exception as e:
+                outcome = f"error:{type(e).__name__}"
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'duration_s': round(duration, 3),
+        'requests_per_s': round(requests / duration, 1) if duration else None,
+        'errors': sum(count for outcome, count in outcomes.items() if outcome.startswith('error')),
+        'outcomes': dict(outcomes),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+class Environment:
+    """
+    Fake upstreams plus the app served over real HTTP on an ephemeral port.
+
+    The app reads its configuration at import time, so the environment is
+    prepared before `app` is imported.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix='ness-bench-')
+        self.explorer = FakeExplorer().start()
+        self.rpc = FakeRPC().start()
+        self.telegram = FakeTelegram().start()
+        for name in args.faults_on:
+            getattr(self, name).faults.configure(
+                latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                failure_rate=args.failure_rate, failure_status=args.failure_status, seed=args.seed
+            )
+
+        os.environ.update({
+            'BOT_TOKEN': 'bench-token',
+            'TELEGRAM_API_URL': self.telegram.url,
+            'TELEGRAM_UPDATE_MODE': 'polling',
+            'TELEGRAM_GLOBAL_RATE': str(args.telegram_rate),
+            'EXPLORER_URL': self.explorer.url,
+            'RPC_URL': self.rpc.url,
+            f'PAYMENT_ADDRESS_{BOT_NAME.upper()}': PAYMENT_ADDRESS,
+            'REQUIRED_NCH': str(REQUIRED_NCH),
+            'MINIMUM_NESS': str(MINIMUM_NESS),
+            'DB_PATH': os.path.join(self.workdir, 'bench.db'),
+            'RUNTIME_DIR': os.path.join(self.workdir, 'run'),
+            'LOG_FILE': os.path.join(self.workdir, 'app.log'),
+            'SELENIUM_FALLBACK_ENABLED': 'false',
+            'WARM_UP_ON_START': 'false',
+        })
+
+        import app as service
+        from werkzeug.serving import make_server
+        from utils.db_utils import initialize_db
+
+        self.service = service
+        initialize_db()
+        self.server = make_server('127.0.0.1', 0, service.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, name='bench-http', daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._local = threading.local()
+
+    def session(self):
+        import requests
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def close(self):
+        self.server.shutdown()
+        for fake in (self.explorer, self.rpc, self.telegram):
+            fake.stop()
+
+
+def bench_check_bot_access(env: Environment, requests: int, concurrency: int) -> Dict[str, Any]:
+    from utils.db_utils import save_bot_subscription
+
+    users = max(concurrency * 4, 100)
+    for telegram_id in range(0, users, 2):
+        save_bot_subscription({
+            'telegram_id': telegram_id, 'bot_name': BOT_NAME, 'bot_username': 'bench_bot',
+            'payment_address': f'bench-holder-{telegram_id}', 'expires_at': datetime.now() + timedelta(days=30)
+        })
+
+    def call(index: int) -> str:
+        response = env.session().post(f"{env.url}/telegram/check_bot_access",
+                                      json={'telegram_id': index % users, 'bot_name': BOT_NAME}, timeout=30)
+        response.raise_for_status()
+        return 'access' if response.json().get('access') else 'no_access'
+
+    return run_load(call, requests, concurrency)
+
+
+def bench_verify_bot_payment(env: Environment, requests: int, concurrency: int) -> Dict[str, Any]:
+    run_id = int(time.time() * 1000)
+    for index in range(requests):
+        tx_hash, sender = f'bench-{run_id}-{index}', f'bench-sender-{index}'
+        env.explorer.add_transaction(tx_hash, sender, [(PAYMENT_ADDRESS, REQUIRED_NCH)])
+        env.explorer.set_balance(sender, MINIMUM_NESS * 2)
+        env.rpc.add_transaction(tx_hash, sender, REQUIRED_NCH, PAYMENT_ADDRESS)
+
+    def call(index: int) -> str:
+        session = env.session()
+        response = session.post(f"{env.url}/telegram/verify_bot_payment", json={
+            'telegram_id': 1_000_000 + index, 'bot_name': BOT_NAME, 'tx_hash': f'bench-{run_id}-{index}'
+        }, timeout=30)
+        if response.status_code == 503:
+            return 'rejected_busy'
+        response.raise_for_status()
+        job_id = response.json()['job_id']
+
+        deadline = time.monotonic() + env.args.job_timeout
+        while time.monotonic() < deadline:
+            job = session.get(f"{env.url}/telegram/verify_bot_payment/{job_id}", timeout=30).json()
+            if job.get('status') in ('done', 'failed'):
+                result = job.get('result') or {}
+                return 'verified' if result.get('success') else f"{job['status']}:not_verified"
+            time.sleep(env.args.poll_interval_ms / 1000)
+        return 'timeout'
+
+    return run_load(call, requests, concurrency)
+
+
+def bench_poll_updates(env: Environment, requests: int, concurrency: int) -> Dict[str, Any]:
+    env.service.start_update_ingestion()
+    base_chat = 2_000_000
+
+    def call(index: int) -> str:
+        chat_id = base_chat + index  # One chat per message, so the per-chat send limit does not serialise them
+        env.telegram.push_message(chat_id, '/start')
+        return 'replied' if env.telegram.wait_for_messages(chat_id, timeout=env.args.job_timeout) else 'timeout'
+
+    return run_load(call, requests, concurrency)
+
+
+def bench_db(env: Environment, requests: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    from utils import db_utils
+
+    bot_names = list(env.service.Config.BOT_PAYMENT_CONFIGS)
+    expires_at = datetime.now() + timedelta(days=30)
+    for index in range(requests):
+        db_utils.save_verified_transaction({
+            'tx_hash': f'bench-db-{index}', 'payment_address': PAYMENT_ADDRESS, 'from_address': f'bench-sender-{index}',
+            'nch_amount': REQUIRED_NCH, 'verified_at': datetime.now()
+        })
+
+    def save_subscription(index: int) -> str:
+        db_utils.save_bot_subscription({
+            'telegram_id': 3_000_000 + index, 'bot_name': BOT_NAME, 'bot_username': 'bench_bot',
+            'payment_address': f'bench-holder-{index}', 'expires_at': expires_at
+        })
+        return 'ok'
+
+    def add_user(index: int) -> str:
+        db_utils.add_user(4_000_000 + index, f'bench_user_{index}')
+        return 'ok'
+
+    def subscription_expiry(index: int) -> str:
+        found = db_utils.get_subscription_expiry(3_000_000 + index % 100, BOT_NAME)
+        return 'hit' if found else 'miss'
+
+    def subscription_expiries(index: int) -> str:
+        db_utils.get_subscription_expiries(3_000_000 + index % 100, bot_names)
+        return 'ok'
+
+    def verified_transaction(index: int) -> str:
+        return 'found' if db_utils.get_verified_transaction(f'bench-db-{index}') else 'missing'
+
+    results = {}
+    for name, call in (('save_bot_subscription', save_subscription), ('add_user', add_user),
+                       ('get_subscription_expiry', subscription_expiry),
+                       ('get_subscription_expiries', subscription_expiries),
+                       ('get_verified_transaction', verified_transaction)):
+        results[f'db.{name}'] = run_load(call, requests, concurrency)
+    db_utils.flush_writes(timeout=30)
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app against local fake upstreams')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=200, help='Calls per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of upstream calls that fail')
+    parser.add_argument('--failure-status', type=int, default=503)
+    parser.add_argument('--faults-on', default='explorer,rpc,telegram', help='Fakes that get the injected faults')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--telegram-rate', type=float, default=1000,
+                        help='TELEGRAM_GLOBAL_RATE for the run; the production 30/s would cap poll_updates')
+    parser.add_argument('--job-timeout', type=float, default=60, help='Give up waiting for one job or reply')
+    parser.add_argument('--poll-interval-ms', type=float, default=10)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--verbose', action='store_true', help='Keep the application logs')
+    args = parser.parse_args()
+    args.faults_on = [name for name in args.faults_on.split(',') if name]
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Keep stdout for the report, whatever the app or its dependencies write there
+    with redirect_stdout(sys.stderr):
+        env = Environment(args)
+        if not args.verbose:
+            logging.disable(logging.WARNING)
+        try:
+            results = {}
+            for name in scenarios:
+                print(f"[bench] {name} ...", file=sys.stderr)
+                if name == 'check_bot_access':
+                    results[name] = bench_check_bot_access(env, args.requests, args.concurrency)
+                elif name == 'verify_bot_payment':
+                    results[name] = bench_verify_bot_payment(env, args.requests, args.concurrency)
+                elif name == 'poll_updates':
+                    results[name] = bench_poll_updates(env, args.requests, args.concurrency)
+                elif name == 'db':
+                    results.update(bench_db(env, args.requests, args.concurrency))
+            upstream_requests = {
+                'explorer': len(env.explorer.requests),
+                'rpc': len(env.rpc.requests),
+                'telegram': len(env.telegram.requests),
+            }
+        finally:
+            env.close()
+
+    report = {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'faults': {
+                'on': args.faults_on,
+                'latency_ms': args.latency_ms,
+                'jitter_ms': args.jitter_ms,
+                'failure_rate': args.failure_rate,
+                'failure_status': args.failure_status,
+            },
+            'telegram_rate': args.telegram_rate,
+            'upstream_requests': upstream_requests,
+        },
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"[bench] Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import multiprocessing
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Threaded workers so a blocking upstream call holds a thread, not a whole
+# process. An open SSE stream keeps its thread for the client's whole
+# connection, so this server only takes SIGNAL_STREAM_MAX_CLIENTS of them per
+# worker; put gunicorn_stream.conf.py in front of /api/signals/stream instead.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app (and its caches, templates, bot catalog) once in the master
+# and share it copy-on-write; no background threads are started before fork.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Counters restart from zero with the server; drop the previous run's worker files
+    from utils.metrics_utils import clear_shared_metrics
+    clear_shared_metrics()
+
+
+def post_fork(server, worker):
+    from app import start_worker
+    start_worker()
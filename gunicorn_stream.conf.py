@@ -0,0 +1,28 @@
+import os
+
+# Serves /api/signals/stream next to the main server (gunicorn.conf.py):
+#   gunicorn -c gunicorn_stream.conf.py wsgi:application
+# with the reverse proxy routing only that path here. Idle Server-Sent Events
+# connections cost a greenlet each instead of a thread. Workers mirror the
+# signal snapshot the main server's leader publishes in RUNTIME_DIR, so both
+# servers must share it (same host).
+bind = os.getenv('STREAM_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('STREAM_WORKERS', 2))
+worker_class = 'gevent'
+# Room for SIGNAL_STREAM_MAX_ASYNC_CLIENTS streams plus reconnects in flight
+worker_connections = int(os.getenv('SIGNAL_STREAM_MAX_ASYNC_CLIENTS', 2000)) + 100
+# Long-lived streams are expected; heartbeats keep the worker responsive
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app after gevent has patched the worker, not in the master
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    from app import start_stream_worker
+    start_stream_worker()
@@ -10,75 +10,20 @@
 
     // Centralized Configuration
     const CONFIG = {
-        PAYMENT: {
-            ADDRESS: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_SPOT_BINANCE: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_SPOT_KUCOIN: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_SPOT_OKX: "# Address goes here",
-            PAYMENT_ADDRESS_XRP_SPOT_BINANCE: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_PERPETUAL_BINANCE: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_PERPETUAL_KUCOIN: "# Address goes here",
-            PAYMENT_ADDRESS_DOGE_PERPETUAL_OKX: "# Address goes here",
-            PAYMENT_ADDRESS_XRP_PERPETUAL_BINANCE: "# Address goes here",
-            REQUIRED_NCH: 300000,
-            MINIMUM_NESS: 4000
+        CATALOG: {
+            URL: '/api/bots',  // Generated from the server's bot payment configs
+            STORAGE_KEY: 'botCatalog'
+        },
+        VERIFICATION: {
+            POLL_INTERVAL_MS: 1500,
+            POLL_TIMEOUT_MS: 180000
         },
         API: {
-            MARKET_DATA: 'https://api.coingecko.com/api/v3/coins/markets',
-            SIGNAL_ALERTS: 'https://api.cryptosignals.com/v1/signals'
+            MARKET_DATA: '/api/market_data',  // Cached server-side proxy of CoinGecko markets
+            SIGNAL_STREAM: '/api/signals/stream'  // Server-Sent Events fan-out of signal alerts
         },
-        BOT_USERNAMES: {
-            // Bot username mappings
-            'Doge_Spot_Binance': 'Stoneyard_Doge_Bot',
-            'Doge_Spot_Kucoin': 'Stoneyard_Doge_Bot',
-            'Doge_Spot_Okx': 'Stoneyard_Doge_Bot',
-
-            'XRP_Spot_Binance': 'Stoneyard_XRP_Bot',
-            'XRP_Spot_Kucoin': 'Stoneyard_XRP_Bot',
-            'XRP_Spot_Okx': 'Stoneyard_XRP_Bot',
-
-            'ETH_Spot_Binance': 'Stoneyard_ETH_Bot',
-            'ETH_Spot_Kucoin': 'Stoneyard_ETH_Bot',
-            'ETH_Spot_Okx': 'Stoneyard_ETH_Bot',
-            
-            'BTC_Spot_Binance': 'Stoneyard_BTC_Bot',
-            'BTC_Spot_Kucoin': 'Stoneyard_BTC_Bot',
-            'BTC_Spot_Okx': 'Stoneyard_BTC_Bot',
-
-            'SOL_Spot_Binance': 'Stoneyard_SOL_Bot',
-            'SOL_Spot_Kucoin': 'Stoneyard_SOL_Bot',
-            'SOL_Spot_Okx': 'Stoneyard_SOL_Bot',
-
-            'AVAX_Spot_Binance': 'Stoneyard_AVAX_Bot',
-            'AVAX_Spot_Kucoin': 'Stoneyard_AVAX_Bot',
-            'AVAX_Spot_Okx': 'Stoneyard_AVAX_Bot',
-
-             //Perpetual Trading bots
-
-            'Doge_Perpetual_Binance': 'Stoneyard_Doge_Bot',
-            'Doge_Perpetual_Kucoin': 'Stoneyard_Doge_Bot',
-            'Doge_Perpetual_OKX': 'Stoneyard_Doge_Bot',
-
-            'XRP_Perpetual_Binance': 'Stoneyard_XRP_Bot',
-            'XRP_Perpetual_Kucoin': 'Stoneyard_XRP_Bot',
-            'XRP_Perpetual_OKX': 'Stoneyard_XRP_Bot',
-
-            'ETH_Perpetual_Binance': 'Stoneyard_ETH_Bot',
-            'ETH_Perpetual_Kucoin': 'Stoneyard_ETH_Bot',
-            'ETH_Perpetual_OKX': 'Stoneyard_ETH_Bot',
-
-            'BTC_Perpetual_Binance': 'Stoneyard_BTC_Bot',
-            'BTC_Perpetual_Kucoin': 'Stoneyard_BTC_Bot',
-            'BTC_Perpetual_OKX': 'Stoneyard_BTC_Bot',
-
-            'SOL_Perpetual_Binance': 'Stoneyard_SOL_Bot',
-            'SOL_Perpetual_Kucoin': 'Stoneyard_SOL_Bot',
-            'SOL_Perpetual_OKX': 'Stoneyard_SOL_Bot',
-
-            'AVAX_Perpetual_Binance': 'Stoneyard_AVAX_Bot',
-            'AVAX_Perpetual_Kucoin': 'Stoneyard_AVAX_Bot',
-            'AVAX_Perpetual_OKX': 'Stoneyard_AVAX_Bot',
-            // Add more bot username mappings
+        SIGNALS: {
+            MAX_ALERTS: 5
         }
     };
 
@@ -93,141 +38,50 @@
     };
 
 
-    // Bot Configurations
-    const botConfigurations = {
-        'Doge_Spot_Binance': {
-            name: 'Doge Spot Bot (Binance)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_SPOT_BINANCE,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
-        'Doge_Spot_Kucoin': {
-            name: 'Doge Spot Bot (Kucoin)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_SPOT_KUCOIN,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
-        'Doge_Spot_OKX': {
-            name: 'Doge Spot Bot (OKX)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_SPOT_OKX,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
-        'XRP_Spot_Binance': {
-            name: 'XRP Spot Bot (Binance)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_XRP_SPOT_BINANCE,
-            botUsername: 'Stoneyard_XRP_Bot'
-        },
-        
-        
-    
-        // Additional bot configurations following the same pattern
-
-        'Doge_Perpetual_Binance': {
-            name: 'Doge Perpetual Bot (Binance)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_PERPETUAL_BINANCE,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
-        'Doge_Perpetual_Kucoin': {
-            name: 'Doge Perpetual Bot (Kucoin)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_PERPETUAL_KUCOIN,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
-        'Doge_Perpetual_OKX': {
-            name: 'Doge Perpetual Bot (OKX)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_DOGE_PERPETUAL_OKX,
-            botUsername: 'Stoneyard_Doge_Bot'
-        },
+    // Bot Catalog, keyed by bot key once loaded
+    let botCatalog = {};
 
-        'XRP_Perpetual_Binance': {
-            name: 'XRP Perpetual Bot (Binance)',
-            requiredNCH: CONFIG.PAYMENT.REQUIRED_NCH,
-            minimumNESS: CONFIG.PAYMENT.MINIMUM_NESS,
-            paymentAddress: CONFIG.PAYMENT.PAYMENT_ADDRESS_XRP_PERPETUAL_BINANCE,
-            botUsername: 'Stoneyard_XRP_Bot'
-        },
-        
-        
-        // Continue with other bot configurations
-    };
+    function renderBotCatalog(catalog) {
+        botCatalog = {};
+        catalog.bots.forEach(bot => { botCatalog[bot.key] = bot; });
+        populateBotTable(catalog.bots.filter(bot => bot.trading_type === 'Spot'), 'spot-bot-link');
+        populateBotTable(catalog.bots.filter(bot => bot.trading_type === 'Perpetual'), 'perpetual-bot-link');
+    }
 
-    // Bot Lists
-    const spotBots = [
-        { 
-            name: 'Doge', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'Binance', 
-            botKey: 'Doge_Spot_Binance',
-            botUsername: 'Stoneyard_Doge_Bot' 
-        },
-        { 
-            name: 'Doge', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'Kucoin', 
-            botKey: 'Doge_Spot_Kucoin',
-            botUsername: 'Stoneyard_Doge_Bot' 
-        },
-        { 
-            name: 'Doge', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'OKX', 
-            botKey: 'Doge_Spot_OKX',
-            botUsername: 'Stoneyard_Doge_Bot' 
-        },
-        { 
-            name: 'Doge', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'OKX', 
-            botKey: 'Doge_Spot_OKX',
-            botUsername: 'Stoneyard_Doge_Bot' 
-        },
-       
-        // Add more spot bots
-    ];
-
-    const perpetualBots = [
-        { 
-            name: 'Doge Perpetual', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'Binance', 
-            botKey: 'Doge_Perpetual_Binance',
-            botUsername: 'Stoneyard_Perpetual_Doge_Bot' 
-        },
-        { 
-            name: 'Doge Perpetual', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'Kucoin', 
-            botKey: 'Doge_Perpetual_Kucoin',
-            botUsername: 'Stoneyard_Perpetual_Doge_Bot' 
-        },
-        { 
-            name: 'Doge Perpetual', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'OKX', 
-            botKey: 'Doge_Perpetual_OKX',
-            botUsername: 'Stoneyard_Perpetual_Doge_Bot' 
-        },
+    // Render the cached catalog straight away, then revalidate it by version
+    function loadBotCatalog() {
+        let cached = null;
+        try {
+            cached = JSON.parse(window.localStorage.getItem(CONFIG.CATALOG.STORAGE_KEY));
+        } catch (e) {
+            cached = null;
+        }
+        if (cached) {
+            renderBotCatalog(cached);
+        }
 
-        { 
-            name: 'XRP Perpetual', 
-            price: `${CONFIG.PAYMENT.REQUIRED_NCH} NCH`, 
-            exchange: 'Binance', 
-            botKey: 'XRP_Perpetual_Binance',
-            botUsername: 'Stoneyard_Perpetual_XRP_Bot' 
-        },
-        // Add more perpetual bots
-    ];
+        $.ajax({
+            url: CONFIG.CATALOG.URL,
+            method: 'GET',
+            headers: cached ? { 'If-None-Match': `"${cached.version}"` } : {},
+            success: function(catalog, status, xhr) {
+                if (xhr.status === 304 || (cached && catalog.version === cached.version)) {
+                    return;
+                }
+                try {
+                    window.localStorage.setItem(CONFIG.CATALOG.STORAGE_KEY, JSON.stringify(catalog));
+                } catch (e) {
+                    // Storage full or disabled; the catalog still renders
+                }
+                renderBotCatalog(catalog);
+            },
+            error: function(err) {
+                if (!cached) {
+                    Logger.error('Bot Catalog Fetch', err);
+                }
+            }
+        });
+    }
 
     // Telegram WebApp Initialization
     function initTelegramWebApp() {
@@ -250,11 +104,47 @@
 
     
     // Populate bot tables
-    populateBotTable(spotBots, 'spot-bot-link');
-    populateBotTable(perpetualBots, 'perpetual-bot-link');
+    loadBotCatalog();
+    loadAccessMap();
+
+    // Access map for every bot, fetched once on load and reused until it goes stale
+    let accessMap = null;
+
+    function loadAccessMap() {
+        const user = window.Telegram && window.Telegram.WebApp.initDataUnsafe.user;
+        if (!user) {
+            return Promise.resolve(null);
+        }
+        return new Promise(resolve => {
+            $.ajax({
+                url: '/telegram/check_bot_access_batch',
+                method: 'POST',
+                data: JSON.stringify({ telegram_id: user.id }),
+                contentType: 'application/json',
+                success: function(response) {
+                    accessMap = {
+                        bots: response.access,
+                        validUntil: Date.now() + response.valid_for * 1000
+                    };
+                    resolve(accessMap);
+                },
+                error: function(err) {
+                    console.error('[Access Prefetch] Error:', err);
+                    resolve(null);
+                }
+            });
+        });
+    }
 
     // Check Bot Access Function
     function checkBotAccess(botName) {
+        if (accessMap && Date.now() < accessMap.validUntil && accessMap.bots[botName]) {
+            return Promise.resolve(accessMap.bots[botName]);
+        }
+        if (accessMap) {
+            accessMap = null;
+            loadAccessMap();  // Refresh in the background; this click falls through to a single check
+        }
         return new Promise((resolve, reject) => {
             $.ajax({
                 url: '/telegram/check_bot_access',
@@ -273,6 +163,11 @@
 
    // Show Payment Modal Function
    function showPaymentModal(botName) {
+    const bot = botCatalog[botName];
+    if (!bot) {
+        Logger.error('Payment Modal', `Unknown bot ${botName}`);
+        return;
+    }
     // Create the modal HTML
     const modalHtml = `
         <div class="payment-modal" style="background-color: white; color: #555; border-radius: 10px; padding: 20px; width: 300px; box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2); position: fixed; top: 50%; left: 50%; transform: translate(-50%, -50%); z-index: 1000;">
@@ -280,10 +175,10 @@
             <div class="payment-details" style="margin-top: 10px;">
                 <p>Bot Access Requirements:</p>
                 <ul style="list-style-type: none; padding: 0;">
-                    <li>Send <strong>${CONFIG.PAYMENT.REQUIRED_NCH} NCH</strong> to:</li>
-                    <code id="paymentAddress" style="display: block; background-color: #f9f9f9; padding: 5px; border-radius: 5px;">${CONFIG.PAYMENT.ADDRESS}</code>
+                    <li>Send <strong>${bot.required_nch} NCH</strong> to:</li>
+                    <code id="paymentAddress" style="display: block; background-color: #f9f9f9; padding: 5px; border-radius: 5px;">${bot.payment_address}</code>
                     <button id="copyAddressBtn" style="margin-top: 5px; padding: 5px; background-color: #1e90ff; color: white; border: none; border-radius: 5px; cursor: pointer;">Copy Address</button>
-                    <li>Minimum NESS Balance: <strong>${CONFIG.PAYMENT.MINIMUM_NESS}</strong></li>
+                    <li>Minimum NESS Balance: <strong>${bot.minimum_ness}</strong></li>
                 </ul>
                 <input type="text" id="txHash" placeholder="Transaction Hash" style="width:92%; padding: 10px; margin-top: 10px; border: 1px solid #ccc; border-radius: 5px;">
                 <button id="verifyPaymentBtn" data-bot-name="${botName}" style="margin-top: 10px; padding: 10px; background-color: #1e90ff; color: white; border: none; border-radius: 5px; cursor: pointer; width: 100%;">Verify Payment</button>
@@ -320,7 +215,7 @@
 
    /* function showPaymentModal(botName) {
         // Simplified alert for debugging
-        alert(`Access denied for ${botName}. Please send ${CONFIG.PAYMENT.REQUIRED_NCH} NCH to ${CONFIG.PAYMENT.ADDRESS} to subscribe.`);
+        alert(`Access denied for ${botName}. Please send the required NCH to subscribe.`);
         
         
     }*/
@@ -332,6 +227,7 @@
         // Show loading spinner
         $('.payment-details').append('<p id="paymentStatus" style="color: #1e90ff; margin-top: 10px;">🔄 Checking transaction...</p>');
     
+        // Submit the verification job, then poll for its result
         $.ajax({
             url: '/telegram/verify_bot_payment',
             method: 'POST',
@@ -342,22 +238,40 @@
             }),
             contentType: 'application/json',
             success: function(response) {
-                if (response.success) {
-                    $('#paymentStatus').html('✅ Payment Verified! Access Granted.');
-                    // Delay closing modal for user confirmation
-                    setTimeout(() => {
-                        $('.payment-modal').remove(); // Close modal
-                        window.Telegram.WebApp.showAlert(`Access Granted: ${botName}!`, () => {
-                            openBotInterface(botName);
-                        });
-                    }, 2000);
+                if (response.job_id) {
+                    pollVerificationJob(botName, response.job_id, Date.now());
                 } else {
-                    if (response.message.includes("Explorer unreachable")) {
-                        $('#paymentStatus').html('⚠️ Blockchain explorer seems to be down. Please try again later.');
-                    } else {
-                        $('#paymentStatus').html(`❌ ${response.message}`);
-                    }
-                    $('#verifyPaymentBtn').prop('disabled', false).text('Verify Payment'); // Re-enable button
+                    handleVerificationResult(botName, response);
+                }
+            },
+            error: function(err) {
+                if (err.responseJSON && err.responseJSON.message) {
+                    handleVerificationResult(botName, err.responseJSON);
+                    return;
+                }
+                Logger.error('Payment Verification', err);
+                $('#paymentStatus').html('❌ Error verifying payment. Please try again.');
+                $('#verifyPaymentBtn').prop('disabled', false).text('Verify Payment'); // Re-enable button
+            }
+        });
+    }
+
+    // Poll a queued verification job until it finishes
+    function pollVerificationJob(botName, jobId, startedAt) {
+        if (Date.now() - startedAt > CONFIG.VERIFICATION.POLL_TIMEOUT_MS) {
+            $('#paymentStatus').html('⚠️ Verification is taking longer than expected. Please try again later.');
+            $('#verifyPaymentBtn').prop('disabled', false).text('Verify Payment'); // Re-enable button
+            return;
+        }
+
+        $.ajax({
+            url: `/telegram/verify_bot_payment/${jobId}`,
+            method: 'GET',
+            success: function(job) {
+                if (job.status === 'done' || job.status === 'failed') {
+                    handleVerificationResult(botName, job.result);
+                } else {
+                    setTimeout(() => pollVerificationJob(botName, jobId, startedAt), CONFIG.VERIFICATION.POLL_INTERVAL_MS);
                 }
             },
             error: function(err) {
@@ -367,12 +281,37 @@
             }
         });
     }
+
+    // Show the outcome of a payment verification
+    function handleVerificationResult(botName, response) {
+        if (response.success) {
+            if (accessMap) {
+                accessMap.bots[botName] = { access: true };
+            }
+            $('#paymentStatus').html('✅ Payment Verified! Access Granted.');
+            // Delay closing modal for user confirmation
+            setTimeout(() => {
+                $('.payment-modal').remove(); // Close modal
+                window.Telegram.WebApp.showAlert(`Access Granted: ${botName}!`, () => {
+                    openBotInterface(botName);
+                });
+            }, 2000);
+        } else {
+            if (response.message.includes("Explorer unreachable")) {
+                $('#paymentStatus').html('⚠️ Blockchain explorer seems to be down. Please try again later.');
+            } else {
+                $('#paymentStatus').html(`❌ ${response.message}`);
+            }
+            $('#verifyPaymentBtn').prop('disabled', false).text('Verify Payment'); // Re-enable button
+        }
+    }
     
 
 
     // Open Bot Interface Function
     function openBotInterface(botName) {
-        const botUsername = CONFIG.BOT_USERNAMES[botName] || 'PrivateNess_Bot';
+        const bot = botCatalog[botName];
+        const botUsername = bot ? bot.bot_username : 'PrivateNess_Bot';
         window.location.href = `https://t.me/${botUsername}`;
     }
 
@@ -381,13 +320,6 @@
         $.ajax({
             url: CONFIG.API.MARKET_DATA,
             method: 'GET',
-            data: {
-                vs_currency: 'usd',
-                order: 'market_cap_desc',
-                per_page: 5,
-                page: 1,
-                sparkline: false
-            },
             success: function(data) {
                 $('#market-data tbody').empty();
                 data.forEach(coin => {
@@ -406,26 +338,29 @@
         });
     }
 
-    // Fetch Signal Alerts
-    function fetchSignalAlerts() {
-        $.ajax({
-            url: CONFIG.API.SIGNAL_ALERTS,
-            method: 'GET',
-            success: function(data) {
-                $('#alerts').empty();
-                data.slice(0, 5).forEach(signal => {
-                    $('#alerts').append(`<div class='alert fade-in'>${signal.message}</div>`);
-                });
-            },
-            error: function(err) {
-                Logger.error('Signal Alerts Fetch', err);
-            }
+    // Subscribe to Signal Alerts
+    // The server replays recent alerts on connect and pushes new ones as they arrive;
+    // EventSource reconnects on its own and resumes from the last event id.
+    function subscribeSignalAlerts() {
+        if (!window.EventSource) {
+            Logger.error('Signal Alerts Stream', 'EventSource is not supported');
+            return;
+        }
+
+        const source = new EventSource(CONFIG.API.SIGNAL_STREAM);
+        source.addEventListener('signal', function(event) {
+            const signal = JSON.parse(event.data);
+            $('#alerts').prepend($("<div class='alert fade-in'></div>").text(signal.message));
+            $('#alerts .alert').slice(CONFIG.SIGNALS.MAX_ALERTS).remove();
         });
+        source.onerror = function(err) {
+            Logger.error('Signal Alerts Stream', err);
+        };
     }
 
     // Fetch data on page load
     fetchMarketData();
-    fetchSignalAlerts();
+    subscribeSignalAlerts();
 
     // Populate Bot Table Function
     function populateBotTable(bots, tableId) {
@@ -438,11 +373,11 @@
                     <td>
                         <a href="#" 
                            class="bot-link" 
-                           data-bot-name="${bot.botKey}">
+                           data-bot-name="${bot.key}">
                             ${bot.name}
                         </a>
                     </td>
-                    <td>${bot.price}</td>
+                    <td>${bot.required_nch} NCH</td>
                     <td>${bot.exchange}</td>
                 </tr>
             `);
@@ -452,8 +387,8 @@
 
     // Document Ready Function
     $(document).ready(function() {
-        // Attach click handlers to bot links
-        $('.bot-link').on('click', function(e) {
+        // Bot rows are rendered from the catalog, so delegate the click handler
+        $(document).on('click', '.bot-link', function(e) {
             e.preventDefault(); // Prevent default link behavior
             const botName = $(this).data('bot-name'); // Get the bot name from data attribute
 
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Config reads the environment at import time: keep logs and runtime files out of the checkout
+_runtime_dir = tempfile.mkdtemp(prefix='ness-tests-')
+os.environ['RUNTIME_DIR'] = _runtime_dir
+os.environ['LOG_FILE'] = os.path.join(_runtime_dir, 'app.log')
+os.environ.setdefault('SELENIUM_FALLBACK_ENABLED', 'false')
+os.environ.setdefault('WARM_UP_ON_START', 'false')
+
+import pytest
+from utils.config import Config
+from utils.db_utils import initialize_db, close_db_connection, flush_writes, invalidate_subscription_cache
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    A fresh database file for the test, with a short busy timeout so lock contention fails fast.
+    """
+    monkeypatch.setattr(Config, 'DB_PATH', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(Config, 'DB_BUSY_TIMEOUT', 0.1)
+    invalidate_subscription_cache()
+    initialize_db()
+    yield Config.DB_PATH
+    flush_writes(timeout=5)
+    close_db_connection()
+    invalidate_subscription_cache()
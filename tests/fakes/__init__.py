@@ -0,0 +1,4 @@
+"""
+Local stand-ins for the external services the app talks to,
+so clients can be exercised offline.
+"""
@@ -0,0 +1,118 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Tuple
+from tests.fakes.faults import FaultInjector
+
+DROPLETS_PER_COIN = 1_000_000
+
+
+class FakeExplorer:
+    """
+    In-process stand-in for the NESS explorer's JSON backend.
+
+    Usage:
+        with FakeExplorer() as explorer:
+            explorer.add_transaction('abc', 'sender', [('bot_address', 300000)])
+            client = ExplorerClient(explorer.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.balances: Dict[str, float] = {}
+        self.requests: List[str] = []
+        self.faults = FaultInjector()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_transaction(self, tx_hash: str, sender: str, outputs: List[Tuple[str, int]], confirmed: bool = True):
+        """
+        Register a transaction sending `hours` to each `(address, hours)` in `outputs`.
+        """
+        self.transactions[tx_hash] = {
+            'status': {'confirmed': confirmed, 'unconfirmed': not confirmed, 'height': 1 if confirmed else 0},
+            'time': 0,
+            'txn': {
+                'txid': tx_hash,
+                'inputs': [{'uxid': f'{tx_hash}-in', 'owner': sender, 'coins': '1.000000', 'hours': 0}],
+                'outputs': [
+                    {'uxid': f'{tx_hash}-out-{index}', 'dst': address, 'coins': '1.000000', 'hours': hours}
+                    for index, (address, hours) in enumerate(outputs)
+                ],
+            },
+        }
+
+    def set_balance(self, address: str, coins: float):
+        self.balances[address] = coins
+
+    def _make_handler(self):
+        explorer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                explorer.requests.append(parsed.path)
+                if explorer.faults.apply(self):
+                    return
+
+                if parsed.path == '/api/transaction':
+                    tx = explorer.transactions.get(query.get('txid', [''])[0])
+                    if tx is None:
+                        return self._send_json(404, {'error': 'transaction not found'})
+                    return self._send_json(200, tx)
+
+                if parsed.path == '/api/balance':
+                    address = query.get('addrs', [''])[0]
+                    droplets = int(explorer.balances.get(address, 0) * DROPLETS_PER_COIN)
+                    balance = {'coins': droplets, 'hours': 0}
+                    return self._send_json(200, {'confirmed': balance, 'predicted': balance})
+
+                return self._send_json(404, {'error': 'not found'})
+
+        return Handler
+
+    def start(self) -> 'FakeExplorer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeExplorer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stand-in NESS explorer backend')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+
+    server = FakeExplorer(port=args.port)
+    print(f"Fake explorer listening on {server.url} (point EXPLORER_URL here)")
+    server._server.serve_forever()
@@ -0,0 +1,56 @@
+import json
+import time
+import random
+import threading
+from typing import Optional
+
+
+class FaultInjector:
+    """
+    Latency and failure injection shared by the fake servers.
+
+    Every request first sleeps `latency` (+/- `jitter`) seconds; a
+    `failure_rate` fraction of them is then answered with `failure_status`
+    instead of being handled.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 failure_status: int = 503, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.injected_failures = 0
+
+    def configure(self, seed: Optional[int] = None, **settings) -> 'FaultInjector':
+        if seed is not None:
+            self._random.seed(seed)
+        for name, value in settings.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"Unknown fault setting: {name}")
+            setattr(self, name, value)
+        return self
+
+    def apply(self, handler) -> bool:
+        """
+        Delay the request and maybe fail it. Returns True when the handler must not answer it.
+        """
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)) if self.latency or self.jitter else 0.0
+            fail = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if fail:
+                self.injected_failures += 1
+        if delay:
+            time.sleep(delay)
+        if not fail:
+            return False
+
+        body = json.dumps({'ok': False, 'error': 'injected failure'}).encode()
+        handler.send_response(self.failure_status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return True
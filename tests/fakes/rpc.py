@@ -0,0 +1,105 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List
+from tests.fakes.faults import FaultInjector
+
+
+class FakeRPC:
+    """
+    In-process stand-in for the NESS node's JSON-RPC endpoint.
+
+    Answers `validate_transaction` for registered transactions and returns a
+    JSON-RPC error for anything else.
+
+    Usage:
+        with FakeRPC() as rpc:
+            rpc.add_transaction('abc', 'sender', 300000, 'bot_address')
+            client = PrivatenessBlockchainClient(rpc_url=rpc.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[str] = []
+        self.faults = FaultInjector()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_transaction(self, tx_hash: str, sender: str, nch_amount: int, recipient: str, confirmed: bool = True):
+        """
+        Register a transaction sending `nch_amount` hours from `sender` to `recipient`.
+        """
+        self.transactions[tx_hash] = {
+            'valid': confirmed, 'from_address': sender, 'to_address': recipient, 'nch_amount': nch_amount
+        }
+
+    def _make_handler(self):
+        rpc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                method = payload.get('method', '')
+                rpc.requests.append(method)
+                if rpc.faults.apply(self):
+                    return
+
+                response = {'jsonrpc': '2.0', 'id': payload.get('id')}
+                if method == 'validate_transaction':
+                    tx_hash = (payload.get('params') or [''])[0]
+                    tx = rpc.transactions.get(tx_hash)
+                    if tx is not None:
+                        response['result'] = tx
+                        return self._send_json(200, response)
+                    response['error'] = {'code': -32000, 'message': 'transaction not found'}
+                    return self._send_json(200, response)
+
+                response['error'] = {'code': -32601, 'message': 'Method not found'}
+                return self._send_json(200, response)
+
+        return Handler
+
+    def start(self) -> 'FakeRPC':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeRPC':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stand-in NESS JSON-RPC node')
+    parser.add_argument('--port', type=int, default=6660)
+    args = parser.parse_args()
+
+    server = FakeRPC(port=args.port)
+    print(f"Fake RPC node listening on {server.url} (point RPC_URL here)")
+    server._server.serve_forever()
@@ -0,0 +1,203 @@
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Optional
+from tests.fakes.faults import FaultInjector
+
+
+class FakeTelegram:
+    """
+    In-process stand-in for the Telegram Bot API.
+
+    Records outgoing calls and feeds updates either through getUpdates
+    long-polling or, once setWebhook has been called, by POSTing them to the
+    registered webhook with the secret token header.
+
+    Usage:
+        with FakeTelegram() as telegram:
+            bot = TelegramBot(api_url=telegram.url)
+            telegram.push_message(42, '/start')
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.sent_messages: List[Dict[str, Any]] = []
+        self.sent_times: List[float] = []  # time.monotonic() each sendMessage arrived
+        self.faults = FaultInjector()
+        self._sent_by_chat: Dict[Any, int] = {}
+        self._sent_cond = threading.Condition()
+        self.requests: List[str] = []
+        self.webhook: Optional[Dict[str, Any]] = None
+        self.webhook_responses: List[int] = []
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._cond = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def push_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Deliver an update: POSTed to the webhook if one is set, otherwise queued for getUpdates.
+        """
+        with self._cond:
+            update = dict(update, update_id=self._next_update_id)
+            self._next_update_id += 1
+            webhook = self.webhook
+
+        if webhook is not None:
+            self._deliver(webhook, update)
+            return update
+
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+        return update
+
+    def push_message(self, chat_id: int, text: str, username: str = 'tester') -> Dict[str, Any]:
+        return self.push_update({
+            'message': {
+                'message_id': self._next_update_id,
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'username': username},
+                'text': text,
+            }
+        })
+
+    def wait_for_messages(self, chat_id, count: int = 1, timeout: float = 10) -> bool:
+        """
+        Block until `count` messages have been sent to `chat_id`. Returns False on timeout.
+        """
+        with self._sent_cond:
+            return self._sent_cond.wait_for(lambda: self._sent_by_chat.get(chat_id, 0) >= count, timeout)
+
+    def _deliver(self, webhook: Dict[str, Any], update: Dict[str, Any]):
+        request = urllib.request.Request(
+            webhook['url'],
+            data=json.dumps(update).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        if webhook.get('secret_token'):
+            request.add_header('X-Telegram-Bot-Api-Secret-Token', webhook['secret_token'])
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                self.webhook_responses.append(response.status)
+        except urllib.error.HTTPError as e:
+            self.webhook_responses.append(e.code)
+
+    def _get_updates(self, offset: int, timeout: float) -> List[Dict[str, Any]]:
+        with self._cond:
+            # Confirming an offset drops every earlier update, as the real API does
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            if not self._updates and timeout > 0:
+                self._cond.wait(timeout)
+            return list(self._updates)
+
+    def _make_handler(self):
+        telegram = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _params(self) -> Dict[str, Any]:
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    params.update(json.loads(self.rfile.read(length)))
+                return params
+
+            def _handle(self):
+                path = urlparse(self.path).path
+                method = path.rsplit('/', 1)[-1]
+                telegram.requests.append(method)
+                params = self._params()
+                # Long-polls are left alone so injected latency only slows real API calls
+                if method != 'getUpdates' and telegram.faults.apply(self):
+                    return
+
+                if method == 'sendMessage':
+                    with telegram._sent_cond:
+                        telegram.sent_messages.append(params)
+                        telegram.sent_times.append(time.monotonic())
+                        chat_id = params.get('chat_id')
+                        telegram._sent_by_chat[chat_id] = telegram._sent_by_chat.get(chat_id, 0) + 1
+                        telegram._sent_cond.notify_all()
+                    return self._send_json(200, {'ok': True, 'result': {'message_id': len(telegram.sent_messages)}})
+
+                if method == 'getUpdates':
+                    if telegram.webhook is not None:
+                        return self._send_json(409, {'ok': False, 'description': 'Conflict: webhook is active'})
+                    updates = telegram._get_updates(int(params.get('offset', 0)), float(params.get('timeout', 0)))
+                    return self._send_json(200, {'ok': True, 'result': updates})
+
+                if method == 'setWebhook':
+                    telegram.webhook = {'url': params['url'], 'secret_token': params.get('secret_token')}
+                    return self._send_json(200, {'ok': True, 'result': True, 'description': 'Webhook was set'})
+
+                if method == 'deleteWebhook':
+                    telegram.webhook = None
+                    return self._send_json(200, {'ok': True, 'result': True, 'description': 'Webhook was deleted'})
+
+                if method == 'getWebhookInfo':
+                    with telegram._cond:
+                        pending = len(telegram._updates)
+                    info = {'url': telegram.webhook['url'] if telegram.webhook else '', 'pending_update_count': pending}
+                    return self._send_json(200, {'ok': True, 'result': info})
+
+                if method == 'setChatMenuButton':
+                    return self._send_json(200, {'ok': True, 'result': True})
+
+                return self._send_json(404, {'ok': False, 'description': 'Not Found'})
+
+            do_GET = _handle
+            do_POST = _handle
+
+        return Handler
+
+    def start(self) -> 'FakeTelegram':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeTelegram':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stand-in Telegram Bot API')
+    parser.add_argument('--port', type=int, default=8002)
+    args = parser.parse_args()
+
+    server = FakeTelegram(port=args.port)
+    print(f"Fake Telegram API listening on {server.url} (point TELEGRAM_API_URL here)")
+    server._server.serve_forever()
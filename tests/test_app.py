@@ -0,0 +1,81 @@
+import pytest
+from utils.config import Config
+
+SECRET = 's3cret'
+UPDATE = {'update_id': 1, 'message': {'chat': {'id': 7}, 'from': {'id': 7}, 'text': '/help'}}
+
+
+@pytest.fixture
+def service():
+    import app as service
+    return service
+
+
+@pytest.fixture
+def client(service):
+    return service.app.test_client()
+
+
+@pytest.fixture
+def submitted(service, monkeypatch):
+    monkeypatch.setattr(Config, 'TELEGRAM_UPDATE_MODE', 'webhook')
+    monkeypatch.setattr(Config, 'TELEGRAM_WEBHOOK_SECRET', SECRET)
+    updates = []
+    monkeypatch.setattr(service.update_dispatcher, 'submit', lambda update: updates.append(update) or True)
+    return updates
+
+
+def test_webhook_accepts_matching_secrets(client, submitted):
+    response = client.post(f'/telegram/webhook/{SECRET}', json=UPDATE,
+                           headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+    assert response.status_code == 200
+    assert submitted == [UPDATE]
+
+
+@pytest.mark.parametrize('path_secret, header_secret', [
+    ('wrong', SECRET),
+    (SECRET, 'wrong'),
+    (SECRET, None),
+    ('s%C3%A9cret', SECRET),  # Non-ASCII path segment
+    (SECRET, 'sécret'),  # Non-ASCII header value
+])
+def test_webhook_rejects_bad_secrets(client, submitted, path_secret, header_secret):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': header_secret} if header_secret else {}
+    response = client.post(f'/telegram/webhook/{path_secret}', json=UPDATE, headers=headers)
+    assert response.status_code == 404
+    assert submitted == []
+
+
+def test_webhook_disabled_in_polling_mode(client, submitted, monkeypatch):
+    monkeypatch.setattr(Config, 'TELEGRAM_UPDATE_MODE', 'polling')
+    response = client.post(f'/telegram/webhook/{SECRET}', json=UPDATE,
+                           headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+    assert response.status_code == 404
+
+
+def test_verification_not_queued_is_503(client, service, monkeypatch):
+    from utils.job_utils import JobNotQueuedError
+
+    class _Queue:
+        def submit(self, telegram_id, bot_name, tx_hash):
+            raise JobNotQueuedError('verification job could not be stored')
+
+    monkeypatch.setattr(service.job_queue, 'get', lambda: _Queue())
+    response = client.post('/telegram/verify_bot_payment',
+                           json={'telegram_id': 1, 'bot_name': 'Doge_Spot_Binance', 'tx_hash': 'tx'})
+    assert response.status_code == 503
+    assert not response.get_json()['success']
+
+
+def test_stats_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', None)
+    assert client.get('/stats').status_code == 404
+
+
+def test_stats_requires_admin_token(client, monkeypatch):
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin')
+    assert client.get('/stats').status_code == 401
+    assert client.get('/stats', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    response = client.get('/stats', headers={'Authorization': 'Bearer admin'})
+    assert response.status_code == 200
+    assert 'process' in response.get_json()
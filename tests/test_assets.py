@@ -0,0 +1,82 @@
+import os
+import pytest
+from flask import Flask
+from utils import assets_utils
+from utils.config import Config
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    folder = tmp_path / 'static'
+    (folder / 'js').mkdir(parents=True)
+    (folder / 'js' / 'script.js').write_text('var answer = 42;\n')
+    return folder
+
+
+@pytest.fixture
+def client(static_folder, monkeypatch):
+    monkeypatch.setattr(Config, 'ASSET_MANIFEST_CHECK_INTERVAL', 0)
+    monkeypatch.setattr(assets_utils, '_manifest', None)
+    app = Flask(__name__, static_folder=str(static_folder))
+    assets_utils.init_assets(app)
+    return app.test_client()
+
+
+def _asset_url(client):
+    with client.application.test_request_context():
+        return assets_utils.asset_url('js/script.js')
+
+
+def test_unbuilt_assets_fall_back_to_static(client):
+    assert _asset_url(client) == '/static/js/script.js'
+
+
+def test_build_minifies_and_precompresses(static_folder):
+    manifest = assets_utils.build_assets(str(static_folder))
+    built = static_folder / 'dist' / manifest['js/script.js']
+    assert built.read_text() == 'var answer=42;'
+    assert os.path.exists(f'{built}.gz')
+    assert os.path.exists(f'{built}.br')
+
+
+def test_rebuild_is_served_without_restart(client, static_folder):
+    assets_utils.build_assets(str(static_folder))
+    first = _asset_url(client)
+    assert first.startswith('/assets/js/script.')
+    assert client.get(first).status_code == 200
+
+    (static_folder / 'js' / 'script.js').write_text('var answer = 43;\n')
+    assets_utils.build_assets(str(static_folder))
+    second = _asset_url(client)
+    assert second != first
+    assert client.get(second).status_code == 200
+
+    # The whole build was swapped in; no half-built or replaced trees are left behind
+    assert sorted(os.listdir(static_folder)) == ['dist', 'js']
+
+
+def test_page_cache_rerenders_with_rebuilt_asset_urls(client, static_folder, tmp_path):
+    from utils.page_cache_utils import PageCache
+
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'page.html').write_text("<script src=\"{{ asset_url('js/script.js') }}\"></script>")
+    app = client.application
+    app.template_folder = str(templates)
+    pages = PageCache(app, check_interval=0)
+    # Only the page cache's own check may pick up the rebuild
+    assets_utils._manifest.check_interval = 3600
+
+    def rendered():
+        with app.test_request_context():
+            return pages.get('page.html')['identity'].decode()
+
+    assets_utils.build_assets(str(static_folder))
+    first = rendered()
+    (static_folder / 'js' / 'script.js').write_text('var answer = 43;\n')
+    assets_utils.build_assets(str(static_folder))
+    second = rendered()
+
+    assert first != second
+    with app.test_request_context():
+        assert assets_utils.asset_url('js/script.js') in second
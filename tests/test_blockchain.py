@@ -0,0 +1,84 @@
+import pytest
+from utils.config import Config
+from utils.blockchain_utils import PrivatenessBlockchainClient
+from utils.explorer_utils import ExplorerClient
+from utils.payment_utils import BotAccessManager
+from tests.fakes.explorer import FakeExplorer
+from tests.fakes.rpc import FakeRPC
+
+BOT_NAME = 'Doge_Spot_Binance'
+PAYMENT_ADDRESS = 'bot-address'
+
+
+@pytest.fixture
+def bot_config(monkeypatch):
+    config = Config.BOT_PAYMENT_CONFIGS[BOT_NAME]
+    monkeypatch.setitem(config, 'payment_address', PAYMENT_ADDRESS)
+    return config
+
+
+@pytest.fixture
+def explorer():
+    with FakeExplorer() as server:
+        yield server
+
+
+@pytest.fixture
+def rpc():
+    with FakeRPC() as server:
+        yield server
+
+
+@pytest.fixture
+def client(explorer, rpc):
+    return PrivatenessBlockchainClient(rpc_url=rpc.url, explorer=ExplorerClient(explorer.url))
+
+
+def test_explorer_validation(client, explorer, bot_config):
+    explorer.add_transaction('tx', 'sender', [(PAYMENT_ADDRESS, bot_config['required_nch'])])
+    result = client.validate_transaction('tx', BOT_NAME)
+    assert result == {'valid': True, 'from_address': 'sender', 'nch_amount': bot_config['required_nch']}
+
+
+def test_rpc_fallback_returns_explorer_shape(client, explorer, rpc, bot_config):
+    # 500 is not retried, so the explorer counts as unreachable straight away
+    explorer.faults.configure(failure_rate=1.0, failure_status=500)
+    rpc.add_transaction('tx', 'sender', bot_config['required_nch'], PAYMENT_ADDRESS)
+
+    result = client.validate_transaction('tx', BOT_NAME)
+    assert result == {'valid': True, 'from_address': 'sender', 'nch_amount': bot_config['required_nch']}
+    assert rpc.requests == ['validate_transaction']
+
+
+def test_rpc_fallback_checks_recipient(client, explorer, rpc, bot_config):
+    explorer.faults.configure(failure_rate=1.0, failure_status=500)
+    rpc.add_transaction('tx', 'sender', bot_config['required_nch'], 'someone-else')
+
+    result = client.validate_transaction('tx', BOT_NAME)
+    assert not result['valid']
+    assert result['reason'] == 'insufficient'
+
+
+def test_rpc_fallback_checks_amount_and_confirmation(client, explorer, rpc, bot_config):
+    explorer.faults.configure(failure_rate=1.0, failure_status=500)
+    rpc.add_transaction('short', 'sender', bot_config['required_nch'] - 1, PAYMENT_ADDRESS)
+    rpc.add_transaction('pending', 'sender', bot_config['required_nch'], PAYMENT_ADDRESS, confirmed=False)
+
+    assert client.validate_transaction('short', BOT_NAME)['reason'] == 'insufficient'
+    assert client.validate_transaction('pending', BOT_NAME)['reason'] == 'unconfirmed'
+
+
+def test_rpc_error_reports_explorer_outage(client, explorer, bot_config):
+    explorer.faults.configure(failure_rate=1.0, failure_status=500)
+    result = client.validate_transaction('unknown', BOT_NAME)
+    assert not result['valid']
+    assert result['reason'] == 'unreachable'
+
+
+def test_payment_verified_through_rpc_fallback(db, client, explorer, rpc, bot_config, monkeypatch):
+    explorer.faults.configure(failure_rate=1.0, failure_status=500)
+    rpc.add_transaction('tx', 'sender', bot_config['required_nch'], PAYMENT_ADDRESS)
+    monkeypatch.setattr(client, 'check_wallet_balance', lambda address, minimum_ness: address == 'sender')
+
+    result = BotAccessManager(client).verify_payment_transaction(42, BOT_NAME, 'tx')
+    assert result['success'], result
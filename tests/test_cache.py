@@ -0,0 +1,108 @@
+import time
+import threading
+import pytest
+from utils.cache_utils import StaleWhileRevalidateCache, SingleFlight
+
+
+class _Loader:
+    def __init__(self):
+        self.value = 1
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, key):
+        self.calls += 1
+        self.release.wait(5)
+        return self.value
+
+
+def _wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+def test_fresh_entry_is_served_from_cache():
+    loader = _Loader()
+    cache = StaleWhileRevalidateCache(loader, ttl=60, max_stale=60)
+    assert cache.get('addr') == 1
+    loader.value = 2
+    assert cache.get('addr') == 1
+    assert loader.calls == 1
+
+
+def test_stale_entry_is_served_while_refreshing():
+    loader = _Loader()
+    cache = StaleWhileRevalidateCache(loader, ttl=0, max_stale=60)
+    assert cache.get('addr') == 1
+
+    loader.value = 2
+    loader.release.clear()
+    # The refresh is blocked, yet readers get the stale value straight away and start only one refresh
+    assert cache.get('addr') == 1
+    assert cache.get('addr') == 1
+    loader.release.set()
+    _wait_for(lambda: cache.stats()['refreshes'] == 2)
+    assert loader.calls == 2
+    assert cache.stats()['stale_hits'] == 2
+
+
+def test_entry_past_max_stale_is_reloaded_synchronously():
+    loader = _Loader()
+    cache = StaleWhileRevalidateCache(loader, ttl=0, max_stale=0)
+    cache.get('addr')
+    loader.value = 2
+    assert cache.get('addr') == 2
+
+
+def test_failed_refresh_keeps_previous_value():
+    loader = _Loader()
+    cache = StaleWhileRevalidateCache(loader, ttl=0, max_stale=60)
+    cache.get('addr')
+    loader.value = None
+    assert cache.get('addr') == 1
+    _wait_for(lambda: cache.stats()['refresh_errors'] == 1)
+    assert cache.get('addr') == 1
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def validate(tx_hash):
+        calls.append(tx_hash)
+        started.set()
+        release.wait(5)
+        return {'valid': True}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('tx', validate, 'tx')))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('tx', validate, 'tx'))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    _wait_for(lambda: flight.stats()['coalesced'] == 3)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == ['tx']
+    assert results == [{'valid': True}] * 4
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_forgets_failed_call():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('tx', fail)
+    assert flight.in_flight() == 0
+    assert flight.do('tx', lambda: 'retried') == 'retried'
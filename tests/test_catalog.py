@@ -0,0 +1,33 @@
+import json
+from utils.catalog_utils import BotCatalog
+
+CONFIGS = {
+    'Doge_Spot_Binance': {'exchange': 'Binance', 'trading_type': 'Spot', 'bot_username': 'doge_bot',
+                          'payment_address': 'addr-1', 'required_nch': 300000, 'minimum_ness': 4000},
+    'Doge_Perpetual_OKX': {'exchange': 'OKX', 'trading_type': 'Perpetual', 'bot_username': 'doge_bot',
+                           'payment_address': 'addr-2', 'required_nch': 300000, 'minimum_ness': 4000},
+}
+
+
+def test_catalog_lists_every_configured_bot():
+    payload = json.loads(BotCatalog(CONFIGS).body)
+    assert [bot['key'] for bot in payload['bots']] == list(CONFIGS)
+    assert [bot['name'] for bot in payload['bots']] == ['Doge', 'Doge Perpetual']
+    assert payload['bots'][1]['payment_address'] == 'addr-2'
+    assert payload['version'] == BotCatalog(CONFIGS).etag
+
+
+def test_version_changes_only_with_the_content():
+    changed = {key: dict(config) for key, config in CONFIGS.items()}
+    assert BotCatalog(changed).version == BotCatalog(CONFIGS).version
+    changed['Doge_Spot_Binance']['minimum_ness'] = 5000
+    assert BotCatalog(changed).version != BotCatalog(CONFIGS).version
+
+
+def test_bots_endpoint_revalidates_by_etag():
+    import app as service
+    client = service.app.test_client()
+    response = client.get('/api/bots')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{service.bot_catalog.etag}"'
+    assert client.get('/api/bots', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
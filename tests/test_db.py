@@ -0,0 +1,133 @@
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from utils.db_utils import (
+    BatchWriter,
+    get_db_connection,
+    transaction,
+    save_verified_transaction,
+    get_verified_transaction,
+    claim_transaction_for_subscription,
+    get_subscription_expiry,
+    save_bot_subscription,
+    remove_bot_subscription,
+    get_subscription_cache_stats,
+)
+
+
+def _user_count():
+    return get_db_connection().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            conn.execute('INSERT INTO users (telegram_id, username) VALUES (?, ?)', (1, 'alice'))
+            raise RuntimeError('boom')
+    assert _user_count() == 0
+
+
+def test_nested_transaction_joins_outer(db):
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            with transaction():
+                conn.execute('INSERT INTO users (telegram_id, username) VALUES (?, ?)', (1, 'alice'))
+            raise RuntimeError('boom')
+    assert _user_count() == 0
+
+
+def test_failed_begin_does_not_leave_thread_nested(db):
+    get_db_connection()
+    blocker = sqlite3.connect(db, isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with transaction():
+                pass
+    finally:
+        blocker.execute('ROLLBACK')
+        blocker.close()
+
+    # Had the failed BEGIN been counted, this block would run in autocommit and keep the row
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            conn.execute('INSERT INTO users (telegram_id, username) VALUES (?, ?)', (1, 'alice'))
+            raise RuntimeError('boom')
+    assert _user_count() == 0
+
+
+def test_original_error_survives_a_failed_rollback(db):
+    # SQLite can end the transaction itself (SQLITE_FULL, IOERR); the caller must still see why
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            conn.execute('ROLLBACK')
+            raise RuntimeError('boom')
+
+    with transaction() as conn:
+        conn.execute('INSERT INTO users (telegram_id, username) VALUES (?, ?)', (1, 'alice'))
+    assert _user_count() == 1
+
+
+def test_batch_writer_commits_queued_rows_on_stop(db):
+    writer = BatchWriter(flush_interval=1)
+    sql = 'INSERT INTO users (telegram_id, username) VALUES (?, ?)'
+    assert writer.write(sql, (1, 'alice'))
+    writer.stop()
+    assert _user_count() == 1
+
+    # Writes after stop() go straight to SQLite instead of waiting on a writer that is gone
+    assert writer.write(sql, (2, 'bob'), wait=True)
+    assert _user_count() == 2
+
+
+def _verified_transaction(tx_hash):
+    save_verified_transaction({
+        'tx_hash': tx_hash, 'payment_address': 'bot-address', 'from_address': 'sender',
+        'nch_amount': 300000, 'verified_at': datetime.now()
+    })
+
+
+def _subscription(telegram_id, bot_name='Doge_Spot_Binance'):
+    return {
+        'telegram_id': telegram_id, 'bot_name': bot_name, 'bot_username': 'bot',
+        'payment_address': 'sender', 'expires_at': datetime.now() + timedelta(days=30)
+    }
+
+
+def test_claim_saves_subscription_once(db):
+    _verified_transaction('tx')
+    assert claim_transaction_for_subscription('tx', _subscription(1))
+    assert not claim_transaction_for_subscription('tx', _subscription(2))
+
+    assert get_verified_transaction('tx')['telegram_id'] == 1
+    assert get_subscription_expiry(1, 'Doge_Spot_Binance') is not None
+    assert get_subscription_expiry(2, 'Doge_Spot_Binance') is None
+
+
+def test_claim_rolls_back_when_subscription_cannot_be_saved(db):
+    _verified_transaction('tx')
+    get_db_connection().execute('DROP TABLE bot_subscriptions')
+
+    with pytest.raises(sqlite3.Error):
+        claim_transaction_for_subscription('tx', _subscription(1))
+
+    # The payment was not spent, and nothing was cached for a subscription that does not exist
+    assert get_verified_transaction('tx')['telegram_id'] is None
+    assert get_subscription_expiry(1, 'Doge_Spot_Binance') is None
+
+
+def test_subscription_expiry_served_from_cache(db):
+    subscription = _subscription(1)
+    save_bot_subscription(subscription)
+    get_db_connection().execute('DELETE FROM bot_subscriptions')
+    hits = get_subscription_cache_stats()['hits']
+
+    # A write made behind the cache's back is only seen once the entry lapses
+    assert get_subscription_expiry(1, 'Doge_Spot_Binance') == subscription['expires_at']
+    assert get_subscription_cache_stats()['hits'] == hits + 1
+
+
+def test_removed_subscription_is_uncached(db):
+    save_bot_subscription(_subscription(1))
+    remove_bot_subscription(1, 'Doge_Spot_Binance')
+    assert get_subscription_expiry(1, 'Doge_Spot_Binance') is None
@@ -0,0 +1,67 @@
+import time
+import random
+import threading
+from utils.dispatch_utils import UpdateDispatcher
+
+
+def _update(update_id, chat_id):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': str(update_id)}}
+
+
+def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+def test_updates_from_one_chat_stay_in_order():
+    seen = {}
+    lock = threading.Lock()
+
+    def handler(update):
+        time.sleep(random.random() / 500)
+        with lock:
+            seen.setdefault(update['message']['chat']['id'], []).append(update['update_id'])
+
+    dispatcher = UpdateDispatcher(handler, workers=4)
+    for update_id in range(200):
+        assert dispatcher.submit(_update(update_id, update_id % 5), timeout=None)
+    _wait_for(lambda: dispatcher.stats()['processed'] == 200)
+
+    for chat_id, update_ids in seen.items():
+        assert update_ids == sorted(update_ids)
+        assert len(update_ids) == 40
+
+
+def test_committed_offset_waits_for_slowest_update():
+    blocked = threading.Event()
+
+    def handler(update):
+        if update['update_id'] == 1:
+            blocked.wait(5)
+
+    # Chats 0 and 1 land on different shards
+    dispatcher = UpdateDispatcher(handler, workers=2)
+    assert dispatcher.committed_offset(default=7) == 7
+    dispatcher.submit(_update(1, 0))
+    dispatcher.submit(_update(2, 1))
+    dispatcher.submit(_update(3, 1))
+    _wait_for(lambda: dispatcher.stats()['processed'] == 2)
+
+    # Updates 2 and 3 are done, but confirming them would also confirm unfinished update 1
+    assert dispatcher.committed_offset() == 1
+    blocked.set()
+    _wait_for(lambda: dispatcher.stats()['processed'] == 3)
+    assert dispatcher.committed_offset() == 4
+
+
+def test_redelivered_updates_are_dropped():
+    handled = []
+    dispatcher = UpdateDispatcher(handled.append, workers=1)
+    dispatcher.submit(_update(1, 'chat'))
+    _wait_for(lambda: dispatcher.stats()['processed'] == 1)
+    assert dispatcher.submit(_update(1, 'chat'))
+    assert dispatcher.stats()['duplicates'] == 1
+    assert len(handled) == 1
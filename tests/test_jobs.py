@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from utils.job_utils import VerificationJobQueue, JobNotQueuedError, JOB_DONE, JOB_FAILED
+from utils.db_utils import (
+    initialize_db,
+    get_db_connection,
+    create_verification_job,
+    get_verification_job,
+    update_verification_job,
+)
+
+
+class _AccessManager:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def verify_payment_transaction(self, telegram_id, bot_name, tx_hash):
+        self.calls.append(tx_hash)
+        self.release.wait(5)
+        return {'success': True, 'message': 'Bot access granted'}
+
+
+@pytest.fixture
+def manager():
+    return _AccessManager()
+
+
+@pytest.fixture
+def queue(db, manager):
+    queue = VerificationJobQueue(manager, workers=2, max_pending=2, lease=30)
+    yield queue
+    manager.release.set()
+    queue.shutdown()
+
+
+def _job(job_id, owner, lease_expires_at, status='running'):
+    create_verification_job({
+        'job_id': job_id, 'telegram_id': 1, 'bot_name': 'Doge_Spot_Binance', 'tx_hash': f'tx-{job_id}',
+        'status': status, 'created_at': datetime.now(), 'owner': owner, 'lease_expires_at': lease_expires_at
+    })
+
+
+def _wait_done(queue, job_id):
+    for _ in range(100):
+        job = queue.get(job_id)
+        if job['status'] == JOB_DONE:
+            return job
+        threading.Event().wait(0.02)
+    raise AssertionError(f"{job_id} did not finish")
+
+
+def _wait_idle(queue):
+    for _ in range(100):
+        if queue.stats()['pending'] == 0:
+            return
+        threading.Event().wait(0.02)
+    raise AssertionError("jobs still pending")
+
+
+def test_submitted_job_runs(queue, manager):
+    job = queue.submit(1, 'Doge_Spot_Binance', 'tx')
+    assert _wait_done(queue, job['job_id'])['result']['success']
+    assert manager.calls == ['tx']
+
+
+def test_job_that_cannot_be_stored_is_not_queued(queue, manager, monkeypatch):
+    monkeypatch.setattr('utils.job_utils.create_verification_job', lambda job: False)
+    with pytest.raises(JobNotQueuedError):
+        queue.submit(1, 'Doge_Spot_Binance', 'tx')
+    assert queue.stats()['pending'] == 0
+    assert queue.stats()['submitted'] == 0
+    assert manager.calls == []
+
+
+def test_submit_after_shutdown_releases_its_slot(queue, manager):
+    queue.shutdown()
+    with pytest.raises(JobNotQueuedError):
+        queue.submit(1, 'Doge_Spot_Binance', 'tx')
+    assert queue.stats()['pending'] == 0
+    assert not queue._active
+    job = get_db_connection().execute('SELECT status FROM verification_jobs').fetchone()
+    assert job['status'] == JOB_FAILED
+
+
+def test_resume_after_shutdown_releases_its_slots(queue):
+    _job('orphan', 'host:2', datetime.now() - timedelta(seconds=1))
+    queue.shutdown()
+    assert queue.resume_unfinished() == 0
+    assert queue.stats()['pending'] == 0
+    assert not queue._active
+
+
+def test_resume_skips_jobs_leased_by_live_workers(queue, manager):
+    _job('live', 'host:1', datetime.now() + timedelta(seconds=30))
+    _job('orphan', 'host:2', datetime.now() - timedelta(seconds=1))
+
+    assert queue.resume_unfinished() == 1
+    _wait_done(queue, 'orphan')
+    assert manager.calls == ['tx-orphan']
+    assert get_verification_job('live')['status'] == 'running'
+
+
+def test_resume_respects_max_pending(queue, manager):
+    expired = datetime.now() - timedelta(seconds=1)
+    for index in range(3):
+        _job(f'orphan-{index}', 'host:2', expired, status='queued')
+
+    manager.release.clear()
+    assert queue.resume_unfinished() == 2
+    assert queue.resume_unfinished() == 0
+    manager.release.set()
+    _wait_idle(queue)
+    assert queue.resume_unfinished() == 1
+
+
+def test_result_not_overwritten_after_lease_taken_over(db):
+    _job('job', 'host:1', datetime.now() - timedelta(seconds=1))
+    assert update_verification_job('job', JOB_DONE, '{"success": true}', owner='host:2') is False
+    assert update_verification_job('job', JOB_DONE, '{"success": true}', owner='host:1') is True
+
+
+def test_initialize_db_adds_lease_columns_to_old_tables(db):
+    conn = get_db_connection()
+    conn.execute('DROP TABLE verification_jobs')
+    conn.execute('''
+        CREATE TABLE verification_jobs (
+            job_id TEXT PRIMARY KEY, telegram_id INTEGER, bot_name TEXT, tx_hash TEXT,
+            status TEXT, result TEXT, created_at DATETIME, updated_at DATETIME
+        )
+    ''')
+    initialize_db()
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(verification_jobs)').fetchall()}
+    assert {'owner', 'lease_expires_at'} <= columns
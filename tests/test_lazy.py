@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+import pytest
+from utils.lazy_utils import Lazy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_factory_runs_once_across_threads():
+    calls = []
+    service = Lazy('service', lambda: calls.append(1) or object())
+    instances = []
+    threads = [threading.Thread(target=lambda: instances.append(service.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert all(instance is instances[0] for instance in instances)
+
+
+def test_failed_factory_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('not yet')
+        return 'ready'
+
+    service = Lazy('service', factory)
+    with pytest.raises(RuntimeError):
+        service.get()
+    assert not service.loaded
+    assert service.get() == 'ready'
+    assert service.peek() == 'ready'
+
+
+def test_importing_the_app_builds_no_heavy_service():
+    # A fresh interpreter, so modules imported by other tests do not count
+    probe = ("import sys, json, app; print(json.dumps({'loaded': [s.name for s in (app.blockchain_client, "
+             "app.bot_access_manager, app.job_queue, app.subscription_scheduler) if s.loaded], "
+             "'selenium': any(name.startswith('selenium') for name in sys.modules)}))")
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True,
+                            check=True, env=dict(os.environ, WARM_UP_ON_START='false')).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == {'loaded': [], 'selenium': False}
@@ -0,0 +1,13 @@
+import logging
+from utils.logging_utils import RateLimitFilter
+
+
+def _record(level):
+    return logging.LogRecord('test', level, __file__, 10, 'message', None, None)
+
+
+def test_rate_limit_only_applies_to_debug():
+    limit = RateLimitFilter(rate=0.001, burst=1)
+    assert all(limit.filter(_record(logging.INFO)) for _ in range(20))
+    assert [limit.filter(_record(logging.DEBUG)) for _ in range(3)] == [True, False, False]
+    assert limit.total_suppressed == 2
@@ -0,0 +1,54 @@
+import time
+import requests
+from utils.market_utils import MarketDataCache
+
+COIN = {'id': 'dogecoin', 'name': 'Dogecoin', 'symbol': 'doge', 'current_price': 0.1, 'market_cap': 1,
+        'price_change_percentage_24h': 2.5, 'ath': 0.7, 'image': 'https://example.com/doge.png'}
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _Session(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.fail = False
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise requests.ConnectionError('down')
+        return _Response([COIN])
+
+
+def _cache(session, ttl=60, max_stale=60):
+    return MarketDataCache(url='https://coingecko.test/markets', ttl=ttl, max_stale=max_stale, session=session)
+
+
+def test_snapshot_keeps_only_rendered_fields():
+    session = _Session()
+    cache = _cache(session)
+    snapshot = cache.get()
+    assert snapshot['body'] == (b'[{"id":"dogecoin","name":"Dogecoin","symbol":"doge","current_price":0.1,'
+                                b'"market_cap":1,"price_change_percentage_24h":2.5}]')
+    assert cache.get() is snapshot
+    assert session.calls == 1
+
+
+def test_last_good_snapshot_survives_an_outage():
+    session = _Session()
+    cache = _cache(session, ttl=0.001, max_stale=0.001)
+    first = cache.get()
+    session.fail = True
+    time.sleep(0.01)
+    assert cache.get() is first
+    assert cache.stats()['upstream_errors'] == 1
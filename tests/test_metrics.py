@@ -0,0 +1,45 @@
+import os
+from utils.leader_utils import SharedSnapshot
+from utils.metrics_utils import MetricsRegistry
+
+
+def _registry(tmp_path):
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    depth = registry.gauge('queue_depth', 'Queue depth')
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    registry.directory = str(tmp_path)
+    registry.flush_interval = 5
+    return registry, requests, depth, latency
+
+
+def test_render_merges_other_workers(tmp_path):
+    registry, requests, depth, latency = _registry(tmp_path)
+    requests.inc(2, route='/health')
+    depth.set(3)
+    latency.observe(0.05)
+    SharedSnapshot('1', str(tmp_path)).write({
+        'requests_total': [[['/health'], 5]],
+        'queue_depth': [[[], 7]],
+        'latency_seconds': [[[], [[0, 1, 0], 0.5]]],
+    })
+
+    text = registry.render()
+    assert 'requests_total{route="/health"} 7' in text
+    assert 'queue_depth{worker="1"} 7' in text
+    assert f'queue_depth{{worker="{os.getpid()}"}} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_count 2' in text
+
+
+def test_exited_worker_keeps_counters_but_drops_gauges(tmp_path):
+    registry, requests, depth, _ = _registry(tmp_path)
+    snapshot = SharedSnapshot('1', str(tmp_path))
+    snapshot.write({'requests_total': [[['/health'], 5]], 'queue_depth': [[[], 7]]})
+    stale = os.path.getmtime(snapshot.path) - 60
+    os.utime(snapshot.path, (stale, stale))
+
+    text = registry.render()
+    assert 'requests_total{route="/health"} 5' in text
+    assert 'worker="1"' not in text
@@ -0,0 +1,58 @@
+import os
+import gzip
+import pytest
+from flask import Flask
+from utils.page_cache_utils import PageCache
+
+
+@pytest.fixture
+def templates(tmp_path):
+    folder = tmp_path / 'templates'
+    folder.mkdir()
+    (folder / 'page.html').write_text('<p>first</p>')
+    return folder
+
+
+@pytest.fixture
+def pages(templates):
+    app = Flask(__name__, template_folder=str(templates))
+    pages = PageCache(app, check_interval=0)
+    app.add_url_rule('/page', 'page', lambda: pages.respond('page.html'))
+    app.add_url_rule('/twin', 'twin', lambda: pages.respond('page.html'))
+    return pages
+
+
+def test_page_rendered_once_and_revalidated_with_304(pages):
+    client = pages.app.test_client()
+    first = client.get('/page')
+    assert first.status_code == 200
+    assert first.data == b'<p>first</p>'
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    etag = first.headers['ETag']
+    assert client.get('/twin', headers={'If-None-Match': etag}).status_code == 304
+    assert pages.stats() == {'pages': 1, 'renders': 1, 'hits': 1, 'not_modified': 1}
+
+
+def test_gzip_variant_has_its_own_etag(pages):
+    client = pages.app.test_client()
+    plain = client.get('/page')
+    compressed = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+
+def test_changed_template_is_rerendered(pages, templates):
+    client = pages.app.test_client()
+    etag = client.get('/page').headers['ETag']
+
+    template = templates / 'page.html'
+    template.write_text('<p>second</p>')
+    later = os.path.getmtime(template) + 5
+    os.utime(template, (later, later))
+
+    response = client.get('/page', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.data == b'<p>second</p>'
+    assert pages.stats()['renders'] == 2
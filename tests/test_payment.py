@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from utils.config import Config
+from utils.payment_utils import BotAccessManager
+from utils.db_utils import save_bot_subscription, get_subscription_expiry
+
+BOT_NAME = 'Doge_Spot_Binance'
+OTHER_BOT = 'Doge_Perpetual_Binance'
+
+
+class _BlockchainClient:
+    def __init__(self, balances=None):
+        self.balances = balances or {}
+
+    def check_wallet_balance(self, address, minimum_ness):
+        balance = self.balances.get(address)
+        return balance is not None and balance >= minimum_ness
+
+
+def _subscribe(telegram_id, bot_name=BOT_NAME, address='holder', expires_in=timedelta(days=30)):
+    save_bot_subscription({
+        'telegram_id': telegram_id, 'bot_name': bot_name, 'bot_username': 'bot',
+        'payment_address': address, 'expires_at': datetime.now() + expires_in
+    })
+
+
+def test_subscription_status_uses_the_bots_minimum(db, monkeypatch):
+    monkeypatch.setitem(Config.BOT_PAYMENT_CONFIGS[OTHER_BOT], 'minimum_ness', Config.MINIMUM_NESS * 2)
+    _subscribe(1, BOT_NAME)
+    _subscribe(1, OTHER_BOT)
+    manager = BotAccessManager(_BlockchainClient({'holder': Config.MINIMUM_NESS}))
+
+    assert manager.check_subscription_status(1, BOT_NAME)
+    assert not manager.check_subscription_status(1, OTHER_BOT)
+    assert get_subscription_expiry(1, OTHER_BOT) is None
+
+
+def test_access_batch_reports_every_bot_in_one_map(db):
+    _subscribe(1, BOT_NAME)
+    result = BotAccessManager(_BlockchainClient()).check_bot_access_batch(1, [BOT_NAME, OTHER_BOT])
+    assert result['access'][BOT_NAME]['access']
+    assert result['access'][OTHER_BOT] == {'access': False}
+    assert result['valid_for'] == Config.ACCESS_BATCH_MAX_AGE
+
+
+def test_access_batch_valid_until_the_first_subscription_lapses(db):
+    _subscribe(1, BOT_NAME, expires_in=timedelta(seconds=60))
+    _subscribe(1, OTHER_BOT, expires_in=timedelta(seconds=120))
+    result = BotAccessManager(_BlockchainClient()).check_bot_access_batch(1, [BOT_NAME, OTHER_BOT])
+    assert 55 <= result['valid_for'] <= 60
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+import pytest
+from utils.config import Config
+from utils.scheduler_utils import SubscriptionScheduler
+from utils.db_utils import save_bot_subscription, get_subscription_expiry
+
+BOT_NAME = 'Doge_Spot_Binance'
+OTHER_BOT = 'Doge_Perpetual_Binance'
+
+
+class _BalanceCache:
+    def __init__(self, balances):
+        self.balances = balances
+
+    def refresh(self, address):
+        return self.balances.get(address)
+
+
+class _BlockchainClient:
+    def __init__(self, balances):
+        self.balance_cache = _BalanceCache(balances)
+
+
+def _subscribe(telegram_id, address, bot_name=BOT_NAME, expires_in=timedelta(days=30)):
+    save_bot_subscription({
+        'telegram_id': telegram_id, 'bot_name': bot_name, 'bot_username': 'bot',
+        'payment_address': address, 'expires_at': datetime.now() + expires_in
+    })
+
+
+def _scheduler(balances):
+    return SubscriptionScheduler(_BlockchainClient(balances), batch_size=2)
+
+
+def test_revoke_expired_in_batches(db):
+    for telegram_id in range(5):
+        _subscribe(telegram_id, 'addr', expires_in=timedelta(seconds=-1))
+    _subscribe(99, 'addr')
+
+    scheduler = _scheduler({})
+    assert scheduler.revoke_expired() == 5
+    assert get_subscription_expiry(0, BOT_NAME) is None
+    assert get_subscription_expiry(99, BOT_NAME) is not None
+    assert scheduler.stats()['revoked_expired'] == 5
+
+
+def test_revalidate_revokes_only_insufficient_balances(db):
+    _subscribe(1, 'rich')
+    _subscribe(2, 'poor')
+    _subscribe(3, 'unknown')
+
+    scheduler = _scheduler({'rich': Config.MINIMUM_NESS, 'poor': Config.MINIMUM_NESS - 1})
+    assert scheduler.revalidate_balances() == 1
+    assert get_subscription_expiry(1, BOT_NAME) is not None
+    assert get_subscription_expiry(2, BOT_NAME) is None
+    # An unknown balance (explorer down) never revokes
+    assert get_subscription_expiry(3, BOT_NAME) is not None
+    assert scheduler.stats()['balance_errors'] == 1
+
+
+def test_revalidate_uses_each_bots_minimum(db, monkeypatch):
+    monkeypatch.setitem(Config.BOT_PAYMENT_CONFIGS[OTHER_BOT], 'minimum_ness', Config.MINIMUM_NESS * 2)
+    _subscribe(1, 'holder', BOT_NAME)
+    _subscribe(1, 'holder', OTHER_BOT)
+
+    assert _scheduler({'holder': Config.MINIMUM_NESS}).revalidate_balances() == 1
+    assert get_subscription_expiry(1, BOT_NAME) is not None
+    assert get_subscription_expiry(1, OTHER_BOT) is None
@@ -0,0 +1,52 @@
+import pytest
+from utils.signal_utils import SignalHub
+
+
+@pytest.fixture
+def hub(tmp_path):
+    hub = SignalHub(url='http://127.0.0.1:9/signals', max_subscribers=2)
+    hub._shared.path = str(tmp_path / 'signals.json')
+    yield hub
+    hub.stop()
+
+
+def test_unread_stream_holds_no_slot(hub):
+    stream = hub.subscribe()
+    assert hub.stats()['subscribers'] == 0
+    stream.close()
+    assert hub.stats()['subscribers'] == 0
+
+
+def test_stream_slot_released_on_close(hub):
+    hub.publish([{'id': 1, 'pair': 'DOGE/USDT'}])
+    stream = hub.subscribe()
+    assert next(stream).startswith('retry:')
+    assert hub.stats()['subscribers'] == 1
+    assert next(stream).startswith('id: 1\n')
+    stream.close()
+    assert hub.stats()['subscribers'] == 0
+
+
+def test_subscriber_limit(hub):
+    streams = [hub.subscribe() for _ in range(2)]
+    for stream in streams:
+        next(stream)
+    assert hub.subscribe() is None
+    streams[0].close()
+    assert hub.subscribe() is not None
+
+
+def test_resume_from_last_event_id(hub):
+    hub.publish([{'id': 1}, {'id': 2}, {'id': 3}])
+    stream = hub.subscribe(last_event_id='2')
+    next(stream)
+    assert next(stream).startswith('id: 3\n')
+    stream.close()
+
+
+def test_head_request_leaks_no_slot():
+    import app as service
+    client = service.app.test_client()
+    before = service.signal_hub.stats()['subscribers']
+    assert client.head('/api/signals/stream').status_code == 200
+    assert service.signal_hub.stats()['subscribers'] == before
@@ -0,0 +1,41 @@
+import time
+from utils.rate_limit_utils import TokenBucket
+from utils.telegram_utils import OutboundMessageQueue
+
+
+class _Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {'ok': True}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(100, capacity=1)
+    bucket.pause(0.5)
+    assert bucket.try_acquire() > 0.4
+
+
+def test_rate_limited_send_pauses_every_chat():
+    sent = []
+    responses = [_Response(429, {'ok': False, 'parameters': {'retry_after': 0.3}})]
+
+    def deliver(payload):
+        sent.append((payload['chat_id'], time.monotonic()))
+        return responses.pop(0) if responses else _Response(200)
+
+    outbound = OutboundMessageQueue(deliver, workers=1, global_rate=1000, per_chat_rate=1000)
+    started = time.monotonic()
+    outbound.put(1, {'chat_id': 1})
+    outbound.put(2, {'chat_id': 2})
+    assert outbound.drain(timeout=5)
+    outbound.stop()
+
+    assert sorted(chat for chat, _ in sent) == [1, 1, 2]
+    # Chat 2 was never rate limited itself, but must wait out the 429 on chat 1
+    assert all(at - started >= 0.25 for chat, at in sent if chat == 2)
@@ -0,0 +1,61 @@
+import pytest
+from flask import Flask
+from utils.config import Config
+from utils.trace_utils import TraceBuffer, TRACES, span, traced, current_trace_id, init_tracing
+
+
+@traced('lookup')
+def _lookup():
+    return current_trace_id()
+
+
+def test_spans_nest_under_a_root():
+    with span('job', root=True, job_id='j1') as root:
+        assert _lookup() == root.trace.trace_id
+    trace = TRACES.get(root.trace.trace_id)
+    assert [(item['name'], item['parent']) for item in trace['spans']] == [('job', None), ('lookup', 0)]
+    assert trace['spans'][0]['attrs'] == {'job_id': 'j1'}
+
+
+def test_spans_outside_a_root_are_not_recorded():
+    recorded = TRACES.stats()['recorded']
+    assert _lookup() is None
+    assert TRACES.stats()['recorded'] == recorded
+
+
+def test_errors_are_recorded_on_the_span():
+    with pytest.raises(ValueError):
+        with span('job', root=True) as root:
+            raise ValueError('boom')
+    assert TRACES.get(root.trace.trace_id)['error'] == 'ValueError: boom'
+
+
+def test_slow_traces_survive_a_burst_of_fast_ones():
+    buffer = TraceBuffer(size=2, slow_ms=0)
+    with span('slow', root=True) as slow:
+        pass
+    buffer.add(slow.trace)
+    buffer.slow_ms = float('inf')
+    for _ in range(3):
+        with span('fast', root=True) as fast:
+            pass
+        buffer.add(fast.trace)
+    assert buffer.get(slow.trace.trace_id) is not None
+    assert [trace['name'] for trace in buffer.list(slow=True)] == ['slow']
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin')
+    app = Flask(__name__)
+    init_tracing(app)
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    return app.test_client()
+
+
+def test_requests_are_traced_and_served_to_admins(client):
+    trace_id = client.get('/ping').headers['X-Trace-Id']
+    assert client.get(f'/admin/traces/{trace_id}').status_code == 401
+    trace = client.get(f'/admin/traces/{trace_id}', headers={'X-Admin-Token': 'admin'}).get_json()
+    assert trace['name'] == 'GET /ping'
+    assert trace['spans'][0]['attrs']['status'] == 200
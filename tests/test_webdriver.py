@@ -0,0 +1,67 @@
+import pytest
+from utils.webdriver_utils import WebDriverPool, WebDriverPoolTimeout
+
+
+class _Driver:
+    def __init__(self):
+        self.healthy = True
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.healthy:
+            raise RuntimeError('browser gone')
+        return 'about:blank'
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def pool():
+    pool = WebDriverPool(size=1, max_page_loads=2, max_rss_mb=0, checkout_timeout=0.05, driver_factory=_Driver)
+    yield pool
+    pool.close()
+
+
+def test_checkout_reuses_idle_driver(pool):
+    with pool.driver() as first:
+        pass
+    with pool.driver() as second:
+        assert second is first
+    assert pool.stats()['created'] == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_checkout_times_out_when_exhausted(pool):
+    held = pool.checkout()
+    with pytest.raises(WebDriverPoolTimeout):
+        pool.checkout()
+    pool.checkin(held)
+
+    stats = pool.stats()
+    assert stats['checkout_timeouts'] == 1
+    # The timed-out attempt's wait counts towards the average it is meant to reveal
+    assert stats['wait_seconds_avg'] == pytest.approx(stats['wait_seconds_total'] / 2, abs=1e-5)
+    assert stats['wait_seconds_avg'] >= 0.02
+
+
+def test_driver_recycled_after_max_page_loads(pool):
+    with pool.driver() as first:
+        first.get('https://example.com')
+        first.get('https://example.com')
+    assert first.driver.quit_called
+    with pool.driver() as second:
+        assert second is not first
+    assert pool.stats()['recycled']['page_loads'] == 1
+
+
+def test_unhealthy_idle_driver_replaced(pool):
+    with pool.driver() as first:
+        first.driver.healthy = False
+    with pool.driver() as second:
+        assert second is not first
+    assert pool.stats()['recycled']['unhealthy'] == 1
@@ -0,0 +1,22 @@
+"""
+Access control for the operator endpoints (/stats and /admin/*), which expose
+process internals and are disabled while ADMIN_TOKEN is unset.
+"""
+import hmac
+from flask import abort, request
+from utils.config import Config
+
+
+def require_admin():
+    """
+    404 while no ADMIN_TOKEN is configured, 401 for a wrong or missing one.
+    """
+    expected = Config.ADMIN_TOKEN
+    if not expected:
+        abort(404)
+    supplied = request.headers.get('X-Admin-Token', '')
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        abort(401)
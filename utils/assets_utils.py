@@ -0,0 +1,323 @@
+"""
+Static asset pipeline.
+
+`python -m utils.assets_utils` vendors the third-party CSS/JS/fonts the
+templates used to pull from CDNs, minifies everything, writes content-hashed
+copies with .gz/.br variants to static/dist and records them in
+static/dist/manifest.json.
+
+At runtime `init_assets(app)` exposes `asset_url()` to templates, which
+returns the fingerprinted URL when the asset has been built and otherwise
+falls back to `url_for('static', ...)` (or the original CDN for vendored
+files), so an unbuilt checkout keeps working. A rebuild is built next to
+static/dist and swapped in whole; running servers pick up the new manifest
+within ASSET_MANIFEST_CHECK_INTERVAL seconds.
+"""
+import os
+import re
+import time
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import logging
+import mimetypes
+import brotli
+import rcssmin
+import rjsmin
+import requests
+from typing import Dict, Optional
+from urllib.parse import urljoin
+from flask import Flask, abort, request, send_file, url_for
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+BUILD_PREFIX = '.dist-'  # In-progress and replaced builds, next to dist/
+MANIFEST_NAME = 'manifest.json'
+
+# Logical name -> CDN URL. Font Awesome is pinned to the one version the templates use.
+VENDOR_ASSETS = {
+    'vendor/jquery/jquery.min.js': 'https://code.jquery.com/jquery-3.6.0.min.js',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css',
+    'vendor/roboto/roboto.css': 'https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;700&display=swap',
+}
+
+# Google Fonts serves woff2 only to browsers it recognises
+FONT_USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+COMPRESSIBLE = ('.js', '.css', '.svg', '.json', '.txt', '.ttf', '.eot')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+DEFAULT_STATIC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), Config.STATIC_FOLDER)
+
+
+def _fingerprint(path: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    root, ext = os.path.splitext(path)
+    if root.endswith('.min'):
+        root, ext = root[:-4], '.min' + ext
+    return f"{root}.{digest}{ext}"
+
+
+def vendor_assets(static_folder: str):
+    """
+    Download the pinned CDN assets into static/vendor, including the fonts their CSS points at.
+    """
+    session = requests.Session()
+    for name, url in VENDOR_ASSETS.items():
+        target = os.path.join(static_folder, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        response = session.get(url, headers={'User-Agent': FONT_USER_AGENT}, timeout=30)
+        response.raise_for_status()
+        content = response.text if name.endswith('.css') else None
+
+        if content is not None:
+            # Pull every referenced font next to the stylesheet and point the CSS at the local copy
+            def localise(match):
+                ref = match.group(2)
+                if ref.startswith('data:'):
+                    return match.group(0)
+                source = urljoin(url, ref)
+                local = os.path.normpath(os.path.join(os.path.dirname(name), _local_font_path(ref)))
+                local_path = os.path.join(static_folder, local)
+                if not os.path.exists(local_path):
+                    font = session.get(source, timeout=30)
+                    font.raise_for_status()
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                    with open(local_path, 'wb') as f:
+                        f.write(font.content)
+                return f"url({os.path.relpath(local, os.path.dirname(name))})"
+
+            content = CSS_URL.sub(localise, content)
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            with open(target, 'wb') as f:
+                f.write(response.content)
+        logger.info(f"[ASSETS] Vendored {url} -> {name}")
+
+
+def _local_font_path(ref: str) -> str:
+    ref = ref.split('?')[0].split('#')[0]
+    if ref.startswith('http'):
+        # Absolute font URLs (Google Fonts): flatten into fonts/ keeping a unique name
+        digest = hashlib.sha1(ref.encode()).hexdigest()[:8]
+        return os.path.join('fonts', f"{digest}-{os.path.basename(ref)}")
+    return ref
+
+
+def build_assets(static_folder: str = None) -> Dict[str, str]:
+    """
+    Minify, fingerprint and precompress every static file into static/dist. Returns the manifest.
+    """
+    static_folder = static_folder or DEFAULT_STATIC_FOLDER
+    dist = os.path.join(static_folder, DIST_DIR)
+    # Build beside dist/ and swap it in at the end, so a running server never sees a half-built tree
+    build = tempfile.mkdtemp(prefix=BUILD_PREFIX, dir=static_folder)
+    try:
+        manifest = _build_into(static_folder, dist, build)
+    except BaseException:
+        shutil.rmtree(build, ignore_errors=True)
+        raise
+
+    os.chmod(build, 0o755)
+    replaced = None
+    if os.path.isdir(dist):
+        replaced = tempfile.mkdtemp(prefix=BUILD_PREFIX, dir=static_folder)
+        os.rename(dist, os.path.join(replaced, DIST_DIR))
+    os.rename(build, dist)
+    if replaced is not None:
+        shutil.rmtree(replaced, ignore_errors=True)
+    logger.info(f"[ASSETS] Built {len(manifest)} assets into {dist}")
+    return manifest
+
+
+def _build_into(static_folder: str, dist: str, build: str) -> Dict[str, str]:
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist and not d.startswith(BUILD_PREFIX)]
+        for filename in files:
+            path = os.path.relpath(os.path.join(root, filename), static_folder).replace(os.sep, '/')
+            sources.append(path)
+
+    # CSS last, so the files it references already have fingerprinted names to rewrite to
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+    manifest: Dict[str, str] = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+
+        if path.endswith('.css'):
+            text = content.decode('utf-8')
+
+            def rewrite(match, base=os.path.dirname(path)):
+                ref = match.group(2)
+                clean = ref.split('?')[0].split('#')[0]
+                target = os.path.normpath(os.path.join(base, clean)).replace(os.sep, '/')
+                if target not in manifest:
+                    return match.group(0)
+                suffix = ref[len(clean):]
+                return f"url({os.path.relpath(manifest[target], base)}{suffix})"
+
+            content = rcssmin.cssmin(CSS_URL.sub(rewrite, text)).encode('utf-8')
+        elif path.endswith('.js') and not path.endswith('.min.js'):
+            content = rjsmin.jsmin(content.decode('utf-8')).encode('utf-8')
+
+        hashed = _fingerprint(path, content)
+        manifest[path] = hashed
+        target = os.path.join(build, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+
+        if path.endswith(COMPRESSIBLE):
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+    with open(os.path.join(build, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Maps logical static paths to their fingerprinted build output, reloading
+    the manifest when a rebuild replaces it (checked at most every
+    `check_interval` seconds).
+    """
+
+    def __init__(self, static_folder: str, check_interval: float = None):
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        self.path = os.path.join(self.dist, MANIFEST_NAME)
+        self.check_interval = check_interval if check_interval is not None else Config.ASSET_MANIFEST_CHECK_INTERVAL
+        self.entries: Dict[str, str] = {}
+        self.hashed = frozenset()
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _stat_version(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        # A swapped-in build is a new file, so the inode changes even within one mtime tick
+        return stat.st_ino, stat.st_mtime_ns
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the manifest if it changed on disk. Returns True when it was reloaded.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            version = self._stat_version()
+            if version == self.version:
+                return False
+
+            entries = {}
+            if version is not None:
+                try:
+                    with open(self.path) as f:
+                        entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"[ASSETS] Could not load manifest: {e}")
+                    return False
+            self.entries, self.hashed, self.version = entries, frozenset(entries.values()), version
+        if entries:
+            logger.info(f"[ASSETS] Loaded manifest with {len(entries)} assets")
+        else:
+            logger.info("[ASSETS] No asset manifest; serving unversioned static files")
+        return True
+
+    def lookup(self, filename: str) -> Optional[str]:
+        self.refresh()
+        return self.entries.get(filename)
+
+
+_manifest: Optional[AssetManifest] = None
+
+
+def refresh_manifest(force: bool = False) -> bool:
+    """
+    Reload the asset manifest if a rebuild replaced it. Returns True when it was reloaded.
+    """
+    return _manifest.refresh(force) if _manifest is not None else False
+
+
+def manifest_version():
+    """
+    Identifies the loaded manifest; changes whenever it is reloaded.
+    """
+    return _manifest.version if _manifest is not None else None
+
+
+def asset_url(filename: str) -> str:
+    """
+    Drop-in for url_for('static', filename=...) that prefers the fingerprinted build.
+    """
+    hashed = _manifest.lookup(filename) if _manifest is not None else None
+    if hashed is not None:
+        return url_for('built_asset', filename=hashed)
+    if filename in VENDOR_ASSETS:
+        return VENDOR_ASSETS[filename]
+    return url_for('static', filename=filename)
+
+
+def _send_built_asset(filename: str):
+    if _manifest is not None:
+        _manifest.refresh()
+    if _manifest is None or filename not in _manifest.hashed:
+        abort(404)
+
+    path = os.path.join(_manifest.dist, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepted and os.path.exists(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+
+    response = send_file(path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, etag=True, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app: Flask):
+    """
+    Load the manifest, register the /assets route and expose asset_url() to templates.
+    """
+    global _manifest
+    _manifest = AssetManifest(app.static_folder)
+    app.add_url_rule('/assets/<path:filename>', 'built_asset', _send_built_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Vendor, minify, fingerprint and precompress static assets')
+    parser.add_argument('--static-folder', default=DEFAULT_STATIC_FOLDER)
+    parser.add_argument('--no-vendor', action='store_true', help='Build from what is already in static/vendor')
+    args = parser.parse_args()
+
+    if not args.no_vendor:
+        vendor_assets(args.static_folder)
+    build_assets(args.static_folder)
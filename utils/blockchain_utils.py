@@ -1,47 +1,53 @@
-import os
 import logging
 import requests
 from dotenv import load_dotenv
-from typing import Dict, Any
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from typing import Dict, Any, Optional, TYPE_CHECKING
+from utils.cache_utils import StaleWhileRevalidateCache
 from utils.config import Config
+from utils.explorer_utils import ExplorerClient
+from utils.metrics_utils import VERIFICATION_STAGE_SECONDS, FALLBACK_USAGE
+from utils.trace_utils import traced
+
+if TYPE_CHECKING:
+    from utils.webdriver_utils import WebDriverPool
 
 # Load environment variables
 load_dotenv()
 
 class PrivatenessBlockchainClient:
-    def __init__(self, rpc_url: str = None):
+    def __init__(self, rpc_url: str = None, driver_pool: 'WebDriverPool' = None, explorer: ExplorerClient = None):
         self.logger = logging.getLogger(__name__)
         self.rpc_url = rpc_url or Config.RPC_URL
         self.explorer_url = Config.EXPLORER_URL
 
-        # ✅ Keep Headless Mode and SSL Fixes
-        chrome_options = Options()
-        #chrome_options.add_argument("--headless")  # ✅ Keep running in headless mode
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-
-        # ✅ Fix SSL Errors
-        chrome_options.add_argument("--ignore-certificate-errors")
-        chrome_options.add_argument("--allow-running-insecure-content")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-
-        # Set up Chrome WebDriver
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        # Primary path: the explorer's JSON backend over pooled HTTP connections
+        self.explorer = explorer or ExplorerClient(self.explorer_url)
+        self.rpc_session = requests.Session()
+
+        # Selenium is an opt-in last resort; browsers come from a shared pool
+        self.driver_pool = driver_pool
+        if self.driver_pool is None and Config.SELENIUM_FALLBACK_ENABLED:
+            # Selenium and webdriver_manager are only imported when the fallback is enabled
+            from utils.webdriver_utils import WebDriverPool
+            self.driver_pool = WebDriverPool()
+
+        # Address -> NESS balance, shared by payment verification and subscription re-checks
+        self.balance_cache = StaleWhileRevalidateCache(
+            self._fetch_wallet_balance,
+            ttl=Config.BALANCE_CACHE_TTL,
+            max_stale=Config.BALANCE_CACHE_MAX_STALE,
+            maxsize=Config.BALANCE_CACHE_SIZE
+        )
 
         self.logger.info(f"[CONFIG] RPC_URL: {self.rpc_url}")
         self.logger.info(f"[CONFIG] EXPLORER_URL: {self.explorer_url}")
+        self.logger.info(f"[CONFIG] SELENIUM_FALLBACK: {'enabled' if self.driver_pool else 'disabled'}")
 
+    @traced('blockchain.validate_transaction')
     def validate_transaction(self, tx_hash: str, bot_name: str) -> Dict[str, Any]:
         """
-        Validate a transaction using Selenium first, then fall back to RPC if needed.
+        Validate a transaction via the explorer API, then fall back to RPC
+        and, if enabled, Selenium when the explorer cannot be reached.
         """
         bot_config = Config.get_bot_config(bot_name)  # ✅ Get bot-specific payment address
         if not bot_config:
@@ -50,63 +56,145 @@ class PrivatenessBlockchainClient:
         required_nch = bot_config["required_nch"]
         payment_address = bot_config["payment_address"]  # ✅ Ensure we check against the correct bot's address
 
-        self.logger.info(f"[VALIDATION] Checking TX: {tx_hash} via Selenium first")
+        self.logger.info(f"[VALIDATION] Checking TX: {tx_hash} via explorer API first")
 
-        # Run Selenium FIRST
-        result = self.scrape_transaction_details(tx_hash, required_nch, payment_address)
+        with VERIFICATION_STAGE_SECONDS.time(stage='explorer_transaction'):
+            result = self.explorer.validate_payment(tx_hash, required_nch, payment_address)
 
         if result.get("valid"):
-            self.logger.info(f"[VALIDATION SUCCESS] TX: {tx_hash} verified via Selenium")
+            self.logger.info(f"[VALIDATION SUCCESS] TX: {tx_hash} verified via explorer API")
             return result
 
-        # If Selenium fails, switch to RPC
-        self.logger.warning(f"[VALIDATION] Selenium failed for TX: {tx_hash}. Switching to RPC fallback.")
-        result = self.make_rpc_request("validate_transaction", [tx_hash, required_nch])
+        # The explorer answered (not found, unconfirmed, too little NCH): the fallbacks would only repeat it
+        if result.get("reason") != "unreachable":
+            self.logger.warning(f"[VALIDATION FAILED] TX: {tx_hash} | Reason: {result.get('error')}")
+            return result
 
-        if result and "result" in result:
-            self.logger.info(f"[VALIDATION SUCCESS] TX: {tx_hash} verified via RPC")
+        # If the explorer API is down, switch to RPC
+        self.logger.warning(f"[VALIDATION] Explorer API failed for TX: {tx_hash}. Switching to RPC fallback.")
+        with VERIFICATION_STAGE_SECONDS.time(stage='rpc_transaction'):
+            rpc_result = self.make_rpc_request("validate_transaction", [tx_hash, required_nch])
+
+        rpc_validation = self._parse_rpc_validation(tx_hash, rpc_result, required_nch, payment_address)
+        FALLBACK_USAGE.inc(operation='transaction', backend='rpc',
+                           outcome='success' if rpc_validation is not None else 'failure')
+        if rpc_validation is not None:
+            if rpc_validation.get("valid"):
+                self.logger.info(f"[VALIDATION SUCCESS] TX: {tx_hash} verified via RPC")
+            else:
+                self.logger.warning(f"[VALIDATION FAILED] TX: {tx_hash} | Reason: {rpc_validation.get('error')}")
+            return rpc_validation
+
+        # Last resort: render the explorer in a pooled browser
+        if self.driver_pool is not None:
+            self.logger.warning(f"[VALIDATION] RPC failed for TX: {tx_hash}. Switching to Selenium fallback.")
+            result = self.scrape_transaction_details(tx_hash, required_nch, payment_address)
+            FALLBACK_USAGE.inc(operation='transaction', backend='selenium',
+                               outcome='success' if result.get("valid") else 'failure')
+            if result.get("valid"):
+                self.logger.info(f"[VALIDATION SUCCESS] TX: {tx_hash} verified via Selenium")
             return result
 
-        # If both fail, return error
-        self.logger.error(f"[VALIDATION FAILED] TX: {tx_hash} could not be verified via Selenium or RPC.")
-        return {"valid": False, "error": "Transaction verification failed"}
+        # If every backend fails, return the explorer error
+        self.logger.error(f"[VALIDATION FAILED] TX: {tx_hash} could not be verified via explorer API or RPC.")
+        return result
 
+    def _parse_rpc_validation(self, tx_hash: str, rpc_result: Optional[Dict[str, Any]], required_nch: int,
+                              payment_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Unwrap a `validate_transaction` JSON-RPC reply into the explorer's result shape,
+        checking the recipient and NCH amount. Returns None if the node gave no usable answer.
+        """
+        if not rpc_result or not isinstance(rpc_result.get("result"), dict):
+            if rpc_result and rpc_result.get("error"):
+                self.logger.error(f"[RPC FAILED] TX: {tx_hash} | Error: {rpc_result['error']}")
+            return None
+
+        tx = rpc_result["result"]
+        try:
+            sender_address = tx["from_address"]
+            receiver = tx["to_address"]
+            nch_sent = int(tx["nch_amount"])
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.error(f"[RPC FAILED] TX: {tx_hash} | Unexpected payload: {e}")
+            return None
+
+        self.logger.info(f"[RPC] TX: {tx_hash} | Valid: {tx.get('valid')} | NCH Sent: {nch_sent} | Sender: {sender_address} | Receiver: {receiver}")
+
+        if not tx.get("valid"):
+            return {"valid": False, "error": "Transaction not yet confirmed", "reason": "unconfirmed"}
+
+        # ✅ Same conditions as the explorer path: enough NCH, sent to this bot's address
+        if receiver == payment_address and nch_sent >= required_nch:
+            return {
+                "valid": True,
+                "from_address": sender_address,
+                "nch_amount": nch_sent
+            }
+
+        return {"valid": False, "error": "Transaction does not meet required NCH conditions", "reason": "insufficient"}
+
+    @traced('blockchain.make_rpc_request')
+    def make_rpc_request(self, method: str, params: list) -> Optional[Dict[str, Any]]:
+        """
+        JSON-RPC call against the NESS node. Returns None if the node cannot be reached.
+        """
+        if not self.rpc_url:
+            return None
+
+        payload = {"jsonrpc": "2.0", "id": "1", "method": method, "params": params}
+        try:
+            response = self.rpc_session.post(self.rpc_url, json=payload, timeout=Config.RPC_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.logger.error(f"[RPC FAILED] Method: {method} | Error: {e}")
+            return None
+
+    @traced('blockchain.scrape_transaction_details')
     def scrape_transaction_details(self, tx_hash: str, required_nch: int, payment_address: str) -> Dict[str, Any]:
         """
         Uses Selenium to scrape transaction details dynamically.
         Extracts sender, receiver, and NCH sent.
         """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.common.by import By
+
         url = f"{self.explorer_url}/app/transaction/{tx_hash}"
 
         self.logger.info(f"[SCRAPING] Extracting TX: {tx_hash} from {url}")
 
         try:
-            self.driver.get(url)
-            wait = WebDriverWait(self.driver, 30)
-
-            # ✅ Wait for transaction status
-            status_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/div/div/div[1]/div"))
-            )
-            status = status_element.text.strip()
-
-            # ✅ Extract Sender Address
-            sender_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[1]/div[2]/a"))
-            )
-            sender_address = sender_element.text.strip()
-
-            # ✅ Extract Receiver Address
-            receiver_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[2]/div[2]/a"))
-            )
-            receiver = receiver_element.text.strip()
-
-            # ✅ Extract NCH Sent (Hours)
-            nch_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[2]/div[2]/div[2]/div[2]"))
-            )
-            nch_sent = int(nch_element.text.replace(",", "").strip())  # Convert to integer after removing commas
+            with self.driver_pool.driver() as pooled:
+                with VERIFICATION_STAGE_SECONDS.time(stage='selenium_page_load'):
+                    pooled.get(url)
+                wait = WebDriverWait(pooled.driver, 30)
+
+                with VERIFICATION_STAGE_SECONDS.time(stage='selenium_xpath_wait'):
+                    # ✅ Wait for transaction status
+                    status_element = wait.until(
+                        EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/div/div/div[1]/div"))
+                    )
+                    status = status_element.text.strip()
+
+                    # ✅ Extract Sender Address
+                    sender_element = wait.until(
+                        EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[1]/div[2]/a"))
+                    )
+                    sender_address = sender_element.text.strip()
+
+                    # ✅ Extract Receiver Address
+                    receiver_element = wait.until(
+                        EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[2]/div[2]/a"))
+                    )
+                    receiver = receiver_element.text.strip()
+
+                    # ✅ Extract NCH Sent (Hours)
+                    nch_element = wait.until(
+                        EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-transaction-detail/app-transaction-info/div/div[3]/div[1]/div[2]/div[2]/div[2]/div[2]"))
+                    )
+                    nch_sent = int(nch_element.text.replace(",", "").strip())  # Convert to integer after removing commas
 
             self.logger.info(f"[SCRAPING SUCCESS] TX: {tx_hash} | Status: {status} | NCH Sent: {nch_sent} | Sender: {sender_address} | Receiver: {receiver}")
 
@@ -124,24 +212,32 @@ class PrivatenessBlockchainClient:
             self.logger.error(f"[SCRAPING FAILED] TX: {tx_hash} | Error: {e}")
             return {"valid": False, "error": "Explorer unreachable. Please try again later."}
 
-    def scrape_wallet_balance(self, address: str, minimum_ness: float) -> bool:
+    @traced('blockchain.scrape_wallet_balance_value')
+    def scrape_wallet_balance_value(self, address: str) -> Optional[float]:
         """
         Uses Selenium to scrape the sender's wallet balance dynamically.
-        Ensures the sender's NESS holdings are >= minimum_ness.
+        Returns None if the page could not be read.
         """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.common.by import By
+
         url = f"{self.explorer_url}/app/address/{address}/1"
 
         self.logger.info(f"[SCRAPING BALANCE] Checking balance for: {address}")
 
         try:
-            self.driver.get(url)
-            wait = WebDriverWait(self.driver, 10)
-
-            # ✅ Extract the balance value
-            balance_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-address-detail/div[1]/div/div[5]/div"))
-            )
-            balance_text = balance_element.text.strip()
+            with self.driver_pool.driver() as pooled:
+                with VERIFICATION_STAGE_SECONDS.time(stage='selenium_page_load'):
+                    pooled.get(url)
+                wait = WebDriverWait(pooled.driver, 10)
+
+                # ✅ Extract the balance value
+                with VERIFICATION_STAGE_SECONDS.time(stage='selenium_xpath_wait'):
+                    balance_element = wait.until(
+                        EC.visibility_of_element_located((By.XPATH, "/html/body/app-root/div/div/app-address-detail/div[1]/div/div[5]/div"))
+                    )
+                balance_text = balance_element.text.strip()
 
             # ✅ Remove commas and "SKY" text
             balance_text = balance_text.replace(",", "").replace("SKY", "").strip()
@@ -149,22 +245,44 @@ class PrivatenessBlockchainClient:
 
             self.logger.info(f"[SCRAPING SUCCESS] Address: {address} | Balance: {balance_value} NESS")
 
-            return balance_value >= minimum_ness
+            return balance_value
 
         except Exception as e:
             self.logger.error(f"[SCRAPING FAILED] Address: {address} | Error: {e}")
-            return False
+            return None
 
-    def check_wallet_balance(self, address: str, minimum_ness: float) -> bool:
+    def scrape_wallet_balance(self, address: str, minimum_ness: float) -> bool:
         """
-        Checks if the sender's wallet has at least `minimum_ness`.
-        Uses Selenium scraping.
+        Ensures the sender's NESS holdings are >= minimum_ness using Selenium.
         """
-        self.logger.info(f"[BALANCE CHECK] Verifying NESS balance for: {address}")
-        return self.scrape_wallet_balance(address, minimum_ness)
+        balance_value = self.scrape_wallet_balance_value(address)
+        return balance_value is not None and balance_value >= minimum_ness
+
+    def get_wallet_balance(self, address: str) -> Optional[float]:
+        """
+        Returns the wallet's NESS balance through the balance cache. Returns None if unknown.
+        """
+        return self.balance_cache.get(address)
 
-    def __del__(self):
+    @traced('blockchain.fetch_wallet_balance')
+    def _fetch_wallet_balance(self, address: str) -> Optional[float]:
+        """
+        Fetches the wallet's NESS balance from the explorer API,
+        falling back to Selenium when enabled. Returns None if unknown.
         """
-        Ensures Selenium WebDriver is properly closed when the instance is deleted.
+        with VERIFICATION_STAGE_SECONDS.time(stage='explorer_balance'):
+            balance_value = self.explorer.get_balance(address)
+        if balance_value is None and self.driver_pool is not None:
+            self.logger.warning(f"[BALANCE CHECK] Explorer API failed for: {address}. Switching to Selenium fallback.")
+            balance_value = self.scrape_wallet_balance_value(address)
+            FALLBACK_USAGE.inc(operation='balance', backend='selenium',
+                               outcome='success' if balance_value is not None else 'failure')
+        return balance_value
+
+    def check_wallet_balance(self, address: str, minimum_ness: float) -> bool:
         """
-        self.driver.quit()  # ✅ Keep Selenium cleanup
\ No newline at end of file
+        Checks if the sender's wallet has at least `minimum_ness`.
+        """
+        self.logger.info(f"[BALANCE CHECK] Verifying NESS balance for: {address}")
+        balance_value = self.get_wallet_balance(address)
+        return balance_value is not None and balance_value >= minimum_ness
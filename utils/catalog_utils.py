@@ -0,0 +1,41 @@
+import json
+import hashlib
+from typing import Dict, Any, List
+from utils.config import Config
+
+# Fields the Mini App needs to list a bot and take payment for it
+CATALOG_FIELDS = ('exchange', 'trading_type', 'bot_username', 'payment_address', 'required_nch', 'minimum_ness')
+
+
+def _display_name(bot_key: str, trading_type: str) -> str:
+    asset = bot_key.split('_', 1)[0]
+    return asset if trading_type == 'Spot' else f"{asset} {trading_type}"
+
+
+class BotCatalog:
+    """
+    Serialises Config.BOT_PAYMENT_CONFIGS once into the JSON the frontend renders
+    its bot tables from, so the bot list is defined in one place.
+
+    The payload carries a content-derived `version`, which doubles as its ETag.
+    """
+
+    def __init__(self, configs: Dict[str, Dict[str, Any]] = None):
+        configs = configs if configs is not None else Config.BOT_PAYMENT_CONFIGS
+        bots: List[Dict[str, Any]] = []
+        for bot_key, config in configs.items():
+            bot = {'key': bot_key, 'name': _display_name(bot_key, config.get('trading_type'))}
+            bot.update({field: config.get(field) for field in CATALOG_FIELDS})
+            bots.append(bot)
+
+        canonical = json.dumps(bots, sort_keys=True, separators=(',', ':'))
+        self.version = hashlib.sha256(canonical.encode()).hexdigest()[:16]
+        self.bots = bots
+        self.body = json.dumps({'version': self.version, 'bots': bots}, separators=(',', ':')).encode()
+
+    @property
+    def etag(self) -> str:
+        return self.version
+
+    def stats(self) -> Dict[str, Any]:
+        return {'version': self.version, 'bots': len(self.bots), 'bytes': len(self.body)}
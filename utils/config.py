@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from typing import Dict, Any
 
@@ -14,9 +15,43 @@ class Config:
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     CHAT_ID = os.getenv('CHAT_ID')
     DB_PATH = os.getenv('DB_PATH', 'users.db')
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough under WAL
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -16000))  # Negative values are KiB
+    DB_CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', 256))
+    DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 5))
+    DB_WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', 10000))
+    DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', 500))
+    DB_WRITE_FLUSH_INTERVAL = float(os.getenv('DB_WRITE_FLUSH_INTERVAL', 0.05))
+    DB_WRITE_PUT_TIMEOUT = float(os.getenv('DB_WRITE_PUT_TIMEOUT', 0.5))
     STATIC_FOLDER = 'static'
     TEMPLATE_FOLDER = 'templates'
+    # Lock and snapshot files shared by the worker processes on this host
+    RUNTIME_DIR = os.getenv('RUNTIME_DIR', os.path.join(tempfile.gettempdir(), 'ness_micro_service'))
+    LEADER_RETRY_INTERVAL = float(os.getenv('LEADER_RETRY_INTERVAL', 5))  # How soon a follower replaces a dead leader
+    SNAPSHOT_FOLLOW_INTERVAL = float(os.getenv('SNAPSHOT_FOLLOW_INTERVAL', 1))
+    # Build lazy services and render cached pages in the background once a worker has booted
+    WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'true').lower() in ('1', 'true', 'yes')
+    PAGE_CACHE_CHECK_INTERVAL = float(os.getenv('PAGE_CACHE_CHECK_INTERVAL', 2))  # Seconds between template change checks
+    ASSET_MANIFEST_CHECK_INTERVAL = float(os.getenv('ASSET_MANIFEST_CHECK_INTERVAL', 2))  # Seconds between static/dist/manifest.json checks
     WEBAPP_URL = os.getenv('WEBAPP_URL')
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+    # Telegram update ingestion: 'webhook' in production, 'polling' for local development
+    TELEGRAM_UPDATE_MODE = os.getenv('TELEGRAM_UPDATE_MODE', 'polling')
+    TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')  # Public base URL, e.g. https://example.com
+    TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+    TELEGRAM_WEBHOOK_MAX_CONNECTIONS = int(os.getenv('TELEGRAM_WEBHOOK_MAX_CONNECTIONS', 40))
+    TELEGRAM_UPDATE_QUEUE_SIZE = int(os.getenv('TELEGRAM_UPDATE_QUEUE_SIZE', 1000))
+    TELEGRAM_UPDATE_WORKERS = int(os.getenv('TELEGRAM_UPDATE_WORKERS', 8))  # Updates from one chat stay on one worker
+
+    # Outbound Telegram API calls
+    TELEGRAM_HTTP_TIMEOUT = float(os.getenv('TELEGRAM_HTTP_TIMEOUT', 10))
+    TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))  # Messages per second across all chats
+    TELEGRAM_PER_CHAT_RATE = float(os.getenv('TELEGRAM_PER_CHAT_RATE', 1))  # Messages per second to one chat
+    TELEGRAM_SEND_WORKERS = int(os.getenv('TELEGRAM_SEND_WORKERS', 4))
+    TELEGRAM_SEND_QUEUE_SIZE = int(os.getenv('TELEGRAM_SEND_QUEUE_SIZE', 10000))
+    TELEGRAM_SEND_PUT_TIMEOUT = float(os.getenv('TELEGRAM_SEND_PUT_TIMEOUT', 5))
+    TELEGRAM_SEND_MAX_ATTEMPTS = int(os.getenv('TELEGRAM_SEND_MAX_ATTEMPTS', 5))
 
     # Blockchain Configuration
     PAYMENT_ADDRESS_DOGE_SPOT_BINANCE = os.getenv('PAYMENT_ADDRESS_DOGE_SPOT_BINANCE')
@@ -30,8 +65,49 @@ class Config:
     # URLs Configuration
     RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:6660")
     EXPLORER_URL = os.getenv("EXPLORER_URL", "https://ness-explorer.magnetosphere.net")
-    # Degging
-    print(f"[DEBUG] Loaded EXPLORER_URL: {EXPLORER_URL}")
+
+    # Explorer JSON backend (primary verification path)
+    EXPLORER_TX_API_PATH = os.getenv('EXPLORER_TX_API_PATH', '/api/transaction')
+    EXPLORER_BALANCE_API_PATH = os.getenv('EXPLORER_BALANCE_API_PATH', '/api/balance')
+    EXPLORER_HTTP_TIMEOUT = float(os.getenv('EXPLORER_HTTP_TIMEOUT', 5))
+    EXPLORER_HTTP_POOL_SIZE = int(os.getenv('EXPLORER_HTTP_POOL_SIZE', 10))
+    RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', 5))
+
+    # Verified transaction ledger caches
+    VERIFIED_TX_CACHE_SIZE = int(os.getenv('VERIFIED_TX_CACHE_SIZE', 10000))
+    NEGATIVE_TX_CACHE_TTL = float(os.getenv('NEGATIVE_TX_CACHE_TTL', 30))
+
+    # Wallet balance cache (entries are served stale while refreshing for up to MAX_STALE seconds)
+    BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', 60))
+    BALANCE_CACHE_MAX_STALE = float(os.getenv('BALANCE_CACHE_MAX_STALE', 300))
+    BALANCE_CACHE_SIZE = int(os.getenv('BALANCE_CACHE_SIZE', 5000))
+
+    # In-memory subscription cache used by access checks
+    SUBSCRIPTION_CACHE_SIZE = int(os.getenv('SUBSCRIPTION_CACHE_SIZE', 50000))
+    SUBSCRIPTION_CACHE_TTL = float(os.getenv('SUBSCRIPTION_CACHE_TTL', 300))
+    SUBSCRIPTION_NEGATIVE_CACHE_TTL = float(os.getenv('SUBSCRIPTION_NEGATIVE_CACHE_TTL', 30))
+
+    # Subscription expiry scheduler and bulk balance re-validation
+    SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', 500))
+    SCHEDULER_RELOAD_INTERVAL = float(os.getenv('SCHEDULER_RELOAD_INTERVAL', 300))
+    SCHEDULER_MAX_HEAP = int(os.getenv('SCHEDULER_MAX_HEAP', 100000))
+    BALANCE_REVALIDATION_INTERVAL = float(os.getenv('BALANCE_REVALIDATION_INTERVAL', 3600))
+    BALANCE_REVALIDATION_WORKERS = int(os.getenv('BALANCE_REVALIDATION_WORKERS', 8))
+
+    # Background payment verification workers
+    VERIFICATION_WORKERS = int(os.getenv('VERIFICATION_WORKERS', 4))
+    VERIFICATION_QUEUE_SIZE = int(os.getenv('VERIFICATION_QUEUE_SIZE', 100))
+    # A worker process renews its jobs' leases every third of this; the leader only resumes jobs whose lease ran out
+    VERIFICATION_JOB_LEASE = float(os.getenv('VERIFICATION_JOB_LEASE', 30))
+
+    # Selenium is only used as a last resort when explicitly enabled
+    SELENIUM_FALLBACK_ENABLED = os.getenv('SELENIUM_FALLBACK_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+    # Selenium WebDriver Pool Configuration
+    WEBDRIVER_POOL_SIZE = int(os.getenv('WEBDRIVER_POOL_SIZE', 2))
+    WEBDRIVER_MAX_PAGE_LOADS = int(os.getenv('WEBDRIVER_MAX_PAGE_LOADS', 50))
+    WEBDRIVER_MAX_RSS_MB = int(os.getenv('WEBDRIVER_MAX_RSS_MB', 1024))
+    WEBDRIVER_CHECKOUT_TIMEOUT = float(os.getenv('WEBDRIVER_CHECKOUT_TIMEOUT', 60))
 
     # Payment and Subscription Configuration
     SUBSCRIPTION_DURATION_DAYS = 30
@@ -115,41 +191,33 @@ class Config:
         # Add more bots as needed
     }
 
-    # Logging Configuration
-    LOGGING_CONFIG = {
-        'version': 1,
-        'disable_existing_loggers': False,
-        'formatters': {
-            'standard': {
-                'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-            },
-        },
-        'handlers': {
-            'console': {
-                'level': 'INFO',
-                'class': 'logging.StreamHandler',
-                'formatter': 'standard'
-            },
-            'file': {
-                'level': 'ERROR',
-                'class': 'logging.FileHandler',
-                'filename': 'app.log',
-                'formatter': 'standard',
-                'mode': 'a'
-            }
-        },
-        'loggers': {
-            '': {  # Root logger
-                'handlers': ['console', 'file'],
-                'level': 'INFO',
-                'propagate': True
-            },
-            'blockchain_utils': {
-                'level': 'DEBUG',
-                'propagate': True
-            }
-        }
-    }
+    BOT_CATALOG_MAX_AGE = int(os.getenv('BOT_CATALOG_MAX_AGE', 300))  # Seconds browsers reuse /api/bots before revalidating
+    ACCESS_BATCH_MAX_AGE = int(os.getenv('ACCESS_BATCH_MAX_AGE', 300))  # Upper bound on how long the Mini App reuses its access map
+
+    # Operator endpoints (/stats, /admin/*) are disabled while ADMIN_TOKEN is unset
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+    # Tracing and on-demand profiling
+    TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 200))  # Recent traces kept in memory
+    TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', 1000))  # Traces this slow are also kept in a separate buffer
+    TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 500))  # Per trace; further spans are counted, not kept
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+
+    # Each worker publishes its metrics here; /metrics merges them (cleared by the gunicorn master at start)
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(RUNTIME_DIR, 'metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))  # Max staleness of other workers' values
+
+    # Logging: records are queued on the calling thread and written by one background listener
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = os.getenv('LOG_LEVELS', 'urllib3=WARNING,werkzeug=WARNING')  # Per-logger overrides: name=LEVEL,...
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # Console format: text or json; the file is always JSON lines
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')  # Shared by all workers; rotate with logrotate, not in-process
+    LOG_FILE_LEVEL = os.getenv('LOG_FILE_LEVEL', 'ERROR').upper()
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # Records beyond this are dropped, never block a request
+    LOG_RATE_LIMIT = float(os.getenv('LOG_RATE_LIMIT', 10))  # DEBUG records per second per call site (0: unlimited)
+    LOG_RATE_BURST = float(os.getenv('LOG_RATE_BURST', 50))
 
 
     # API Endpoints
@@ -158,6 +226,24 @@ class Config:
         'SIGNAL_ALERTS': 'https://api.cryptosignals.com/v1/signals'
     }
 
+    # Server-side market data snapshot served at /api/market_data
+    MARKET_DATA_TTL = float(os.getenv('MARKET_DATA_TTL', 60))  # Seconds a snapshot counts as fresh
+    MARKET_DATA_MAX_STALE = float(os.getenv('MARKET_DATA_MAX_STALE', 600))  # Extra seconds served while refreshing
+    MARKET_DATA_TIMEOUT = float(os.getenv('MARKET_DATA_TIMEOUT', 5))
+    MARKET_DATA_VS_CURRENCY = os.getenv('MARKET_DATA_VS_CURRENCY', 'usd')
+    MARKET_DATA_PER_PAGE = int(os.getenv('MARKET_DATA_PER_PAGE', 5))
+
+    # Signal alerts fanned out over /api/signals/stream
+    SIGNAL_POLL_INTERVAL = float(os.getenv('SIGNAL_POLL_INTERVAL', 15))
+    SIGNAL_HTTP_TIMEOUT = float(os.getenv('SIGNAL_HTTP_TIMEOUT', 5))
+    SIGNAL_BUFFER_SIZE = int(os.getenv('SIGNAL_BUFFER_SIZE', 5))  # Alerts replayed to a new subscriber
+    # Every open stream pins a thread of a threaded worker, so keep this well below GUNICORN_THREADS;
+    # the gevent stream server (gunicorn_stream.conf.py) uses the async limit instead
+    SIGNAL_STREAM_MAX_CLIENTS = int(os.getenv('SIGNAL_STREAM_MAX_CLIENTS', 4))  # Per threaded worker
+    SIGNAL_STREAM_MAX_ASYNC_CLIENTS = int(os.getenv('SIGNAL_STREAM_MAX_ASYNC_CLIENTS', 2000))  # Per gevent worker
+    SIGNAL_HEARTBEAT_INTERVAL = float(os.getenv('SIGNAL_HEARTBEAT_INTERVAL', 25))
+    SIGNAL_RETRY_MS = int(os.getenv('SIGNAL_RETRY_MS', 5000))  # Client reconnect delay
+
     @classmethod
     def get_bot_config(cls, bot_name: str) -> Dict[str, Any]:
         """
@@ -171,6 +257,19 @@ class Config:
         """
         return cls.BOT_PAYMENT_CONFIGS.get(bot_name, {})
 
+    @classmethod
+    def get_minimum_ness(cls, bot_name: str) -> float:
+        """
+        NESS balance a subscriber of the bot must keep (the one checked when access was granted)
+        
+        Args:
+            bot_name (str): Name of the bot
+        
+        Returns:
+            The bot's minimum_ness, or MINIMUM_NESS for a bot no longer configured
+        """
+        return cls.get_bot_config(bot_name).get('minimum_ness', cls.MINIMUM_NESS)
+
     @classmethod
     def validate_bot_config(cls, bot_name: str) -> bool:
         """
@@ -184,49 +283,14 @@ class Config:
         """
         return bot_name in cls.BOT_PAYMENT_CONFIGS
 
-# Logging Configuration
-    LOGGING_CONFIG = {
-        'version': 1,
-        'disable_existing_loggers': False,
-        'formatters': {
-            'standard': {
-                'format': '%(asctime)s [%(levelname)s] %(name)s - RPC URL: %(message)s'
-            },
-        },
-        'handlers': {
-            'console': {
-                'level': 'INFO',
-                'class': 'logging.StreamHandler',
-                'formatter': 'standard'
-            },
-            'file': {
-                'level': 'ERROR',
-                'class': 'logging.FileHandler',
-                'filename': 'app.log',
-                'formatter': 'standard',
-                'mode': 'a'
-            }
-        },
-        'loggers': {
-            '': {  # Root logger
-                'handlers': ['console', 'file'],
-                'level': 'INFO',
-                'propagate': True
-            },
-            'blockchain_utils': {
-                'level': 'DEBUG',
-                'propagate': True
-            }
-        }
-    }
-
     # RPC URL
     RPC_URL = os.getenv('RPC_URL')
 
     @classmethod
     def setup_logging(cls):
-        import logging.config
-        logging.config.dictConfig(cls.LOGGING_CONFIG)
+        import logging
+        from utils.logging_utils import setup_logging
+        setup_logging()
         logger = logging.getLogger(__name__)
         logger.info(f"RPC URL configured: {cls.RPC_URL}")
 
@@ -1,57 +1,368 @@
+import os
+import time
+import queue
+import atexit
 import sqlite3
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from utils.cache_utils import LRUCache
+from utils.config import Config
+from utils.trace_utils import span
 
-# Enable logging for database operations
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
+# Store DATETIME columns as ISO strings and read them back as datetime objects
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+# Per-thread connections, keyed by database path
+_local = threading.local()
+_wal_lock = threading.Lock()
+_wal_enabled = set()
+
+def _statement(sql):
+    return ' '.join(sql.split())[:120]
+
+class _TracedCursor(sqlite3.Cursor):
     """
-    Establish a database connection.
+    Records each statement as a span when it runs inside a traced request or job.
     """
-    try:
-        conn = sqlite3.connect('users.db', check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e:
-        logger.error(f"Database connection error: {e}")
-        return None
 
-def add_user(telegram_id, username):
+    def execute(self, sql, parameters=()):
+        with span('db.execute', sql=_statement(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with span('db.executemany', sql=_statement(sql)):
+            return super().executemany(sql, seq_of_parameters)
+
+class _TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute bypasses Python-level cursor overrides
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _connect(db_path):
     """
-    Add a new user to the database.
+    Open a connection and apply the tuned pragmas once for its lifetime.
     """
-    conn = get_db_connection()
-    if conn:
+    # isolation_level=None: single statements autocommit, transaction() groups the rest
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        isolation_level=None,
+        cached_statements=Config.DB_CACHED_STATEMENTS,
+        timeout=Config.DB_BUSY_TIMEOUT,
+        factory=_TracedConnection
+    )
+    conn.row_factory = sqlite3.Row
+
+    # journal_mode is persistent in the database file, so it only needs setting once per path
+    with _wal_lock:
+        if db_path not in _wal_enabled:
+            conn.execute('PRAGMA journal_mode=WAL')
+            _wal_enabled.add(db_path)
+    conn.execute(f'PRAGMA synchronous={Config.DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size={Config.DB_CACHE_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def get_db_connection():
+    """
+    Return this thread's database connection, opening it on first use.
+    Connections stay open for the life of the thread.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None or _local.pid != os.getpid():
+        # Connections inherited across fork() must not be used, or closed, by the child
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    db_path = Config.DB_PATH
+    conn = connections.get(db_path)
+    if conn is None:
         try:
-            cursor = conn.cursor()
-            cursor.execute('INSERT INTO users (telegram_id, username) VALUES (?, ?)', (telegram_id, username))
-            conn.commit()
-            logger.info(f"User added: {username} with ID: {telegram_id}")
+            conn = connections[db_path] = _connect(db_path)
         except sqlite3.Error as e:
-            logger.error(f"Error adding user: {e}")
-        finally:
-            conn.close()
+            logger.error(f"Database connection error: {e}")
+            return None
+    return conn
 
-def log_fallback_usage(tx_hash, method):
+def close_db_connection():
     """
-    Log when web scraping is used as a fallback.
+    Close this thread's connections (e.g. when a worker thread exits).
+    """
+    if getattr(_local, 'pid', None) != os.getpid():
+        return
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+@contextmanager
+def transaction():
+    """
+    Group several statements into one commit on this thread's connection.
+    Nested blocks join the outermost transaction.
     """
     conn = get_db_connection()
-    if conn:
+    depth = getattr(_local, 'transaction_depth', 0)
+    if depth:
+        _local.transaction_depth = depth + 1
         try:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO fallback_logs (tx_hash, method, timestamp)
-                VALUES (?, ?, ?)
-            ''', (tx_hash, method, datetime.now()))
-            conn.commit()
-            logger.info(f"Fallback method used: {method} for transaction {tx_hash}")
+            yield conn
+        finally:
+            _local.transaction_depth = depth
+        return
+
+    # Only count the transaction once BEGIN succeeded (it fails with "database is locked"),
+    # or every later block on this thread would think it is nested and run in autocommit
+    conn.execute('BEGIN IMMEDIATE')
+    _local.transaction_depth = 1
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        # SQLite may already have rolled back (SQLITE_FULL, IOERR, interrupt); keep the original error
+        try:
+            conn.execute('ROLLBACK')
         except sqlite3.Error as e:
-            logger.error(f"Error logging fallback usage: {e}")
+            logger.warning(f"Rollback failed: {e}")
+        raise
+    finally:
+        _local.transaction_depth = 0
+
+class BatchWriter:
+    """
+    Background writer that groups append-style INSERTs into periodic multi-row transactions.
+
+    Rows are queued (bounded) and committed by a single thread, up to DB_WRITE_BATCH_SIZE
+    rows per commit. When the queue is full the caller writes the row itself instead of
+    dropping it. Everything still queued is flushed at shutdown.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue=None, batch_size=None, flush_interval=None):
+        self.max_queue = max_queue or Config.DB_WRITE_QUEUE_SIZE
+        self.batch_size = batch_size or Config.DB_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else Config.DB_WRITE_FLUSH_INTERVAL
+        self._lock = threading.Lock()
+        # stop() waits for puts in flight before queueing its sentinel, so nothing is ever queued behind it
+        self._put_cond = threading.Condition()
+        self._putting = 0
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopped = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.direct_writes = 0
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each process starts its own writer
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(target=self._run, name='db-batch-writer', daemon=True)
+                self._thread.start()
+
+    def write(self, sql, params, wait=False, timeout=None):
+        """
+        Queue one row. With wait=True, block until it is committed and return whether it succeeded.
+        """
+        with self._put_cond:
+            stopped = self._stopped
+            if not stopped:
+                self._putting += 1
+        if stopped:
+            return self._write_direct(sql, params)
+        try:
+            self._ensure_started()
+            item = [sql, params, threading.Event() if wait else None, False]
+            self._queue.put(item, timeout=Config.DB_WRITE_PUT_TIMEOUT)
+        except queue.Full:
+            return self._write_direct(sql, params)
         finally:
-            conn.close()
+            with self._put_cond:
+                self._putting -= 1
+                self._put_cond.notify_all()
+        with self._lock:
+            self.enqueued += 1
+
+        if not wait:
+            return True
+        item[2].wait(timeout)
+        return item[3]
+
+    def flush(self, timeout=None):
+        """
+        Block until every row queued before this call has been committed.
+        """
+        with self._put_cond:
+            if self._stopped or self._thread is None or self._pid != os.getpid():
+                return True
+            self._putting += 1
+        marker = [None, None, threading.Event(), False]
+        try:
+            self._queue.put(marker)
+        finally:
+            with self._put_cond:
+                self._putting -= 1
+                self._put_cond.notify_all()
+        return marker[2].wait(timeout)
+
+    def stop(self, timeout=10):
+        """
+        Flush the queue and stop the writer thread; later writes go straight to SQLite.
+        """
+        with self._put_cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._put_cond.wait_for(lambda: self._putting == 0, timeout)
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.put([self._STOP, None, None, False])
+            self._thread.join(timeout)
+
+    def _write_direct(self, sql, params):
+        with self._lock:
+            self.direct_writes += 1
+        conn = get_db_connection()
+        if conn:
+            try:
+                conn.execute(sql, params)
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"Error writing row: {e}")
+        return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] is not self._STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write_batch([item for item in batch if item[0] is not None and item[0] is not self._STOP])
+            for item in batch:
+                if item[0] is None:
+                    item[3] = True
+                    item[2].set()
+            if batch[-1][0] is self._STOP:
+                close_db_connection()
+                return
+
+    def _write_batch(self, rows):
+        if not rows:
+            return
+
+        # Group consecutive rows for the same statement so executemany can bind them together
+        groups = []
+        for item in rows:
+            if groups and groups[-1][0] == item[0]:
+                groups[-1][1].append(item[1])
+            else:
+                groups.append((item[0], [item[1]]))
+
+        try:
+            with transaction() as conn:
+                for sql, params in groups:
+                    conn.executemany(sql, params)
+            succeeded = [True] * len(rows)
+        except sqlite3.Error as e:
+            # One bad row must not lose the rest of the batch: retry them one by one
+            logger.error(f"Error committing batch of {len(rows)} rows, retrying individually: {e}")
+            succeeded = [self._write_direct(item[0], item[1]) for item in rows]
+
+        with self._lock:
+            self.batches += 1
+            self.written += sum(succeeded)
+            self.errors += len(rows) - sum(succeeded)
+        logger.debug(f"Committed {sum(succeeded)} queued rows in one transaction.")
+
+        for item, ok in zip(rows, succeeded):
+            item[3] = ok
+            if item[2] is not None:
+                item[2].set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'max_queue': self.max_queue,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'batches': self.batches,
+                'errors': self.errors,
+                'direct_writes': self.direct_writes,
+            }
+
+_batch_writer = BatchWriter()
+atexit.register(_batch_writer.stop)
+
+def flush_writes(timeout=None):
+    """
+    Wait until all queued user and fallback-log rows are committed.
+    """
+    return _batch_writer.flush(timeout)
+
+def get_write_queue_stats():
+    return _batch_writer.stats()
+
+def add_user(telegram_id, username, durable=False):
+    """
+    Add a new user to the database.
+    Queued for the next group commit unless `durable` is set.
+    """
+    queued = _batch_writer.write(
+        'INSERT OR IGNORE INTO users (telegram_id, username) VALUES (?, ?)',
+        (telegram_id, username),
+        wait=durable
+    )
+    # INSERT OR IGNORE: the user may already have existed, and unless durable the row is not committed yet
+    if not queued:
+        logger.error(f"Error adding user: {username} with ID: {telegram_id}")
+    elif durable:
+        logger.info(f"User recorded: {username} with ID: {telegram_id}")
+    else:
+        logger.debug(f"User queued: {username} with ID: {telegram_id}")
+    return queued
+
+def log_fallback_usage(tx_hash, method, durable=False):
+    """
+    Log when web scraping is used as a fallback.
+    Queued for the next group commit unless `durable` is set.
+    """
+    queued = _batch_writer.write(
+        'INSERT INTO fallback_logs (tx_hash, method, timestamp) VALUES (?, ?, ?)',
+        (tx_hash, method, datetime.now()),
+        wait=durable
+    )
+    if queued:
+        logger.info(f"Fallback method used: {method} for transaction {tx_hash}")
+    else:
+        logger.error(f"Error logging fallback usage for transaction {tx_hash}")
+    return queued
 
 def update_ness_balance(telegram_id, new_balance):
     """
@@ -62,12 +373,9 @@ def update_ness_balance(telegram_id, new_balance):
         try:
             cursor = conn.cursor()
             cursor.execute('UPDATE users SET ness_balance = ? WHERE telegram_id = ?', (new_balance, telegram_id))
-            conn.commit()
             logger.info(f"Updated NESS balance for user ID: {telegram_id} to {new_balance}")
         except sqlite3.Error as e:
             logger.error(f"Error updating NESS balance: {e}")
-        finally:
-            conn.close()
 
 
 # Initialize the database (create tables if they don't exist)
@@ -75,42 +383,166 @@ def initialize_db():
     conn = get_db_connection()
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS bot_subscriptions (
-                    telegram_id INTEGER,
-                    bot_name TEXT,
-                    bot_username TEXT,
-                    payment_address TEXT,
-                    expires_at DATETIME,
-                    PRIMARY KEY (telegram_id, bot_name)
-                )
-            ''')
-            conn.commit()
+            # One commit for the whole schema
+            with transaction():
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS users (
+                        telegram_id INTEGER PRIMARY KEY,
+                        username TEXT,
+                        ness_balance REAL DEFAULT 0,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fallback_logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        tx_hash TEXT,
+                        method TEXT,
+                        timestamp DATETIME
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS bot_subscriptions (
+                        telegram_id INTEGER,
+                        bot_name TEXT,
+                        bot_username TEXT,
+                        payment_address TEXT,
+                        expires_at DATETIME,
+                        PRIMARY KEY (telegram_id, bot_name)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_bot_subscriptions_expires_at
+                    ON bot_subscriptions (expires_at)
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS verified_transactions (
+                        tx_hash TEXT PRIMARY KEY,
+                        payment_address TEXT,
+                        from_address TEXT,
+                        nch_amount INTEGER,
+                        verified_at DATETIME,
+                        telegram_id INTEGER,
+                        bot_name TEXT,
+                        claimed_at DATETIME
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS verification_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        telegram_id INTEGER,
+                        bot_name TEXT,
+                        tx_hash TEXT,
+                        status TEXT,
+                        result TEXT,
+                        created_at DATETIME,
+                        updated_at DATETIME,
+                        owner TEXT,
+                        lease_expires_at DATETIME
+                    )
+                ''')
+                # Databases created before job leases lack their columns
+                columns = {row['name'] for row in cursor.execute('PRAGMA table_info(verification_jobs)').fetchall()}
+                for column, declaration in (('owner', 'TEXT'), ('lease_expires_at', 'DATETIME')):
+                    if column not in columns:
+                        cursor.execute(f'ALTER TABLE verification_jobs ADD COLUMN {column} {declaration}')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_verification_jobs_status
+                    ON verification_jobs (status, lease_expires_at)
+                ''')
             logger.info("Database initialized successfully.")
         except sqlite3.Error as e:
             logger.error(f"Error initializing database: {e}")
-        finally:
-            conn.close()
     else:
         logger.error("Failed to initialize database. No connection established.")
 
-# Save bot subscription to the database
-def save_bot_subscription(subscription):
+# (telegram_id, bot_name) -> expires_at, or None when there is no active subscription
+_subscription_cache = LRUCache(maxsize=Config.SUBSCRIPTION_CACHE_SIZE)
+_NOT_CACHED = object()
+
+def _cache_subscription_expiry(telegram_id, bot_name, expires_at):
+    """
+    Cache an expiry, never past the moment the subscription lapses.
+    TTLs bound how long a write made by another process can go unseen.
+    """
+    if expires_at is not None:
+        remaining = (expires_at - datetime.now()).total_seconds()
+        if remaining > 0:
+            _subscription_cache.set((telegram_id, bot_name), expires_at, ttl=min(remaining, Config.SUBSCRIPTION_CACHE_TTL))
+            return
+    _subscription_cache.set((telegram_id, bot_name), None, ttl=Config.SUBSCRIPTION_NEGATIVE_CACHE_TTL)
+
+def invalidate_subscription_cache(telegram_id=None, bot_name=None):
+    """
+    Drop one cached entry, or everything when called without arguments.
+    """
+    if telegram_id is None:
+        _subscription_cache.clear()
+    else:
+        _subscription_cache.pop((telegram_id, bot_name))
+
+def get_subscription_cache_stats():
+    return _subscription_cache.stats()
+
+def get_subscription_expiry(telegram_id, bot_name):
+    """
+    Expiry of the user's active subscription to `bot_name`, or None.
+    Served from memory at steady state; SQLite is only read on a miss.
+    """
+    expires_at = _subscription_cache.get((telegram_id, bot_name), _NOT_CACHED)
+    if expires_at is not _NOT_CACHED:
+        return expires_at
+
+    subscription = get_user_bot_subscription(telegram_id, bot_name)
+    expires_at = subscription['expires_at'] if subscription else None
+    if expires_at is not None and expires_at <= datetime.now():
+        expires_at = None
+    _cache_subscription_expiry(telegram_id, bot_name, expires_at)
+    return expires_at
+
+def get_subscription_expiries(telegram_id, bot_names):
+    """
+    Expiry of the user's active subscription to each of `bot_names` (None if none),
+    read with a single query on the primary key. Primes the per-bot cache.
+    """
+    now = datetime.now()
+    expiries = {bot_name: None for bot_name in bot_names}
     conn = get_db_connection()
     if conn:
         try:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO bot_subscriptions (telegram_id, bot_name, bot_username, payment_address, expires_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (subscription['telegram_id'], subscription['bot_name'], subscription['bot_username'], subscription['payment_address'], subscription['expires_at']))
-            conn.commit()
+                SELECT bot_name, expires_at FROM bot_subscriptions
+                WHERE telegram_id = ? AND expires_at > ?
+            ''', (telegram_id, now))
+            for row in cursor.fetchall():
+                if row['bot_name'] in expiries:
+                    expiries[row['bot_name']] = row['expires_at']
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving subscriptions: {e}")
+            # Fall back to per-bot lookups, which may still be cached
+            return {bot_name: get_subscription_expiry(telegram_id, bot_name) for bot_name in bot_names}
+    for bot_name, expires_at in expiries.items():
+        _cache_subscription_expiry(telegram_id, bot_name, expires_at)
+    return expiries
+
+def _insert_bot_subscription(cursor, subscription):
+    cursor.execute('''
+        INSERT OR REPLACE INTO bot_subscriptions (telegram_id, bot_name, bot_username, payment_address, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (subscription['telegram_id'], subscription['bot_name'], subscription['bot_username'], subscription['payment_address'], subscription['expires_at']))
+
+# Save bot subscription to the database (autocommit; see claim_transaction_for_subscription for payments)
+def save_bot_subscription(subscription):
+    conn = get_db_connection()
+    if conn:
+        try:
+            _insert_bot_subscription(conn.cursor(), subscription)
+            _cache_subscription_expiry(subscription['telegram_id'], subscription['bot_name'], subscription['expires_at'])
             logger.info(f"Saved subscription for user ID: {subscription['telegram_id']} to bot: {subscription['bot_name']}.")
         except sqlite3.Error as e:
             logger.error(f"Error saving subscription: {e}")
-        finally:
-            conn.close()
 
 # Get user bot subscription
 def get_user_bot_subscription(telegram_id, bot_name):
@@ -126,8 +558,6 @@ def get_user_bot_subscription(telegram_id, bot_name):
         except sqlite3.Error as e:
             logger.error(f"Error retrieving subscription: {e}")
             return None
-        finally:
-            conn.close()
 
 # Remove bot subscription
 def remove_bot_subscription(telegram_id, bot_name):
@@ -139,9 +569,268 @@ def remove_bot_subscription(telegram_id, bot_name):
                 DELETE FROM bot_subscriptions
                 WHERE telegram_id = ? AND bot_name = ?
             ''', (telegram_id, bot_name))
-            conn.commit()
+            _cache_subscription_expiry(telegram_id, bot_name, None)
             logger.info(f"Removed subscription for user ID: {telegram_id} from bot: {bot_name}.")
         except sqlite3.Error as e:
             logger.error(f"Error removing subscription: {e}")
-        finally:
-            conn.close()
\ No newline at end of file
+
+# Get subscriptions expiring before `horizon`, soonest first (served by idx_bot_subscriptions_expires_at)
+def get_subscriptions_expiring_before(horizon, limit):
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT telegram_id, bot_name, expires_at FROM bot_subscriptions
+                WHERE expires_at <= ?
+                ORDER BY expires_at
+                LIMIT ?
+            ''', (horizon, limit))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving expiring subscriptions: {e}")
+            return []
+    return []
+
+# Remove up to `limit` subscriptions that expired before `now`
+def remove_expired_subscriptions(now, limit):
+    """
+    Returns the (telegram_id, bot_name) keys that were revoked.
+    """
+    conn = get_db_connection()
+    if conn:
+        try:
+            with transaction():
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT telegram_id, bot_name FROM bot_subscriptions
+                    WHERE expires_at <= ?
+                    ORDER BY expires_at
+                    LIMIT ?
+                ''', (now, limit))
+                expired = [(row['telegram_id'], row['bot_name']) for row in cursor.fetchall()]
+                cursor.executemany('''
+                    DELETE FROM bot_subscriptions
+                    WHERE telegram_id = ? AND bot_name = ?
+                ''', expired)
+            for telegram_id, bot_name in expired:
+                _cache_subscription_expiry(telegram_id, bot_name, None)
+            if expired:
+                logger.info(f"Revoked {len(expired)} expired subscriptions.")
+            return expired
+        except sqlite3.Error as e:
+            logger.error(f"Error removing expired subscriptions: {e}")
+            return []
+    return []
+
+# Get the distinct (paying address, bot) pairs of subscriptions that are still active
+def get_active_payments(now):
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT payment_address, bot_name FROM bot_subscriptions
+                WHERE expires_at > ? AND payment_address IS NOT NULL
+            ''', (now,))
+            return [(row['payment_address'], row['bot_name']) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving active payment addresses: {e}")
+            return []
+    return []
+
+# Remove every subscription to `bot_name` paid from `payment_address`, for each pair in `payments`
+def remove_subscriptions_for_payments(payments):
+    """
+    Returns the (telegram_id, bot_name) keys that were revoked.
+    """
+    conn = get_db_connection()
+    if conn and payments:
+        try:
+            placeholders = ','.join('(?, ?)' for _ in payments)
+            params = [value for payment in payments for value in payment]
+            with transaction():
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT telegram_id, bot_name FROM bot_subscriptions
+                    WHERE (payment_address, bot_name) IN (VALUES {placeholders})
+                ''', params)
+                revoked = [(row['telegram_id'], row['bot_name']) for row in cursor.fetchall()]
+                cursor.execute(f'''
+                    DELETE FROM bot_subscriptions
+                    WHERE (payment_address, bot_name) IN (VALUES {placeholders})
+                ''', params)
+            for telegram_id, bot_name in revoked:
+                _cache_subscription_expiry(telegram_id, bot_name, None)
+            if revoked:
+                logger.info(f"Revoked {len(revoked)} subscriptions below the minimum NESS balance.")
+            return revoked
+        except sqlite3.Error as e:
+            logger.error(f"Error removing subscriptions for payments: {e}")
+            return []
+    return []
+
+# Save a transaction that passed on-chain validation (confirmed transactions never change)
+def save_verified_transaction(transaction):
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO verified_transactions (tx_hash, payment_address, from_address, nch_amount, verified_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (transaction['tx_hash'], transaction['payment_address'], transaction['from_address'], transaction['nch_amount'], transaction['verified_at']))
+            logger.info(f"Saved verified transaction: {transaction['tx_hash']}.")
+        except sqlite3.Error as e:
+            logger.error(f"Error saving verified transaction: {e}")
+
+# Get a verified transaction by hash
+def get_verified_transaction(tx_hash):
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM verified_transactions
+                WHERE tx_hash = ?
+            ''', (tx_hash,))
+            return cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving verified transaction: {e}")
+            return None
+
+# Spend a verified transaction on a subscription: the claim and the subscription commit together or not at all
+def claim_transaction_for_subscription(tx_hash, subscription):
+    """
+    Returns True only for the first caller; a replayed hash is never claimed twice.
+    Database errors are raised after the transaction has rolled back, leaving the hash unclaimed.
+    """
+    if get_db_connection() is None:
+        raise sqlite3.OperationalError("No database connection")
+
+    telegram_id, bot_name = subscription['telegram_id'], subscription['bot_name']
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE verified_transactions
+            SET telegram_id = ?, bot_name = ?, claimed_at = ?
+            WHERE tx_hash = ? AND telegram_id IS NULL
+        ''', (telegram_id, bot_name, datetime.now(), tx_hash))
+        if cursor.rowcount != 1:
+            return False
+        _insert_bot_subscription(cursor, subscription)
+
+    # Only cache what has been committed
+    _cache_subscription_expiry(telegram_id, bot_name, subscription['expires_at'])
+    logger.info(f"Transaction {tx_hash} claimed by user ID: {telegram_id} for bot: {bot_name}.")
+    return True
+
+# Persist a new payment verification job, leased to the process that will run it
+def create_verification_job(job):
+    """
+    Returns whether the job was stored; a job that was not must not be run.
+    """
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO verification_jobs (job_id, telegram_id, bot_name, tx_hash, status, created_at, updated_at,
+                                               owner, lease_expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job['job_id'], job['telegram_id'], job['bot_name'], job['tx_hash'], job['status'], job['created_at'],
+                  job['created_at'], job['owner'], job['lease_expires_at']))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error creating verification job: {e}")
+    return False
+
+# Update the status (and final result) of a verification job
+def update_verification_job(job_id, status, result=None, owner=None):
+    """
+    With `owner`, only updates a job that process still holds; returns whether a row was updated.
+    """
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            if owner is None:
+                cursor.execute('''
+                    UPDATE verification_jobs
+                    SET status = ?, result = ?, updated_at = ?
+                    WHERE job_id = ?
+                ''', (status, result, datetime.now(), job_id))
+            else:
+                cursor.execute('''
+                    UPDATE verification_jobs
+                    SET status = ?, result = ?, updated_at = ?
+                    WHERE job_id = ? AND owner = ?
+                ''', (status, result, datetime.now(), job_id, owner))
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.error(f"Error updating verification job: {e}")
+    return False
+
+# Extend the leases of the unfinished jobs `owner` is holding
+def renew_verification_job_leases(job_ids, owner, lease_expires_at):
+    """
+    Returns how many leases were renewed; fewer than len(job_ids) means some were taken over.
+    """
+    conn = get_db_connection()
+    if conn and job_ids:
+        try:
+            placeholders = ','.join('?' * len(job_ids))
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE verification_jobs
+                SET lease_expires_at = ?
+                WHERE owner = ? AND status IN ('queued', 'running') AND job_id IN ({placeholders})
+            ''', [lease_expires_at, owner] + list(job_ids))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error renewing verification job leases: {e}")
+    return 0
+
+# Get a verification job by id
+def get_verification_job(job_id):
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM verification_jobs
+                WHERE job_id = ?
+            ''', (job_id,))
+            return cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving verification job: {e}")
+            return None
+
+# Take over up to `limit` unfinished jobs whose owner stopped renewing their lease
+def claim_orphaned_verification_jobs(owner, now, lease_expires_at, limit):
+    """
+    Jobs still leased by a live process are left alone. Returns the claimed rows, re-queued under `owner`.
+    """
+    conn = get_db_connection()
+    if conn and limit > 0:
+        try:
+            with transaction():
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT * FROM verification_jobs
+                    WHERE status IN ('queued', 'running')
+                      AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                    ORDER BY created_at
+                    LIMIT ?
+                ''', (now, limit))
+                orphaned = cursor.fetchall()
+                cursor.executemany('''
+                    UPDATE verification_jobs
+                    SET status = 'queued', owner = ?, lease_expires_at = ?, updated_at = ?
+                    WHERE job_id = ?
+                ''', [(owner, lease_expires_at, now, row['job_id']) for row in orphaned])
+            return orphaned
+        except sqlite3.Error as e:
+            logger.error(f"Error claiming orphaned verification jobs: {e}")
+            return []
+    return []
@@ -0,0 +1,142 @@
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _chat_key(update: Dict[str, Any]):
+    """
+    The chat an update belongs to, so its updates can be kept in order.
+    """
+    for field in ('message', 'edited_message', 'channel_post'):
+        if field in update:
+            return update[field].get('chat', {}).get('id')
+    callback = update.get('callback_query')
+    if callback:
+        message = callback.get('message')
+        if message:
+            return message.get('chat', {}).get('id')
+        return callback.get('from', {}).get('id')
+    return update.get('update_id')
+
+
+class UpdateDispatcher:
+    """
+    Fans Telegram updates out to a pool of workers so the receiving thread
+    (webhook request or poller) never waits on a slow handler.
+
+    Updates are sharded by chat, one queue per worker, so updates from the same
+    chat are processed in order while different chats run concurrently.
+    `committed_offset()` only moves past an update once it, and every update
+    before it, has been processed; re-delivered updates that are still in
+    flight or were processed recently are dropped as duplicates.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], None], workers: int = 4, max_queue: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        shard_size = max(1, max_queue // workers)
+        self._queues = [queue.Queue(maxsize=shard_size) for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._progress = threading.Condition(self._lock)
+        self._in_flight = set()
+        self._recent: "OrderedDict[int, None]" = OrderedDict()
+        self._max_seen: Optional[int] = None
+        self._dispatched = 0
+        self._processed = 0
+        self._rejected = 0
+        self._duplicates = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index, shard in enumerate(self._queues):
+                thread = threading.Thread(target=self._run, args=(shard,), name=f'update-dispatcher-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, update: Dict[str, Any], timeout: Optional[float] = 0) -> bool:
+        """
+        Queue an update. Waits up to `timeout` seconds (None: forever) for room
+        in its chat's queue; returns False if it is still full.
+        """
+        self.start()
+        update_id = update.get('update_id')
+        with self._lock:
+            if update_id is not None:
+                if update_id in self._in_flight or update_id in self._recent:
+                    self._duplicates += 1
+                    return True
+                self._in_flight.add(update_id)
+                if self._max_seen is None or update_id > self._max_seen:
+                    self._max_seen = update_id
+
+        shard = self._queues[hash(_chat_key(update)) % self.workers]
+        try:
+            if timeout == 0:
+                shard.put_nowait(update)
+            else:
+                shard.put(update, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._in_flight.discard(update_id)
+                self._rejected += 1
+            return False
+
+        with self._lock:
+            self._dispatched += 1
+        return True
+
+    def _run(self, shard: queue.Queue):
+        while True:
+            update = shard.get()
+            try:
+                self.handler(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.get('update_id')}: {e}")
+            with self._progress:
+                self._processed += 1
+                update_id = update.get('update_id')
+                if update_id is not None:
+                    self._in_flight.discard(update_id)
+                    self._recent[update_id] = None
+                    while len(self._recent) > self.max_queue:
+                        self._recent.popitem(last=False)
+                self._progress.notify_all()
+
+    def committed_offset(self, default: int = 0) -> int:
+        """
+        getUpdates offset that confirms only fully processed updates.
+        """
+        with self._lock:
+            if self._in_flight:
+                return min(self._in_flight)
+            return self._max_seen + 1 if self._max_seen is not None else default
+
+    def wait_for_progress(self, timeout: float) -> bool:
+        """
+        Block until some in-flight update completes; returns False on timeout or if nothing is in flight.
+        """
+        with self._progress:
+            if not self._in_flight:
+                return False
+            processed = self._processed
+            return self._progress.wait_for(lambda: self._processed != processed, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': sum(shard.qsize() for shard in self._queues),
+                'in_flight': len(self._in_flight),
+                'dispatched': self._dispatched,
+                'processed': self._processed,
+                'rejected': self._rejected,
+                'duplicates': self._duplicates,
+            }
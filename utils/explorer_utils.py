@@ -0,0 +1,115 @@
+import logging
+import requests
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.config import Config
+from utils.trace_utils import traced
+
+logger = logging.getLogger(__name__)
+
+# The explorer backend reports balances in droplets (1 NESS = 1,000,000 droplets)
+DROPLETS_PER_COIN = 1_000_000
+
+
+def _parse_coins(value) -> float:
+    """
+    Verbose transaction outputs carry coins as decimal strings ("12.000000"),
+    balance endpoints as integer droplets.
+    """
+    if isinstance(value, str):
+        return float(value.replace(",", ""))
+    return value / DROPLETS_PER_COIN
+
+
+class ExplorerClient:
+    """
+    Plain HTTP client for the NESS explorer's JSON backend.
+    Returns the same result dicts as the Selenium scrapers without rendering the Angular app.
+    """
+
+    def __init__(self, base_url: str = None, timeout: float = None, pool_size: int = None,
+                 session: requests.Session = None):
+        self.base_url = (base_url or Config.EXPLORER_URL).rstrip('/')
+        self.timeout = timeout or Config.EXPLORER_HTTP_TIMEOUT
+        pool_size = pool_size or Config.EXPLORER_HTTP_POOL_SIZE
+
+        # Keep-alive connections are reused across verifications
+        self.session = session or requests.Session()
+        retries = Retry(total=2, backoff_factor=0.1, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json'})
+
+    @traced('explorer.get')
+    def _get(self, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        GET a backend endpoint. Returns None on 404, raises on any other failure.
+        """
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def get_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the verbose transaction record, or None if the explorer does not know it.
+        """
+        return self._get(Config.EXPLORER_TX_API_PATH, {'txid': tx_hash, 'verbose': 1})
+
+    def get_balance(self, address: str) -> Optional[float]:
+        """
+        Confirmed NESS balance of `address`, or None if it could not be fetched.
+        """
+        try:
+            data = self._get(Config.EXPLORER_BALANCE_API_PATH, {'addrs': address})
+            if data is None:
+                logger.error(f"[EXPLORER API FAILED] Address: {address} | Balance endpoint returned 404")
+                return None
+            balance_value = _parse_coins(data['confirmed']['coins'])
+            logger.info(f"[EXPLORER API] Address: {address} | Balance: {balance_value} NESS")
+            return balance_value
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.error(f"[EXPLORER API FAILED] Address: {address} | Error: {e}")
+            return None
+
+    def validate_payment(self, tx_hash: str, required_nch: int, payment_address: str) -> Dict[str, Any]:
+        """
+        Check that `tx_hash` is confirmed and sent at least `required_nch` hours to `payment_address`.
+        """
+        try:
+            data = self.get_transaction(tx_hash)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"[EXPLORER API FAILED] TX: {tx_hash} | Error: {e}")
+            return {"valid": False, "error": "Explorer unreachable. Please try again later.", "reason": "unreachable"}
+
+        if data is None:
+            return {"valid": False, "error": "Transaction not found", "reason": "not_found"}
+
+        try:
+            confirmed = bool(data['status']['confirmed'])
+            txn = data['txn']
+            sender_address = txn['inputs'][0]['owner']
+            nch_sent = sum(int(output['hours']) for output in txn['outputs'] if output['dst'] == payment_address)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(f"[EXPLORER API FAILED] TX: {tx_hash} | Unexpected payload: {e}")
+            return {"valid": False, "error": "Explorer unreachable. Please try again later.", "reason": "unreachable"}
+
+        logger.info(f"[EXPLORER API] TX: {tx_hash} | Confirmed: {confirmed} | NCH Sent: {nch_sent} | Sender: {sender_address}")
+
+        if not confirmed:
+            return {"valid": False, "error": "Transaction not yet confirmed", "reason": "unconfirmed"}
+
+        if nch_sent >= required_nch:
+            return {
+                "valid": True,
+                "from_address": sender_address,
+                "nch_amount": nch_sent
+            }
+
+        return {"valid": False, "error": "Transaction does not meet required NCH conditions", "reason": "insufficient"}
+
+    def close(self):
+        self.session.close()
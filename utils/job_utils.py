@@ -0,0 +1,251 @@
+import os
+import json
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from utils.config import Config
+from utils.trace_utils import span
+from utils.db_utils import (
+    create_verification_job,
+    update_verification_job,
+    get_verification_job,
+    renew_verification_job_leases,
+    claim_orphaned_verification_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the verification queue is at capacity."""
+
+
+class JobNotQueuedError(Exception):
+    """Raised when a job could not be stored or scheduled; nothing will run for it."""
+
+
+class VerificationJobQueue:
+    """
+    Runs payment verifications on a bounded worker pool so request threads return immediately.
+
+    Job state lives in SQLite. Each job is leased to the process running it,
+    which renews the lease while the job is queued or running. Only the
+    leader recovers jobs, and only once their lease has run out (the process
+    died or restarted), so jobs still running in another worker are never
+    verified twice.
+    """
+
+    def __init__(self, bot_access_manager, workers: int = None, max_pending: int = None, lease: float = None):
+        self.bot_access_manager = bot_access_manager
+        self.workers = workers or Config.VERIFICATION_WORKERS
+        self.max_pending = max_pending or Config.VERIFICATION_QUEUE_SIZE
+        self.lease = lease or Config.VERIFICATION_JOB_LEASE
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='verify')
+        self._lock = threading.Lock()
+        self._active = set()
+        self._recovering = False
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._resumed = 0
+        self._leases_lost = 0
+
+    @staticmethod
+    def owner() -> str:
+        # Workers are forked from one master, so the pid is read on every call
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _lease_expiry(self) -> datetime:
+        return datetime.now() + timedelta(seconds=self.lease)
+
+    def _ensure_maintenance(self):
+        # Threads do not survive fork, so each process starts its own
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._maintain, name='verify-leases', daemon=True)
+            self._thread.start()
+
+    def _maintain(self):
+        while not self._stopped.wait(self.lease / 3):
+            self._renew_leases()
+            if self._recovering:
+                self.resume_unfinished()
+
+    def _renew_leases(self):
+        with self._lock:
+            job_ids = list(self._active)
+        if not job_ids:
+            return
+        renewed = renew_verification_job_leases(job_ids, self.owner(), self._lease_expiry())
+        if renewed < len(job_ids):
+            logger.warning(f"[JOB LEASE] Renewed {renewed} of {len(job_ids)} leases; the rest finished or were taken over")
+
+    def _release(self, job_id: str = None):
+        # Undo the bookkeeping for a job that will not run here
+        with self._lock:
+            self._pending -= 1
+            self._active.discard(job_id)
+
+    def submit(self, telegram_id: int, bot_name: str, tx_hash: str) -> Dict[str, Any]:
+        """
+        Queue a verification and return the new job. Raises QueueFullError when saturated,
+        JobNotQueuedError when the job cannot be stored or the queue has shut down.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise QueueFullError(f"{self._pending} verifications already pending")
+            self._pending += 1
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'telegram_id': telegram_id,
+            'bot_name': bot_name,
+            'tx_hash': tx_hash,
+            'status': JOB_QUEUED,
+            'created_at': datetime.now(),
+            'owner': self.owner(),
+            'lease_expires_at': self._lease_expiry()
+        }
+        self._ensure_maintenance()
+        if not create_verification_job(job):
+            self._release()
+            raise JobNotQueuedError("verification job could not be stored")
+        with self._lock:
+            self._active.add(job['job_id'])
+        try:
+            self._executor.submit(self._run, job['job_id'], telegram_id, bot_name, tx_hash)
+        except RuntimeError as e:
+            # Shut down: fail the stored job so no leader resumes it behind the client's back
+            self._release(job['job_id'])
+            update_verification_job(job['job_id'], JOB_FAILED, json.dumps({'success': False, 'message': 'Internal error'}))
+            raise JobNotQueuedError(str(e))
+        with self._lock:
+            self._submitted += 1
+        logger.info(f"[JOB QUEUED] Job: {job['job_id']} | TX: {tx_hash} | Bot: {bot_name} | User: {telegram_id}")
+        return {'job_id': job['job_id'], 'status': JOB_QUEUED}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current state of a job, with the verification result once it has finished.
+        """
+        row = get_verification_job(job_id)
+        if row is None:
+            return None
+        return {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None
+        }
+
+    def start_recovery(self):
+        """
+        Resume orphaned jobs now and every lease/3 seconds from here on (leader only).
+        """
+        self._recovering = True
+        self._ensure_maintenance()
+        self.resume_unfinished()
+
+    def resume_unfinished(self) -> int:
+        """
+        Take over unfinished jobs whose lease expired, as many as the queue has room for.
+        The rest are left for the next pass.
+        """
+        with self._lock:
+            room = self.max_pending - self._pending
+        if room <= 0:
+            return 0
+
+        rows = claim_orphaned_verification_jobs(self.owner(), datetime.now(), self._lease_expiry(), room)
+        resumed = 0
+        for row in rows:
+            with self._lock:
+                self._pending += 1
+                self._active.add(row['job_id'])
+            try:
+                self._executor.submit(self._run, row['job_id'], row['telegram_id'], row['bot_name'], row['tx_hash'])
+            except RuntimeError:
+                # Shut down: the leases are no longer renewed, so the next leader takes these over
+                self._release(row['job_id'])
+                break
+            with self._lock:
+                self._submitted += 1
+                self._resumed += 1
+            resumed += 1
+        if resumed:
+            logger.info(f"[JOB RESUME] Re-queued {resumed} orphaned verification jobs")
+        return resumed
+
+    def _run(self, job_id: str, telegram_id: int, bot_name: str, tx_hash: str):
+        # Runs on a pool thread, outside the request's trace, so it starts its own
+        with span('verification_job', root=True, job_id=job_id, bot_name=bot_name):
+            self._execute(job_id, telegram_id, bot_name, tx_hash)
+
+    def _execute(self, job_id: str, telegram_id: int, bot_name: str, tx_hash: str):
+        owner = self.owner()
+        try:
+            if not update_verification_job(job_id, JOB_RUNNING, owner=owner):
+                self._lease_lost(job_id)
+                return
+            try:
+                result = self.bot_access_manager.verify_payment_transaction(telegram_id, bot_name, tx_hash)
+            except Exception as e:
+                logger.error(f"[JOB FAILED] Job: {job_id} | Error: {e}")
+                with self._lock:
+                    self._failed += 1
+                if not update_verification_job(job_id, JOB_FAILED, json.dumps({'success': False, 'message': 'Internal error'}), owner=owner):
+                    self._lease_lost(job_id)
+                return
+
+            # Never overwrite the result of whichever process took the job over
+            if not update_verification_job(job_id, JOB_DONE, json.dumps(result), owner=owner):
+                self._lease_lost(job_id)
+                return
+            with self._lock:
+                self._completed += 1
+            logger.info(f"[JOB DONE] Job: {job_id} | Result: {result}")
+        finally:
+            self._release(job_id)
+
+    def _lease_lost(self, job_id: str):
+        with self._lock:
+            self._leases_lost += 1
+        logger.warning(f"[JOB LEASE] Job: {job_id} was taken over by another process; discarding this run")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'resumed': self._resumed,
+                'leases_lost': self._leases_lost,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting work. Jobs that never started stay queued in SQLite; the leader
+        resumes them once their lease runs out.
+        """
+        self._stopped.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,49 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Lazy(Generic[T]):
+    """
+    A service built on first use (or by an explicit warm-up) rather than at import.
+
+    `get()` runs the factory once; concurrent first callers wait for the same
+    instance. A factory that raises is retried on the next call.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                self._instance = self._factory()
+                self.init_seconds = time.perf_counter() - started
+                logger.info(f"[LAZY] Initialised {self.name} in {self.init_seconds * 1000:.1f} ms")
+            return self._instance
+
+    def peek(self) -> Optional[T]:
+        """
+        The instance if it has been built, without building it.
+        """
+        return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {'loaded': self.loaded, 'init_ms': round(self.init_seconds * 1000, 1) if self.init_seconds else None}
@@ -0,0 +1,111 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Optional, Tuple
+from utils.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-worker server, the only process leads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Picks one process per host to run background singletons, using an
+    exclusive flock on a lock file. The kernel releases the lock when the
+    leader exits, so a follower polling `try_acquire` takes over.
+
+    Create it after fork: a lock file descriptor inherited from the master
+    would be shared by every worker.
+    """
+
+    def __init__(self, lock_path: str = None, retry_interval: float = None):
+        self.lock_path = lock_path or os.path.join(Config.RUNTIME_DIR, 'leader.lock')
+        self.retry_interval = retry_interval or Config.LEADER_RETRY_INTERVAL
+        self.is_leader = False
+        self._fd = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        logger.info(f"[LEADER] Process {os.getpid()} is the leader")
+        return True
+
+    def start(self, on_elected: Callable[[], None]):
+        """
+        Call `on_elected` once this process becomes leader, now or after the current leader exits.
+        """
+        if self.try_acquire():
+            on_elected()
+            return
+
+        def campaign():
+            while not self._stopped.wait(self.retry_interval):
+                if self.try_acquire():
+                    on_elected()
+                    return
+
+        self._thread = threading.Thread(target=campaign, name='leader-election', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._fd is not None:
+            os.close(self._fd)  # Releases the flock
+            self._fd = None
+            self.is_leader = False
+
+
+class SharedSnapshot:
+    """
+    A JSON document the leader publishes for follower processes to read,
+    replaced atomically so readers never see a partial write.
+    """
+
+    def __init__(self, name: str, directory: str = None):
+        self.path = os.path.join(directory or Config.RUNTIME_DIR, f'{name}.json')
+
+    def write(self, data: Any):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.snapshot-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def read(self) -> Tuple[Optional[Any], Optional[float]]:
+        """
+        The published document and its modification time, or (None, None).
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path) as f:
+                return json.load(f), mtime
+        except (OSError, ValueError):
+            return None, None
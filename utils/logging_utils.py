@@ -0,0 +1,211 @@
+"""
+Non-blocking logging.
+
+Request threads only put records on an in-memory queue (QueueHandler); one
+background QueueListener formats them and does the I/O: a console stream
+and a JSON-lines file. Every gunicorn worker appends to the same file, so
+it is never rotated from inside the app (workers renaming it under each
+other lose records); rotate it with logrotate, which WatchedFileHandler
+notices and reopens. Per call site, DEBUG records are rate-limited so hot
+loops cannot flood the queue.
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from utils.cache_utils import LRUCache
+from utils.config import Config
+from utils.rate_limit_utils import TokenBucket
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'suppressed'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, message, thread, plus any `extra=` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'pid': record.process,
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allows `rate` records per second (bursting to `burst`) from each call site
+    for levels below `max_level`. The next record let through carries the
+    number suppressed in between as `suppressed`.
+    """
+
+    def __init__(self, rate: float, burst: float = None, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._buckets = LRUCache(maxsize=4096)
+        self._suppressed: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self.total_suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.max_level:
+            return True
+
+        site = (record.pathname, record.lineno)
+        bucket = self._buckets.get(site)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets.set(site, bucket)
+
+        with self._lock:
+            if bucket.try_acquire() > 0:
+                self._suppressed[site] = self._suppressed.get(site, 0) + 1
+                self.total_suppressed += 1
+                return False
+            suppressed = self._suppressed.pop(site, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues without blocking; when the listener falls behind, records are dropped and counted.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only render what the listener cannot do later: the message and the traceback
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_output_handlers = []
+_rate_limit: Optional[RateLimitFilter] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """
+    'utils.db_utils=WARNING,urllib3=ERROR' -> {'utils.db_utils': 'WARNING', 'urllib3': 'ERROR'}
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _build_output_handlers():
+    console = logging.StreamHandler(sys.stderr)
+    if Config.LOG_FORMAT == 'json':
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+    handlers = [console]
+
+    if Config.LOG_FILE:
+        log_file = logging.handlers.WatchedFileHandler(Config.LOG_FILE, encoding='utf-8', delay=True)
+        log_file.setLevel(Config.LOG_FILE_LEVEL)
+        log_file.setFormatter(JsonFormatter())
+        handlers.append(log_file)
+    return handlers
+
+
+def _start_listener():
+    global _listener
+    _queue_handler.queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork (gunicorn preload); each worker needs its own
+    global _listener
+    if _queue_handler is None:
+        return
+    _listener = None
+    _start_listener()
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """
+    Route all logging through the queue. Safe to call more than once.
+    """
+    global _queue_handler, _output_handlers, _rate_limit
+    stop_logging()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in _output_handlers:
+        handler.close()
+
+    _output_handlers = _build_output_handlers()
+    _rate_limit = RateLimitFilter(Config.LOG_RATE_LIMIT, Config.LOG_RATE_BURST)
+    _queue_handler = _NonBlockingQueueHandler(None)
+    _queue_handler.addFilter(_rate_limit)
+    _start_listener()
+
+    root.addHandler(_queue_handler)
+    root.setLevel(Config.LOG_LEVEL)
+    for name, level in _parse_levels(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        'queued': _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+        'dropped': _NonBlockingQueueHandler.dropped,
+        'rate_limited': _rate_limit.total_suppressed if _rate_limit is not None else 0,
+    }
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(stop_logging)
@@ -0,0 +1,133 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from utils.config import Config
+from utils.cache_utils import StaleWhileRevalidateCache, SingleFlight
+from utils.leader_utils import SharedSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Only what the dashboard renders; CoinGecko's full records are ~30 fields each
+MARKET_FIELDS = ('id', 'name', 'symbol', 'current_price', 'market_cap', 'price_change_percentage_24h')
+
+SNAPSHOT_KEY = 'markets'
+
+
+class MarketDataCache:
+    """
+    One shared, pre-serialised snapshot of the CoinGecko markets endpoint.
+
+    Reads are served from memory. An expired snapshot keeps being served while
+    it is refreshed in the background, and concurrent misses share a single
+    upstream request. If CoinGecko is down the last good snapshot is kept.
+
+    Under a multi-worker server only the leader calls CoinGecko; it publishes
+    each snapshot to a shared file that followers load instead, falling back
+    to upstream themselves if the leader's copy goes stale.
+    """
+
+    def __init__(self, url: str = None, ttl: float = None, max_stale: float = None,
+                 timeout: float = None, session: requests.Session = None):
+        self.url = url or Config.API_ENDPOINTS['MARKET_DATA']
+        self.ttl = ttl or Config.MARKET_DATA_TTL
+        self.max_stale = max_stale or Config.MARKET_DATA_MAX_STALE
+        self.timeout = timeout or Config.MARKET_DATA_TIMEOUT
+        self.params = {
+            'vs_currency': Config.MARKET_DATA_VS_CURRENCY,
+            'order': 'market_cap_desc',
+            'per_page': Config.MARKET_DATA_PER_PAGE,
+            'page': 1,
+            'sparkline': 'false'
+        }
+
+        self.session = session or requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.headers.update({'Accept': 'application/json'})
+
+        self._flight = SingleFlight()
+        self._cache = StaleWhileRevalidateCache(self._load, ttl=self.ttl, max_stale=self.max_stale,
+                                                maxsize=1, refresh_workers=1)
+        self._last_good: Optional[Dict[str, Any]] = None
+        self._shared = SharedSnapshot('market_data')
+        self.leader = True
+        self._thread = None
+        self._stopped = threading.Event()
+        self.upstream_errors = 0
+
+    def _load(self, key) -> Optional[Dict[str, Any]]:
+        return self._flight.do(key, self._fetch)
+
+    def _fetch(self) -> Optional[Dict[str, Any]]:
+        if not self.leader:
+            data, mtime = self._shared.read()
+            if data is not None and time.time() - mtime < self.ttl + self.max_stale:
+                return self._snapshot(data['coins'], data['fetched_at'])
+
+        try:
+            response = self.session.get(self.url, params=self.params, timeout=self.timeout)
+            response.raise_for_status()
+            coins = [{field: coin.get(field) for field in MARKET_FIELDS} for coin in response.json()]
+        except (requests.RequestException, ValueError, TypeError, AttributeError) as e:
+            self.upstream_errors += 1
+            logger.error(f"[MARKET DATA] Upstream fetch failed: {e}")
+            return None
+
+        snapshot = self._snapshot(coins, time.time())
+        if self.leader:
+            try:
+                self._shared.write({'coins': coins, 'fetched_at': snapshot['fetched_at']})
+            except OSError as e:
+                logger.error(f"[MARKET DATA] Could not publish snapshot: {e}")
+        return snapshot
+
+    def _snapshot(self, coins, fetched_at: float) -> Dict[str, Any]:
+        body = json.dumps(coins, separators=(',', ':')).encode()
+        snapshot = {
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'fetched_at': fetched_at
+        }
+        self._last_good = snapshot
+        return snapshot
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """
+        Current snapshot ({'body', 'etag', 'fetched_at'}), or None if none was ever fetched.
+        """
+        return self._cache.get(SNAPSHOT_KEY) or self._last_good
+
+    def start(self, interval: float = None, leader: bool = True):
+        """
+        Refresh the snapshot on a timer so clients rarely see a stale one.
+        Calling it again with leader=True promotes a follower.
+        """
+        self.leader = leader
+        if self._thread is not None:
+            return
+        interval = interval or self.ttl
+
+        def run():
+            while True:
+                self._cache.refresh(SNAPSHOT_KEY)
+                if self._stopped.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name='market-data-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._last_good
+        return {
+            'cache': self._cache.stats(),
+            'upstream': self._flight.stats(),
+            'upstream_errors': self.upstream_errors,
+            'age_seconds': round(time.time() - snapshot['fetched_at'], 1) if snapshot else None,
+        }
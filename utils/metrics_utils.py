@@ -0,0 +1,362 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated inline (a lock and a bisect per
+observation); gauges for queue depths and cache hit rates are filled in by
+collectors at scrape time from the components' existing stats().
+
+Under gunicorn every worker has its own in-process values. Once
+`REGISTRY.share()` is called (each worker does, after fork), a worker
+writes its values to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds, and
+whichever worker answers a scrape merges every worker's file: counters and
+histograms are summed, so they stay monotonic across workers and worker
+restarts, and gauges get a `worker` label.
+"""
+import os
+import time
+import bisect
+import shutil
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from flask import Flask, Response, g, request
+from utils.config import Config
+from utils.leader_utils import SharedSnapshot
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans a cached lookup up to a slow Selenium page load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self, items: Optional[List[Tuple[Tuple, Any]]] = None) -> List[str]:
+        """
+        Exposition lines for `items` (merged across workers), or for this process's own values.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples(self.items() if items is None else items))
+        return lines
+
+    def items(self) -> List[Tuple[Tuple, Any]]:
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def dump(self) -> List[list]:
+        """
+        This process's values in a JSON-serialisable form, for `merge`.
+        """
+        return [[list(key), value] for key, value in self.items()]
+
+    def merge(self, dumps: List[List[list]]) -> List[Tuple[Tuple, Any]]:
+        """
+        Combine several processes' `dump()`s: by default values with the same labels are summed.
+        """
+        merged: Dict[Tuple, Any] = {}
+        for dump in dumps:
+            for key, value in dump:
+                key = tuple(key)
+                merged[key] = self._add(merged[key], value) if key in merged else value
+        return list(merged.items())
+
+    @staticmethod
+    def _add(total, value):
+        return total + value
+
+    def _samples(self, items: List[Tuple[Tuple, Any]]) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Merged per worker rather than summed: each process's series gets a `worker` label.
+    """
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1]]
+
+    @staticmethod
+    def _add(total, value):
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, items: List[Tuple[Tuple, Any]]) -> List[str]:
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds every metric and the collectors that refresh gauges before a scrape,
+    and, once `share()` is called, merges the values of every worker process.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.directory = None
+        self.flush_interval = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"[METRICS] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+
+    def share(self, directory: str = None, flush_interval: float = None):
+        """
+        Publish this process's values to `directory` from now on and merge every
+        process's values on render. Call it in each worker after fork.
+        """
+        self.directory = directory or Config.METRICS_DIR
+        self.flush_interval = flush_interval or Config.METRICS_FLUSH_INTERVAL
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+
+        def run():
+            while not self._stopped.wait(self.flush_interval):
+                self.flush()
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def flush(self):
+        """
+        Write this process's current values (gauges refreshed first) to its file.
+        """
+        if self.directory is None:
+            return
+        self._collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        try:
+            SharedSnapshot(str(os.getpid()), self.directory).write(
+                {metric.name: metric.dump() for metric in metrics}
+            )
+        except OSError as e:
+            logger.error(f"[METRICS] Could not write metrics snapshot: {e}")
+
+    def _worker_dumps(self) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """
+        pid -> (that worker's dumps, whether it has written recently).
+        """
+        dumps = {}
+        now = time.time()
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return dumps
+        for filename in filenames:
+            pid, ext = os.path.splitext(filename)
+            if ext != '.json' or not pid.isdigit():
+                continue
+            data, mtime = SharedSnapshot(pid, self.directory).read()
+            if data is not None:
+                dumps[pid] = (data, now - mtime < self.flush_interval * 3)
+        return dumps
+
+    def render(self) -> str:
+        if self.directory is None:
+            self._collect()
+            with self._lock:
+                metrics = list(self._metrics.values())
+            lines = []
+            for metric in metrics:
+                lines.extend(metric.render())
+            return '\n'.join(lines) + '\n'
+
+        # Our own file is rewritten first, so this process's values are current
+        self.flush()
+        dumps = self._worker_dumps()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if isinstance(metric, Gauge):
+                # A gauge from a worker that has stopped writing (it exited) is no longer true
+                items = [((*key, pid), value) for pid, (data, live) in sorted(dumps.items()) if live
+                         for key, value in metric.merge([data.get(metric.name, [])])]
+                gauge = Gauge(metric.name, metric.documentation, metric.labelnames + ('worker',))
+                lines.extend(gauge.render(items))
+            else:
+                # Exited workers' files are kept, so counters never go backwards
+                lines.extend(metric.render(metric.merge([data.get(metric.name, []) for data, _ in dumps.values()])))
+        return '\n'.join(lines) + '\n'
+
+
+def clear_shared_metrics(directory: str = None):
+    """
+    Forget every worker's published values; call once in the master at start-up.
+    """
+    shutil.rmtree(directory or Config.METRICS_DIR, ignore_errors=True)
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'ness_http_request_duration_seconds', 'Time spent handling a request, by route template',
+    ('route', 'method', 'status'))
+VERIFICATION_STAGE_SECONDS = REGISTRY.histogram(
+    'ness_verification_stage_duration_seconds', 'Time spent in each stage of payment verification',
+    ('stage',))
+VERIFICATION_RESULTS = REGISTRY.counter(
+    'ness_verification_results_total', 'Payment verification outcomes',
+    ('outcome',))
+FALLBACK_USAGE = REGISTRY.counter(
+    'ness_fallback_usage_total', 'Verification lookups served by a fallback backend',
+    ('operation', 'backend', 'outcome'))
+TELEGRAM_API_ERRORS = REGISTRY.counter(
+    'ness_telegram_api_errors_total', 'Failed Telegram Bot API calls',
+    ('method', 'reason'))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'ness_queue_depth', 'Items waiting in an in-process queue',
+    ('queue',))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    'ness_cache_hit_ratio', 'Hit ratio of an in-process cache since start',
+    ('cache',))
+LEADER = REGISTRY.gauge(
+    'ness_leader', '1 if the worker runs the background tasks')
+
+
+def init_metrics(app: Flask):
+    """
+    Time every request by its route template and serve GET /metrics.
+    """
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The template (/telegram/verify_bot_payment/<job_id>) keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route,
+                                         method=request.method, status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
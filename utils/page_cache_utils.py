@@ -0,0 +1,116 @@
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+from flask import Flask, Response, render_template, request
+from utils.config import Config
+from utils.assets_utils import refresh_manifest, manifest_version
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """
+    Renders context-free templates once and serves the stored bytes.
+
+    Each page is kept as identity and gzip bodies with strong ETags, so a
+    repeat visit costs a header comparison and a 304. Entries are keyed by
+    template, so routes rendering the same template share one entry. They are
+    re-rendered when a template or the asset manifest changes on disk; the
+    check is throttled to once every `check_interval` seconds.
+    """
+
+    def __init__(self, app: Flask, check_interval: float = None):
+        self.app = app
+        self.check_interval = check_interval if check_interval is not None else Config.PAGE_CACHE_CHECK_INTERVAL
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.renders = 0
+        self.hits = 0
+        self.not_modified = 0
+
+    def _watched_files(self):
+        for root, _, files in os.walk(os.path.join(self.app.root_path, self.app.template_folder)):
+            for filename in files:
+                yield os.path.join(root, filename)
+
+    def _current_version(self) -> Tuple[Optional[float], Any]:
+        mtimes = []
+        for path in self._watched_files():
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                continue
+        # Reload through assets_utils so the re-rendered pages get the new asset URLs
+        refresh_manifest(force=True)
+        return max(mtimes) if mtimes else None, manifest_version()
+
+    def _check_for_changes(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        version = self._current_version()
+        if version != self._version:
+            if self._version is not None:
+                logger.info("[PAGE CACHE] Templates or asset manifest changed, re-rendering pages")
+            self._version = version
+            self._pages.clear()
+            # Without TEMPLATES_AUTO_RELOAD Jinja keeps serving the compiled old template
+            if self.app.jinja_env.cache is not None:
+                self.app.jinja_env.cache.clear()
+
+    def _render(self, template: str) -> Dict[str, Any]:
+        body = render_template(template).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.renders += 1
+        return {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+            # Strong ETags must differ between encodings of the same page
+            'etag': digest,
+            'gzip_etag': f"{digest}-gz",
+        }
+
+    def get(self, template: str) -> Dict[str, Any]:
+        with self._lock:
+            self._check_for_changes()
+            page = self._pages.get(template)
+            if page is None:
+                page = self._pages[template] = self._render(template)
+            else:
+                self.hits += 1
+            return page
+
+    def respond(self, template: str) -> Response:
+        page = self.get(template)
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = page['gzip_etag'] if use_gzip else page['etag']
+
+        if request.if_none_match.contains(page['etag']) or request.if_none_match.contains(page['gzip_etag']):
+            self.not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(page['gzip'] if use_gzip else page['identity'], mimetype='text/html')
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+
+        response.set_etag(etag)
+        # Pages point at fingerprinted assets, so they must be revalidated to pick up a new deploy
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pages': len(self._pages),
+                'renders': self.renders,
+                'hits': self.hits,
+                'not_modified': self.not_modified,
+            }
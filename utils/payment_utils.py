@@ -1,22 +1,38 @@
 import logging
+import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from utils.blockchain_utils import PrivatenessBlockchainClient
+from utils.cache_utils import LRUCache, SingleFlight
 from utils.config import Config
+from utils.metrics_utils import VERIFICATION_STAGE_SECONDS, VERIFICATION_RESULTS
+from utils.trace_utils import traced
 from utils.db_utils import (
-    save_bot_subscription,
     get_user_bot_subscription,
+    get_subscription_expiry,
+    get_subscription_expiries,
     remove_bot_subscription,
     log_fallback_usage,
+    save_verified_transaction,
+    get_verified_transaction,
+    claim_transaction_for_subscription,
 )
 
 logger = logging.getLogger(__name__)
 
 class BotAccessManager:
-    def __init__(self):
-        self.blockchain_client = PrivatenessBlockchainClient()
+    def __init__(self, blockchain_client: PrivatenessBlockchainClient = None):
+        self.blockchain_client = blockchain_client or PrivatenessBlockchainClient()
         self.logger = logger
 
+        # tx_hash -> verified_transactions row; confirmed transactions never change
+        self.verified_transactions = LRUCache(maxsize=Config.VERIFIED_TX_CACHE_SIZE)
+        # (tx_hash, bot_name) -> failed validation, kept briefly so retries don't hit the explorer
+        self.failed_validations = LRUCache(maxsize=Config.VERIFIED_TX_CACHE_SIZE, ttl=Config.NEGATIVE_TX_CACHE_TTL)
+        # Concurrent verifications of the same (tx_hash, bot_name) share one explorer lookup
+        self.inflight_validations = SingleFlight()
+
+    @traced('bot_access.verify_bot_access')
     def verify_bot_access(self, telegram_id: int, bot_name: str, tx_hash: str) -> Dict[str, Any]:
         """
         Verifies bot access by checking if a valid transaction has been made.
@@ -27,8 +43,7 @@ class BotAccessManager:
             return {'success': False, 'message': f'Invalid bot: {bot_name}'}
 
         # Check if user already has an active subscription
-        subscription = get_user_bot_subscription(telegram_id, bot_name)
-        if subscription and subscription['expires_at'] > datetime.now():
+        if get_subscription_expiry(telegram_id, bot_name) is not None:
             return {
                 'success': True,
                 'message': 'You already have an active subscription',
@@ -48,11 +63,18 @@ class BotAccessManager:
             }
         }
 
+    @traced('bot_access.verify_payment_transaction')
     def verify_payment_transaction(self, telegram_id: int, bot_name: str, tx_hash: str) -> Dict[str, Any]:
         """
         Handles payment verification by checking transaction validity and NESS balance.
-        Uses RPC first, falls back to Selenium if needed.
+        Uses the explorer API first, falls back to RPC and Selenium if needed.
         """
+        with VERIFICATION_STAGE_SECONDS.time(stage='total'):
+            result = self._verify_payment_transaction(telegram_id, bot_name, tx_hash)
+        VERIFICATION_RESULTS.inc(outcome='success' if result.get('success') else 'failure')
+        return result
+
+    def _verify_payment_transaction(self, telegram_id: int, bot_name: str, tx_hash: str) -> Dict[str, Any]:
         bot_config = Config.BOT_PAYMENT_CONFIGS.get(bot_name)
         if not bot_config:
             logger.error(f"[Verification] Invalid bot: {bot_name}")
@@ -61,37 +83,40 @@ class BotAccessManager:
         # Log received transaction
         logger.info(f"[VERIFICATION] Checking TX: {tx_hash} for bot {bot_name} by user {telegram_id}")
 
-        # Validate transaction via RPC, fallback to Selenium if needed
-        tx_validation = self.blockchain_client.validate_transaction(tx_hash, bot_config['required_nch'])
+        # ✅ Reject replayed hashes before touching the explorer
+        verified_tx = self._get_verified_transaction(tx_hash)
+        if verified_tx and verified_tx['telegram_id'] is not None:
+            return self._replayed_transaction_response(verified_tx, telegram_id, bot_name, bot_config)
+
+        # Validate transaction via the explorer API, falling back to RPC/Selenium if needed
+        with VERIFICATION_STAGE_SECONDS.time(stage='validate_transaction'):
+            tx_validation = self._validate_transaction(tx_hash, bot_name, bot_config, verified_tx)
         
         if not tx_validation.get('valid'):
             log_fallback_usage(tx_hash, "Transaction Verification")
             logger.error(f"[VERIFICATION FAILED] TX: {tx_hash} | Reason: {tx_validation.get('error')}")
-            print(f"[VERIFICATION FAILED] TX: {tx_hash} | Reason: {tx_validation.get('error')}")  # Debugging
-            return {'success': False, 'message': 'Invalid transaction'}
+            return {'success': False, 'message': tx_validation.get('error', 'Invalid transaction')}
 
         # Extracted transaction data
         nch_sent = tx_validation.get('nch_amount', 0)
         paying_address = tx_validation.get('from_address')
 
         logger.info(f"[VERIFICATION SUCCESS] TX: {tx_hash} | NCH Sent: {nch_sent}")
-        print(f"[VERIFICATION SUCCESS] TX: {tx_hash} | NCH Sent: {nch_sent}")  # Debugging
 
         # ✅ Correct Validation: Check NCH Sent (Hours)
         if nch_sent < bot_config['required_nch']:
             logger.error(f"[VERIFICATION FAILED] TX: {tx_hash} | Sent {nch_sent} NCH, required {bot_config['required_nch']}")
-            print(f"[VERIFICATION FAILED] TX: {tx_hash} | Sent {nch_sent} NCH, required {bot_config['required_nch']}")  # Debugging
             return {'success': False, 'message': f'Not enough NCH included: {nch_sent} (expected: {bot_config["required_nch"]})'}
 
         # ✅ Check sender's NESS balance in wallet (not transaction)
-        balance_valid = self.blockchain_client.check_wallet_balance(paying_address, bot_config['minimum_ness'])
+        with VERIFICATION_STAGE_SECONDS.time(stage='balance_check'):
+            balance_valid = self.blockchain_client.check_wallet_balance(paying_address, bot_config['minimum_ness'])
         if not balance_valid:
             log_fallback_usage(paying_address, "Balance Check")
             logger.error(f"[VERIFICATION FAILED] TX: {tx_hash} | Sender {paying_address} has insufficient balance")
-            print(f"[VERIFICATION FAILED] TX: {tx_hash} | Sender {paying_address} has insufficient balance")  # Debugging
             return {'success': False, 'message': 'Insufficient NESS balance in wallet'}
 
-        # ✅ Save the subscription (if all conditions met)
+        # ✅ Spend the transaction and save the subscription (if all conditions met) in one commit
         subscription = {
             'telegram_id': telegram_id,
             'bot_name': bot_name,
@@ -99,10 +124,21 @@ class BotAccessManager:
             'payment_address': paying_address,
             'expires_at': datetime.now() + timedelta(days=Config.SUBSCRIPTION_DURATION_DAYS)
         }
-        save_bot_subscription(subscription)
+        try:
+            with VERIFICATION_STAGE_SECONDS.time(stage='db_write'):
+                claimed = claim_transaction_for_subscription(tx_hash, subscription)
+        except sqlite3.Error as e:
+            # Rolled back: the hash is still unclaimed, so the user can simply retry
+            logger.error(f"[VERIFICATION FAILED] TX: {tx_hash} | Could not save subscription: {e}")
+            return {'success': False, 'message': 'Could not activate the subscription. Please try again.'}
+        finally:
+            # Reload the ledger row on the next lookup so the claim is visible to replays
+            self.verified_transactions.pop(tx_hash)
+        if not claimed:
+            logger.error(f"[VERIFICATION FAILED] TX: {tx_hash} | Already claimed")
+            return {'success': False, 'message': 'This transaction has already been used'}
 
         logger.info(f"[SUBSCRIPTION ACTIVATED] User: {telegram_id} | Bot: {bot_name} | TX: {tx_hash}")
-        print(f"[SUBSCRIPTION ACTIVATED] User: {telegram_id} | Bot: {bot_name} | TX: {tx_hash}")  # Debugging
         
         return {
             'success': True,
@@ -111,17 +147,122 @@ class BotAccessManager:
             'payment_address': bot_config['payment_address']
         }
 
+    def _get_verified_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Ledger lookup through the in-process LRU, falling back to SQLite.
+        """
+        verified_tx = self.verified_transactions.get(tx_hash)
+        if verified_tx is None:
+            row = get_verified_transaction(tx_hash)
+            if row is not None:
+                verified_tx = dict(row)
+                self.verified_transactions.set(tx_hash, verified_tx)
+        return verified_tx
+
+    def _validate_transaction(self, tx_hash: str, bot_name: str, bot_config: Dict[str, Any],
+                              verified_tx: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Validate a transaction, answering from the ledger and the short-lived
+        negative cache whenever possible.
+        """
+        if verified_tx and verified_tx['payment_address'] == bot_config['payment_address']:
+            logger.info(f"[VERIFICATION] TX: {tx_hash} already verified, skipping explorer")
+            return {'valid': True, 'from_address': verified_tx['from_address'], 'nch_amount': verified_tx['nch_amount']}
+
+        return self.inflight_validations.do((tx_hash, bot_name), self._validate_with_explorer, tx_hash, bot_name, bot_config)
+
+    @traced('bot_access.validate_with_explorer')
+    def _validate_with_explorer(self, tx_hash: str, bot_name: str, bot_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the backend validation, recording the outcome in the ledger or the negative cache.
+        """
+        cache_key = (tx_hash, bot_name)
+        cached_failure = self.failed_validations.get(cache_key)
+        if cached_failure is not None:
+            logger.info(f"[VERIFICATION] TX: {tx_hash} failed recently, skipping explorer")
+            return cached_failure
+
+        tx_validation = self.blockchain_client.validate_transaction(tx_hash, bot_name)
+
+        if tx_validation.get('valid'):
+            verified_tx = {
+                'tx_hash': tx_hash,
+                'payment_address': bot_config['payment_address'],
+                'from_address': tx_validation.get('from_address'),
+                'nch_amount': tx_validation.get('nch_amount', 0),
+                'verified_at': datetime.now(),
+                'telegram_id': None,
+                'bot_name': None,
+                'claimed_at': None
+            }
+            save_verified_transaction(verified_tx)
+            self.verified_transactions.set(tx_hash, verified_tx)
+        elif tx_validation.get('reason') in ('unconfirmed', 'not_found', 'insufficient'):
+            # Explorer outages are not cached so users can retry as soon as it is back
+            self.failed_validations.set(cache_key, tx_validation)
+
+        return tx_validation
+
+    def _replayed_transaction_response(self, verified_tx: Dict[str, Any], telegram_id: int, bot_name: str,
+                                       bot_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A claimed hash only ever answers its own subscription; anyone else is rejected.
+        """
+        if verified_tx['telegram_id'] == telegram_id and verified_tx['bot_name'] == bot_name:
+            if get_subscription_expiry(telegram_id, bot_name) is not None:
+                return {
+                    'success': True,
+                    'message': 'Bot access granted',
+                    'bot_username': bot_config['bot_username'],
+                    'payment_address': bot_config['payment_address']
+                }
+
+        logger.error(f"[VERIFICATION FAILED] TX: {verified_tx['tx_hash']} | Replay rejected for user {telegram_id}")
+        return {'success': False, 'message': 'This transaction has already been used'}
+
+    @traced('bot_access.check_ongoing_bot_access')
     def check_ongoing_bot_access(self, telegram_id: int, bot_name: str) -> Dict[str, Any]:
         """
         Check and maintain ongoing bot access.
         If no subscription is found, trigger the payment modal.
         """
-        subscription = get_user_bot_subscription(telegram_id, bot_name)
-        if not subscription:
+        expires_at = get_subscription_expiry(telegram_id, bot_name)
+        if expires_at is None:
             return {'access': False, 'message': 'No active subscription'}
 
-        return {'access': True, 'expires_at': subscription['expires_at']}
+        return {'access': True, 'expires_at': expires_at}
+
+    @traced('bot_access.check_bot_access_batch')
+    def check_bot_access_batch(self, telegram_id: int, bot_names) -> Dict[str, Any]:
+        """
+        Access map for every bot in `bot_names` from one query, plus how many
+        seconds the caller may reuse it: until the earliest active subscription
+        lapses, capped at Config.ACCESS_BATCH_MAX_AGE.
+        """
+        expiries = get_subscription_expiries(telegram_id, bot_names)
+        now = datetime.now()
+        access = {}
+        valid_for = Config.ACCESS_BATCH_MAX_AGE
+        for bot_name, expires_at in expiries.items():
+            if expires_at is None:
+                access[bot_name] = {'access': False}
+                continue
+            access[bot_name] = {'access': True, 'expires_at': expires_at}
+            valid_for = min(valid_for, max(0, int((expires_at - now).total_seconds())))
+        return {'access': access, 'valid_for': valid_for}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache counters for the verification path.
+        """
+        return {
+            'verified_tx_cache': self.verified_transactions.stats(),
+            'failed_validation_cache': self.failed_validations.stats(),
+            'balance_cache': self.blockchain_client.balance_cache.stats(),
+            'validations': self.inflight_validations.stats()
+        }
 
+    @traced('bot_access.check_subscription_status')
     def check_subscription_status(self, telegram_id: int, bot_name: str) -> bool:
         """
         Checks if a user's subscription is still valid.
@@ -129,7 +270,7 @@ class BotAccessManager:
         subscription = get_user_bot_subscription(telegram_id, bot_name)
         if subscription and subscription['expires_at'] > datetime.now():
             balance_valid = self.blockchain_client.check_wallet_balance(
-                subscription['payment_address'], Config.MINIMUM_NESS
+                subscription['payment_address'], Config.get_minimum_ness(bot_name)
             )
             if not balance_valid:
                 remove_bot_subscription(telegram_id, bot_name)
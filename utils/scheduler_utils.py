@@ -0,0 +1,164 @@
+import time
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+from utils.config import Config
+from utils.db_utils import (
+    get_subscriptions_expiring_before,
+    remove_expired_subscriptions,
+    get_active_payments,
+    remove_subscriptions_for_payments,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionScheduler:
+    """
+    Background engine that revokes subscriptions as they expire and
+    periodically re-validates holder balances in bulk.
+
+    Upcoming expiries are kept in a min-heap, reloaded from the
+    bot_subscriptions(expires_at) index every `reload_interval` seconds, so the
+    expiry thread sleeps until exactly the next one is due.
+    """
+
+    def __init__(self, blockchain_client, batch_size: int = None, reload_interval: float = None,
+                 revalidation_interval: float = None, balance_workers: int = None):
+        self.blockchain_client = blockchain_client
+        self.batch_size = batch_size or Config.SCHEDULER_BATCH_SIZE
+        self.reload_interval = reload_interval or Config.SCHEDULER_RELOAD_INTERVAL
+        self.revalidation_interval = revalidation_interval or Config.BALANCE_REVALIDATION_INTERVAL
+        self.balance_workers = balance_workers or Config.BALANCE_REVALIDATION_WORKERS
+
+        self._heap = []
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self._revoked_expired = 0
+        self._revoked_balance = 0
+        self._revalidation_runs = 0
+        self._addresses_checked = 0
+        self._balance_errors = 0
+        self._last_revalidation_seconds = 0.0
+
+    def start(self):
+        if self._threads:
+            return
+        for target, name in ((self._expiry_loop, 'subscription-expiry'),
+                             (self._revalidation_loop, 'balance-revalidation')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("[SCHEDULER] Subscription scheduler started")
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _reload(self):
+        horizon = datetime.now() + timedelta(seconds=self.reload_interval * 2)
+        rows = get_subscriptions_expiring_before(horizon, Config.SCHEDULER_MAX_HEAP)
+        heap = [(row['expires_at'], row['telegram_id'], row['bot_name']) for row in rows]
+        heapq.heapify(heap)
+        with self._cond:
+            self._heap = heap
+
+    def revoke_expired(self) -> int:
+        """
+        Revoke everything that has expired, one batch per transaction.
+        """
+        now = datetime.now()
+        revoked = 0
+        while True:
+            batch = remove_expired_subscriptions(now, self.batch_size)
+            revoked += len(batch)
+            if len(batch) < self.batch_size:
+                break
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+        with self._lock:
+            self._revoked_expired += revoked
+        return revoked
+
+    def _expiry_loop(self):
+        next_reload = 0.0
+        while not self._stopped.is_set():
+            try:
+                if time.monotonic() >= next_reload:
+                    self._reload()
+                    next_reload = time.monotonic() + self.reload_interval
+
+                with self._cond:
+                    now = datetime.now()
+                    due = bool(self._heap) and self._heap[0][0] <= now
+                    if not due:
+                        timeout = next_reload - time.monotonic()
+                        if self._heap:
+                            timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                        self._cond.wait(max(timeout, 0.01))
+                        continue
+
+                self.revoke_expired()
+            except Exception as e:
+                logger.error(f"[SCHEDULER] Expiry loop error: {e}")
+                self._stopped.wait(5)
+
+    def revalidate_balances(self) -> int:
+        """
+        Re-check every distinct paying address once, with bounded concurrency,
+        and revoke subscriptions whose wallet dropped below their bot's minimum NESS.
+        """
+        started = time.monotonic()
+        payments = get_active_payments(datetime.now())
+        addresses = list(dict.fromkeys(address for address, _ in payments))
+
+        # Force a fresh read; this also warms the shared balance cache for access checks
+        with ThreadPoolExecutor(max_workers=self.balance_workers, thread_name_prefix='revalidate') as executor:
+            balances = dict(zip(addresses, executor.map(self.blockchain_client.balance_cache.refresh, addresses)))
+
+        # Unknown balances (explorer down) never revoke anything
+        insufficient = [(address, bot_name) for address, bot_name in payments
+                        if balances[address] is not None and balances[address] < Config.get_minimum_ness(bot_name)]
+        revoked = 0
+        for start in range(0, len(insufficient), self.batch_size):
+            revoked += len(remove_subscriptions_for_payments(insufficient[start:start + self.batch_size]))
+
+        with self._lock:
+            self._revalidation_runs += 1
+            self._addresses_checked += len(addresses)
+            self._balance_errors += sum(1 for balance in balances.values() if balance is None)
+            self._revoked_balance += revoked
+            self._last_revalidation_seconds = time.monotonic() - started
+        logger.info(f"[SCHEDULER] Re-validated {len(addresses)} addresses, revoked {revoked} subscriptions")
+        return revoked
+
+    def _revalidation_loop(self):
+        while not self._stopped.wait(self.revalidation_interval):
+            try:
+                self.revalidate_balances()
+            except Exception as e:
+                logger.error(f"[SCHEDULER] Balance re-validation error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            scheduled = len(self._heap)
+            next_expiry = self._heap[0][0].isoformat() if self._heap else None
+        with self._lock:
+            return {
+                'scheduled': scheduled,
+                'next_expiry': next_expiry,
+                'revoked_expired': self._revoked_expired,
+                'revoked_balance': self._revoked_balance,
+                'revalidation_runs': self._revalidation_runs,
+                'addresses_checked': self._addresses_checked,
+                'balance_errors': self._balance_errors,
+                'last_revalidation_seconds': round(self._last_revalidation_seconds, 3),
+            }
@@ -0,0 +1,200 @@
+import json
+import hashlib
+import logging
+import threading
+import requests
+from collections import deque
+from typing import Dict, Any, Iterator, List, Optional
+from utils.config import Config
+from utils.leader_utils import SharedSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _signal_key(signal: Dict[str, Any]) -> str:
+    if isinstance(signal, dict) and signal.get('id') is not None:
+        return str(signal['id'])
+    return hashlib.sha1(json.dumps(signal, sort_keys=True).encode()).hexdigest()
+
+
+class SignalHub:
+    """
+    Polls the upstream signal feed on one thread and fans new alerts out to
+    every connected Server-Sent Events client.
+
+    The last `buffer_size` alerts are kept in a ring buffer with increasing
+    sequence numbers, so a new subscriber gets them replayed and a reconnecting
+    one (Last-Event-ID) only gets what it missed.
+
+    Under a multi-worker server only the leader polls upstream. It publishes
+    its buffer to a shared file that followers mirror, sequence numbers
+    included, so a client may reconnect to any worker with its Last-Event-ID.
+
+    Each open stream holds its worker thread for as long as the client stays
+    connected, so threaded workers only take a few; the gevent stream server
+    (gunicorn_stream.conf.py) is what serves them at scale.
+    """
+
+    def __init__(self, url: str = None, poll_interval: float = None, buffer_size: int = None,
+                 max_subscribers: int = None, timeout: float = None, session: requests.Session = None):
+        self.url = url or Config.API_ENDPOINTS['SIGNAL_ALERTS']
+        self.poll_interval = poll_interval or Config.SIGNAL_POLL_INTERVAL
+        self.buffer_size = buffer_size or Config.SIGNAL_BUFFER_SIZE
+        self.max_subscribers = max_subscribers or Config.SIGNAL_STREAM_MAX_CLIENTS
+        self.timeout = timeout or Config.SIGNAL_HTTP_TIMEOUT
+        self.session = session or requests.Session()
+
+        self._events = deque(maxlen=self.buffer_size)
+        self._seen = deque(maxlen=self.buffer_size * 4)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._shared = SharedSnapshot('signals')
+        self._shared_mtime = None
+        self.leader = True
+        self._subscribers = 0
+        self.published = 0
+        self.upstream_errors = 0
+
+    def publish(self, signals: List[Dict[str, Any]]) -> int:
+        """
+        Append the signals not seen before and wake every subscriber. Returns how many were new.
+        """
+        with self._cond:
+            new = 0
+            for signal in signals:
+                key = _signal_key(signal)
+                if key in self._seen:
+                    continue
+                self._seen.append(key)
+                self._seq += 1
+                self._events.append((self._seq, json.dumps(signal, separators=(',', ':'))))
+                new += 1
+            if new:
+                self.published += new
+                self._cond.notify_all()
+                if self.leader:
+                    self._publish_shared()
+            return new
+
+    def _publish_shared(self):
+        try:
+            self._shared.write({'seq': self._seq, 'events': list(self._events)})
+        except OSError as e:
+            logger.error(f"[SIGNALS] Could not publish snapshot: {e}")
+
+    def _follow(self):
+        """
+        Mirror the leader's buffer, keeping its sequence numbers.
+        """
+        data, mtime = self._shared.read()
+        if data is None or mtime == self._shared_mtime:
+            return
+        self._shared_mtime = mtime
+        with self._cond:
+            if data['seq'] < self._seq:
+                # The leader restarted and numbers from scratch
+                self._events.clear()
+                self._seq = 0
+            new = [(seq, payload) for seq, payload in data['events'] if seq > self._seq]
+            if not new:
+                return
+            for seq, payload in new:
+                self._events.append((seq, payload))
+                self._seen.append(_signal_key(json.loads(payload)))
+            self._seq = data['seq']
+            self.published += len(new)
+            self._cond.notify_all()
+
+    def _poll(self):
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            signals = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.upstream_errors += 1
+            logger.error(f"[SIGNALS] Upstream poll failed: {e}")
+            return
+        if isinstance(signals, list):
+            # The feed lists newest first; publish oldest first so sequence numbers follow time
+            self.publish(list(reversed(signals)))
+
+    def start(self, leader: bool = True):
+        """
+        Poll upstream (leader) or mirror the leader's snapshot (follower).
+        Calling it again with leader=True promotes a follower.
+        """
+        self.leader = leader
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stopped.is_set():
+                if self.leader:
+                    self._poll()
+                    self._stopped.wait(self.poll_interval)
+                else:
+                    self._follow()
+                    self._stopped.wait(Config.SNAPSHOT_FOLLOW_INTERVAL)
+
+        self._thread = threading.Thread(target=run, name='signal-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _events_after(self, seq: int) -> List[tuple]:
+        return [event for event in self._events if event[0] > seq]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Optional[Iterator[str]]:
+        """
+        SSE byte stream for one client, or None if the subscriber limit is reached.
+        """
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            try:
+                last_seq = int(last_event_id)
+            except (TypeError, ValueError):
+                last_seq = None
+            if last_seq is None or last_seq > self._seq:
+                # Fresh subscriber, or an id from before a restart: replay the whole buffer
+                last_seq = self._events[0][0] - 1 if self._events else self._seq
+        return self._stream(last_seq)
+
+    def _stream(self, last_seq: int) -> Iterator[str]:
+        # Counted from the first iteration: a response that is never iterated (HEAD, a client
+        # gone before the body starts) never runs the finally below, so must not take a slot
+        with self._cond:
+            self._subscribers += 1
+        try:
+            yield f"retry: {Config.SIGNAL_RETRY_MS}\n\n"
+            while not self._stopped.is_set():
+                with self._cond:
+                    events = self._events_after(last_seq)
+                    if not events:
+                        self._cond.wait(Config.SIGNAL_HEARTBEAT_INTERVAL)
+                        events = self._events_after(last_seq)
+                if not events:
+                    # Keeps proxies from closing the idle connection and detects gone clients
+                    yield ": keep-alive\n\n"
+                    continue
+                for seq, data in events:
+                    yield f"id: {seq}\nevent: signal\ndata: {data}\n\n"
+                last_seq = events[-1][0]
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'subscribers': self._subscribers,
+                'buffered': len(self._events),
+                'last_event_id': self._seq,
+                'published': self.published,
+                'upstream_errors': self.upstream_errors,
+            }
@@ -1,19 +1,229 @@
+import time
+import heapq
+import threading
+import itertools
 import requests
+from collections import deque
+from requests.adapters import HTTPAdapter
 from utils.config import Config
+from utils.cache_utils import LRUCache
+from utils.rate_limit_utils import TokenBucket
+from utils.metrics_utils import TELEGRAM_API_ERRORS
+from utils.trace_utils import traced
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+
+def _error_reason(error: Exception) -> str:
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return f"http_{response.status_code}"
+    if isinstance(error, requests.RequestException):
+        return 'network'
+    return 'error'
+
+
+class OutboundMessageQueue:
+    """
+    Sends queued messages on a few worker threads within Telegram's limits:
+    a global token bucket (~30 msg/s) and one per chat (~1 msg/s).
+
+    Each chat's messages go out in order, one at a time. A 429 pauses that chat,
+    and all sending, for the `retry_after` Telegram asks for and the message is
+    retried rather than dropped; network errors and 5xx responses are retried
+    with backoff.
+    """
+
+    def __init__(self, deliver, workers: int = None, global_rate: float = None,
+                 per_chat_rate: float = None, max_pending: int = None):
+        self._deliver = deliver
+        self.workers = workers or Config.TELEGRAM_SEND_WORKERS
+        self.per_chat_rate = per_chat_rate or Config.TELEGRAM_PER_CHAT_RATE
+        self.max_pending = max_pending or Config.TELEGRAM_SEND_QUEUE_SIZE
+        # No burst allowance: Telegram measures the global limit over short windows
+        self._global = TokenBucket(global_rate or Config.TELEGRAM_GLOBAL_RATE, capacity=1)
+        # Idle chats' buckets refill within a few seconds, so they can be evicted freely
+        self._chat_buckets = LRUCache(maxsize=10000, ttl=60)
+
+        self._chats = {}
+        self._ready = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self._pending = 0
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'telegram-send-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def put(self, chat_id, payload, timeout: float = None) -> bool:
+        """
+        Queue a message, waiting up to `timeout` seconds for room. Returns False if it could not be queued.
+        """
+        self.start()
+        timeout = Config.TELEGRAM_SEND_PUT_TIMEOUT if timeout is None else timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending < self.max_pending, timeout):
+                self._rejected += 1
+                logger.error(f"Outbound queue full, dropping message to {chat_id}")
+                return False
+            messages = self._chats.get(chat_id)
+            if messages is None:
+                messages = self._chats[chat_id] = deque()
+                self._schedule(chat_id, time.monotonic())
+            messages.append({'payload': payload, 'attempts': 0})
+            self._pending += 1
+            self._cond.notify_all()
+        return True
+
+    def _schedule(self, chat_id, ready_at: float):
+        heapq.heappush(self._ready, (ready_at, next(self._seq), chat_id))
+
+    def _next_chat(self):
+        """
+        Wait for a chat whose next message may be sent now. Returns None once stopped and drained.
+        """
+        with self._cond:
+            while True:
+                if self._stopped and not self._pending:
+                    return None
+                now = time.monotonic()
+                if self._ready and self._ready[0][0] <= now:
+                    chat_id = heapq.heappop(self._ready)[2]
+                    bucket = self._chat_buckets.get(chat_id)
+                    if bucket is None:
+                        bucket = TokenBucket(self.per_chat_rate, capacity=1)
+                        self._chat_buckets.set(chat_id, bucket)
+                    wait = bucket.try_acquire()
+                    if wait > 0:
+                        self._schedule(chat_id, now + wait)
+                        continue
+                    return chat_id, self._chats[chat_id][0]
+                self._cond.wait(self._ready[0][0] - now if self._ready else None)
+
+    def _run(self):
+        while True:
+            picked = self._next_chat()
+            if picked is None:
+                return
+            chat_id, message = picked
+
+            self._global.acquire()
+            retry_after = self._send(chat_id, message)
+
+            with self._cond:
+                if retry_after:
+                    self._retried += 1
+                    self._schedule(chat_id, time.monotonic() + retry_after)
+                else:
+                    self._chats[chat_id].popleft()
+                    self._pending -= 1
+                    if self._chats[chat_id]:
+                        self._schedule(chat_id, time.monotonic())
+                    else:
+                        del self._chats[chat_id]
+                self._cond.notify_all()
+
+    def _send(self, chat_id, message) -> float:
+        """
+        Deliver one message. Returns seconds to wait before retrying it, or 0 when it is done with.
+        """
+        message['attempts'] += 1
+        try:
+            response = self._deliver(message['payload'])
+            if response.status_code >= 500 or response.status_code == 429:
+                TELEGRAM_API_ERRORS.inc(method='sendMessage', reason=f"http_{response.status_code}")
+            if response.status_code == 429:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+                logger.warning(f"Telegram rate limited chat {chat_id}, retrying in {retry_after}s")
+                # Telegram does not say which limit was hit, so hold back every chat, not just this one
+                self._global.pause(retry_after)
+                return retry_after
+            if response.status_code < 500:
+                response.raise_for_status()
+                with self._cond:
+                    self._sent += 1
+                return 0.0
+            error = f"HTTP {response.status_code}"
+        except requests.HTTPError as e:
+            # 4xx other than 429 will not succeed on retry
+            logger.error(f"Failed to send message to {chat_id}: {e}")
+            TELEGRAM_API_ERRORS.inc(method='sendMessage', reason=_error_reason(e))
+            with self._cond:
+                self._failed += 1
+            return 0.0
+        except (requests.RequestException, ValueError) as e:
+            TELEGRAM_API_ERRORS.inc(method='sendMessage', reason=_error_reason(e))
+            error = str(e)
+
+        if message['attempts'] >= Config.TELEGRAM_SEND_MAX_ATTEMPTS:
+            logger.error(f"Failed to send message to {chat_id} after {message['attempts']} attempts: {error}")
+            with self._cond:
+                self._failed += 1
+            return 0.0
+        return float(2 ** message['attempts'])
+
+    def drain(self, timeout: float = None) -> bool:
+        """
+        Wait until every queued message has been sent or given up on.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout: float = None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.drain(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': self._pending,
+                'chats': len(self._chats),
+                'sent': self._sent,
+                'retried': self._retried,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+
 class TelegramBot:
-    def __init__(self):
+    def __init__(self, api_url=None):
         self.token = Config.BOT_TOKEN
         self.chat_id = Config.CHAT_ID
-        self.base_url = f'https://api.telegram.org/bot{self.token}'
+        self.base_url = f'{api_url or Config.TELEGRAM_API_URL}/bot{self.token}'
+        self.timeout = Config.TELEGRAM_HTTP_TIMEOUT
+
+        # One keep-alive pool shared by polling, sends and setup calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.TELEGRAM_SEND_WORKERS + 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.outbound = OutboundMessageQueue(self._post_message)
+
+    @traced('telegram.sendMessage')
+    def _post_message(self, payload):
+        return self.session.post(f'{self.base_url}/sendMessage', json=payload, timeout=self.timeout)
 
-    def send_message(self, chat_id, message, reply_markup=None):
+    def send_message(self, chat_id, message, reply_markup=None, block=False):
+        """
+        Queue a message for rate-limited delivery. With block=True it is sent
+        immediately and Telegram's response is returned.
+        """
         try:
-            url = f'{self.base_url}/sendMessage'
             payload = {
                 'chat_id': chat_id,
                 'text': message,
@@ -21,14 +231,19 @@ class TelegramBot:
             }
             if reply_markup:
                 payload['reply_markup'] = json.dumps(reply_markup)
-            
-            response = requests.post(url, json=payload)
+
+            if not block:
+                return self.outbound.put(chat_id, payload)
+
+            response = self._post_message(payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"Failed to send message: {e}")
+            TELEGRAM_API_ERRORS.inc(method='sendMessage', reason=_error_reason(e))
             return None
 
+    @traced('telegram.getUpdates')
     def get_updates(self, offset=0):
         try:
             url = f'{self.base_url}/getUpdates'
@@ -37,13 +252,65 @@ class TelegramBot:
                 'timeout': 30,
                 'allowed_updates': ['message', 'callback_query']
             }
-            response = requests.get(url, params=params)
+            # The HTTP timeout has to outlast the long-poll timeout
+            response = self.session.get(url, params=params, timeout=params['timeout'] + self.timeout)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"Failed to get updates: {e}")
+            TELEGRAM_API_ERRORS.inc(method='getUpdates', reason=_error_reason(e))
+            return None
+
+    @traced('telegram.setWebhook')
+    def set_webhook(self, url, secret_token=None):
+        """
+        Ask Telegram to push updates to `url` instead of serving getUpdates.
+        """
+        try:
+            payload = {
+                'url': url,
+                'allowed_updates': ['message', 'callback_query'],
+                'max_connections': Config.TELEGRAM_WEBHOOK_MAX_CONNECTIONS
+            }
+            if secret_token:
+                payload['secret_token'] = secret_token
+            response = self.session.post(f'{self.base_url}/setWebhook', json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            logger.info(f"Set webhook response: {response.json()}")
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to set webhook: {e}")
+            TELEGRAM_API_ERRORS.inc(method='setWebhook', reason=_error_reason(e))
+            return None
+
+    @traced('telegram.deleteWebhook')
+    def delete_webhook(self):
+        """
+        Remove the webhook so getUpdates polling works again.
+        """
+        try:
+            response = self.session.post(
+                f'{self.base_url}/deleteWebhook', json={'drop_pending_updates': False}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to delete webhook: {e}")
+            TELEGRAM_API_ERRORS.inc(method='deleteWebhook', reason=_error_reason(e))
+            return None
+
+    @traced('telegram.getWebhookInfo')
+    def get_webhook_info(self):
+        try:
+            response = self.session.get(f'{self.base_url}/getWebhookInfo', timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to get webhook info: {e}")
+            TELEGRAM_API_ERRORS.inc(method='getWebhookInfo', reason=_error_reason(e))
             return None
 
+    @traced('telegram.setChatMenuButton')
     def set_menu_button(self):
         try:
             url = f'{self.base_url}/setChatMenuButton'
@@ -54,7 +321,7 @@ class TelegramBot:
                     'web_app': {'url': Config.WEBAPP_URL}
                 }
             }
-            response = requests.post(url, json=payload)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             
             # Add detailed logging
@@ -68,9 +335,11 @@ class TelegramBot:
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error setting menu button: {e}")
+            TELEGRAM_API_ERRORS.inc(method='setChatMenuButton', reason=_error_reason(e))
             return None
         except Exception as e:
             logger.error(f"Unexpected error setting menu button: {e}")
+            TELEGRAM_API_ERRORS.inc(method='setChatMenuButton', reason=_error_reason(e))
             return None
 
     def create_webapp_keyboard(self):
@@ -79,4 +348,11 @@ class TelegramBot:
                 'text': '🚀 Open Trading Dashboard',
                 'web_app': {'url': Config.WEBAPP_URL}
             }]]
-        }
\ No newline at end of file
+        }
+
+    def close(self, timeout: float = 5):
+        """
+        Give queued messages a chance to go out, then release the connection pool.
+        """
+        self.outbound.stop(timeout)
+        self.session.close()
@@ -0,0 +1,328 @@
+"""
+Per-request tracing spans and an on-demand sampling profiler.
+
+A root span is opened for every Flask request and every verification job;
+`span()` / `@traced` calls made underneath it are recorded as children.
+Outside a root they are no-ops, so background loops cost a context-var
+lookup. Finished traces go to in-memory ring buffers (recent and slow)
+served, with the profiler, under /admin/ to callers holding ADMIN_TOKEN.
+"""
+import os
+import sys
+import time
+import uuid
+import logging
+import functools
+import threading
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from flask import Flask, Response, g, jsonify, request
+from utils.config import Config
+from utils.admin_utils import require_admin
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional['Span']] = ContextVar('ness_current_span', default=None)
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+class Trace:
+    __slots__ = ('trace_id', 'started_at', 'started', 'spans', 'dropped')
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.spans: List['Span'] = []
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attrs', 'started', 'duration', 'error', 'thread')
+
+    def __init__(self, trace: Trace, name: str, parent: Optional['Span'], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = len(trace.spans)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.thread = threading.current_thread().name
+        trace.spans.append(self)
+
+    def finish(self, error: BaseException = None):
+        self.duration = time.perf_counter() - self.started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'offset_ms': round((self.started - self.trace.started) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attrs': self.attrs,
+            'error': self.error,
+            'thread': self.thread,
+        }
+
+
+def _trace_to_dict(trace: Trace, spans: bool = True) -> Dict[str, Any]:
+    root = trace.spans[0]
+    summary = {
+        'trace_id': trace.trace_id,
+        'name': root.name,
+        'started_at': trace.started_at,
+        'duration_ms': round(root.duration * 1000, 3) if root.duration is not None else None,
+        'error': root.error,
+        'span_count': len(trace.spans),
+        'dropped_spans': trace.dropped,
+    }
+    if spans:
+        summary['spans'] = [item.to_dict() for item in trace.spans]
+    return summary
+
+
+class TraceBuffer:
+    """
+    The last `size` traces, plus the last `size` slow ones so a burst of fast
+    requests cannot evict the trace someone is looking for.
+    """
+
+    def __init__(self, size: int = None, slow_ms: float = None):
+        size = size or Config.TRACE_BUFFER_SIZE
+        self.slow_ms = slow_ms if slow_ms is not None else Config.TRACE_SLOW_MS
+        self._recent = deque(maxlen=size)
+        self._slow = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self.recorded += 1
+            self._recent.append(trace)
+            if trace.spans[0].duration * 1000 >= self.slow_ms:
+                self._slow.append(trace)
+
+    def list(self, min_ms: float = 0, limit: int = 50, slow: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._slow if slow else self._recent)
+        traces = [trace for trace in reversed(traces) if trace.spans[0].duration * 1000 >= min_ms]
+        return [_trace_to_dict(trace, spans=False) for trace in traces[:limit]]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._recent) + list(self._slow)
+        for trace in traces:
+            if trace.trace_id == trace_id:
+                return _trace_to_dict(trace)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'recorded': self.recorded, 'recent': len(self._recent), 'slow': len(self._slow)}
+
+
+TRACES = TraceBuffer()
+
+
+def start_span(name: str, root: bool = False, **attrs):
+    """
+    Open a span under the current one (or a new trace when `root`). Returns
+    (span, token) for `end_span`, or (None, None) when nothing is recorded.
+    """
+    parent = _current.get()
+    if not Config.TRACE_ENABLED or (parent is None and not root):
+        return None, None
+    if parent is None:
+        trace = Trace()
+    else:
+        trace = parent.trace
+        if len(trace.spans) >= Config.TRACE_MAX_SPANS:
+            trace.dropped += 1
+            return None, None
+    span_ = Span(trace, name, parent, attrs)
+    return span_, _current.set(span_)
+
+
+def end_span(span_: Optional[Span], token, error: BaseException = None):
+    if span_ is None:
+        return
+    span_.finish(error)
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Closed from a different context than it was opened in; just detach it
+        _current.set(None)
+    if span_.parent_id is None:
+        TRACES.add(span_.trace)
+
+
+@contextmanager
+def span(name: str, root: bool = False, **attrs):
+    span_, token = start_span(name, root, **attrs)
+    try:
+        yield span_
+    except BaseException as e:
+        end_span(span_, token, e)
+        raise
+    end_span(span_, token)
+
+
+def traced(name: str = None):
+    """
+    Decorator recording each call as a span named `name` (default: the function's qualified name).
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current.get()
+    return current.trace.trace_id if current is not None else None
+
+
+class SamplingProfiler:
+    """
+    Samples every other thread's stack from the calling thread and aggregates them
+    into folded stacks (`thread;outer;...;inner count`), the input format of
+    flamegraph.pl, speedscope and inferno. Only one profile runs at a time.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or Config.PROFILE_SAMPLE_INTERVAL
+        self._running = threading.Lock()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def run(self, seconds: float, trace_memory: bool = False, memory_top: int = 25) -> Dict[str, Any]:
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        started_tracemalloc = False
+        try:
+            if trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
+
+            stacks = Counter()
+            samples = 0
+            own = threading.get_ident()
+            names = {}
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frames = sys._current_frames()
+                if len(names) != len(frames):
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._frame_name(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    stacks[';'.join(reversed(stack))] += 1
+                samples += 1
+                time.sleep(self.interval)
+
+            result = {
+                'seconds': seconds,
+                'interval': self.interval,
+                'samples': samples,
+                'folded': '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()),
+                'tracemalloc': None,
+            }
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                result['tracemalloc'] = [
+                    {'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:memory_top]
+                ]
+            return result
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._running.release()
+
+
+profiler = SamplingProfiler()
+
+
+def init_tracing(app: Flask):
+    """
+    Open a root span per request and register the /admin trace and profile endpoints.
+    """
+    @app.before_request
+    def _open_request_span():
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.trace_span, g.trace_token = start_span(f"{request.method} {rule}", root=True, path=request.path)
+
+    @app.after_request
+    def _tag_response(response):
+        trace_span = g.get('trace_span')
+        if trace_span is not None:
+            trace_span.attrs['status'] = response.status_code
+            response.headers['X-Trace-Id'] = trace_span.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def _close_request_span(error=None):
+        end_span(g.pop('trace_span', None), g.pop('trace_token', None), error)
+
+    @app.route('/admin/traces')
+    def admin_traces():
+        require_admin()
+        return jsonify({
+            'stats': TRACES.stats(),
+            'traces': TRACES.list(
+                min_ms=request.args.get('min_ms', 0, type=float),
+                limit=request.args.get('limit', 50, type=int),
+                slow=request.args.get('slow', '0') in ('1', 'true', 'yes')
+            )
+        })
+
+    @app.route('/admin/traces/<trace_id>')
+    def admin_trace(trace_id):
+        require_admin()
+        trace = TRACES.get(trace_id)
+        if trace is None:
+            return jsonify({'error': 'Unknown trace'}), 404
+        return jsonify(trace)
+
+    @app.route('/admin/profile', methods=['POST'])
+    def admin_profile():
+        """
+        Profile every thread for ?seconds=N (blocking this request) and return
+        folded stacks, or JSON with ?format=json or ?tracemalloc=1.
+        """
+        require_admin()
+        seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), Config.PROFILE_MAX_SECONDS)
+        trace_memory = request.args.get('tracemalloc', '0') in ('1', 'true', 'yes')
+        try:
+            result = profiler.run(seconds, trace_memory=trace_memory)
+        except ProfilerBusyError as e:
+            return jsonify({'error': str(e)}), 409
+
+        logger.info(f"[PROFILE] Sampled {result['samples']} times over {seconds}s")
+        if trace_memory or request.args.get('format') == 'json':
+            return jsonify(result)
+        return Response(result['folded'] + '\n', mimetype='text/plain')
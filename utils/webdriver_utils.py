@@ -0,0 +1,287 @@
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, /proc is used instead
+    psutil = None
+
+
+class WebDriverPoolTimeout(Exception):
+    """Raised when no WebDriver could be checked out within the timeout."""
+
+
+def build_chrome_options() -> Options:
+    """
+    Chrome options shared by every pooled driver.
+    """
+    chrome_options = Options()
+    #chrome_options.add_argument("--headless")  # ✅ Keep running in headless mode
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+
+    # ✅ Fix SSL Errors
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("--allow-running-insecure-content")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    return chrome_options
+
+
+def _process_tree_rss_mb(pid: int) -> float:
+    """
+    Resident memory of a process and all of its descendants, in MB.
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except psutil.Error:
+            return 0.0
+
+    # Fallback: walk /proc to build the parent -> children map
+    children: Dict[int, list] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat_file:
+                # The command name may contain spaces, so split after the closing paren
+                fields = stat_file.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/statm') as statm_file:
+                total += int(statm_file.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+        pending.extend(children.get(current, []))
+    return total / (1024 * 1024)
+
+
+class PooledDriver:
+    """
+    A Chrome WebDriver checked out of a WebDriverPool.
+    Page loads go through `get` so the pool knows when to recycle the browser.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_loads = 0
+        self.created_at = time.monotonic()
+
+    def get(self, url: str):
+        self.page_loads += 1
+        return self.driver.get(url)
+
+    @property
+    def pid(self) -> Optional[int]:
+        service = getattr(self.driver, 'service', None)
+        process = getattr(service, 'process', None)
+        return getattr(process, 'pid', None)
+
+    def is_healthy(self) -> bool:
+        try:
+            # Cheap round-trip through chromedriver to the browser
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def rss_mb(self) -> float:
+        pid = self.pid
+        if pid is None:
+            return 0.0
+        return _process_tree_rss_mb(pid)
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"[WEBDRIVER POOL] Error while quitting driver: {e}")
+
+
+class WebDriverPool:
+    """
+    Bounded pool of long-lived Chrome WebDrivers.
+
+    Drivers are created lazily up to `size`, health-checked on checkout and
+    recycled after `max_page_loads` page loads or once the browser process
+    tree grows above `max_rss_mb`.
+    """
+
+    def __init__(self, size: int = None, max_page_loads: int = None, max_rss_mb: int = None,
+                 checkout_timeout: float = None, driver_factory: Callable[[], Any] = None):
+        self.size = size or Config.WEBDRIVER_POOL_SIZE
+        self.max_page_loads = max_page_loads if max_page_loads is not None else Config.WEBDRIVER_MAX_PAGE_LOADS
+        self.max_rss_mb = max_rss_mb if max_rss_mb is not None else Config.WEBDRIVER_MAX_RSS_MB
+        self.checkout_timeout = checkout_timeout if checkout_timeout is not None else Config.WEBDRIVER_CHECKOUT_TIMEOUT
+        self._driver_factory = driver_factory or self._create_chrome_driver
+
+        # LIFO keeps the most recently used (warm) browsers in rotation
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._closed = False
+
+        self._live = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._checkout_timeouts = 0
+        self._created = 0
+        self._waits = 0  # Every checkout attempt, including the ones that timed out
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recycled = {'page_loads': 0, 'rss': 0, 'unhealthy': 0}
+
+    def _create_chrome_driver(self):
+        with self._lock:
+            if self._driver_path is None:
+                # Resolve chromedriver once per pool instead of once per browser
+                self._driver_path = ChromeDriverManager().install()
+            driver_path = self._driver_path
+        return webdriver.Chrome(service=Service(driver_path), options=build_chrome_options())
+
+    def _new_driver(self) -> PooledDriver:
+        pooled = PooledDriver(self._driver_factory())
+        with self._lock:
+            self._live += 1
+            self._created += 1
+        logger.info(f"[WEBDRIVER POOL] Started new driver ({self._live}/{self.size} live)")
+        return pooled
+
+    def _discard(self, pooled: PooledDriver, reason: str):
+        with self._lock:
+            self._live -= 1
+            if reason in self._recycled:
+                self._recycled[reason] += 1
+        logger.info(f"[WEBDRIVER POOL] Recycling driver after {pooled.page_loads} page loads (reason: {reason})")
+        pooled.quit()
+
+    def checkout(self) -> PooledDriver:
+        """
+        Take a healthy driver out of the pool, starting one if none is idle.
+        Raises WebDriverPoolTimeout if the pool stays exhausted for `checkout_timeout`.
+        """
+        if self._closed:
+            raise RuntimeError("WebDriver pool is closed")
+
+        started = time.monotonic()
+        acquired = self._slots.acquire(timeout=self.checkout_timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            if not acquired:
+                self._checkout_timeouts += 1
+        if not acquired:
+            raise WebDriverPoolTimeout(f"No WebDriver available after {waited:.1f}s")
+
+        try:
+            pooled = None
+            while pooled is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    pooled = self._new_driver()
+                    break
+                if candidate.is_healthy():
+                    pooled = candidate
+                else:
+                    self._discard(candidate, 'unhealthy')
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+        return pooled
+
+    def checkin(self, pooled: PooledDriver):
+        """
+        Return a driver to the pool, recycling it if it has served enough pages
+        or grown past the memory limit.
+        """
+        try:
+            if self._closed:
+                self._discard(pooled, 'closed')
+            elif self.max_page_loads and pooled.page_loads >= self.max_page_loads:
+                self._discard(pooled, 'page_loads')
+            elif self.max_rss_mb and pooled.rss_mb() > self.max_rss_mb:
+                self._discard(pooled, 'rss')
+            else:
+                self._idle.put(pooled)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def driver(self):
+        """
+        Context manager that checks a driver out and always checks it back in.
+        """
+        pooled = self.checkout()
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'live': self._live,
+                'idle': self._idle.qsize(),
+                'in_use': self._in_use,
+                'created': self._created,
+                'checkouts': self._checkouts,
+                'checkout_timeouts': self._checkout_timeouts,
+                'wait_seconds_total': round(self._wait_total, 6),
+                'wait_seconds_max': round(self._wait_max, 6),
+                'wait_seconds_avg': round(self._wait_total / self._waits, 6) if self._waits else 0.0,
+                'recycled': dict(self._recycled),
+            }
+
+    def close(self):
+        """
+        Quit every idle driver. Drivers still checked out are quit on checkin.
+        """
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled, 'closed')
+        logger.info("[WEBDRIVER POOL] Closed")
@@ -0,0 +1,9 @@
+"""
+WSGI entry point: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+from app import app as application
+from utils.db_utils import initialize_db, close_db_connection
+
+# Runs once in the gunicorn master (preload_app); workers open their own connections after fork
+initialize_db()
+close_db_connection()